@@ -0,0 +1,82 @@
+"""Partition applications by month of created_at
+
+Revision ID: applications_partitioned
+Revises: hot_query_indexes
+Create Date: 2026-10-20 12:00:00.000000
+
+The table is copied under an EXCLUSIVE lock (reads go on, new applications
+wait), run it when traffic is low.
+"""
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'applications_partitioned'
+down_revision = 'hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of crud/application.py PARTITION_PREFIX and APPLICATIONS_PARTITIONS_AHEAD
+PARTITION_PREFIX = 'applications_p'
+MONTHS_AHEAD = 3
+
+INDEXES = {
+    'idx_applications_status': 'applications (status)',
+    'idx_applications_user_created': 'applications (user_id, created_at)',
+    'ix_applications_user_vacancy_success': "applications (user_id, vacancy_id) WHERE status = 'success'",
+    'ix_applications_vacancy_id': 'applications (vacancy_id)',
+    'ix_applications_created_at': 'applications (created_at)',
+}
+
+
+def _month_start(value: date, offset: int = 0) -> date:
+    index = value.year * 12 + value.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _swap_in(table: str, primary_key: str) -> None:
+    """Replace applications with `table`: keys, foreign keys and indexes"""
+    op.execute('DROP TABLE applications')
+    op.execute(f'ALTER TABLE {table} RENAME TO applications')
+    op.execute(f'ALTER TABLE applications ADD CONSTRAINT applications_pkey PRIMARY KEY ({primary_key})')
+    op.create_foreign_key('applications_user_id_fkey', 'applications', 'users', ['user_id'], ['id'])
+    op.create_foreign_key('applications_vacancy_id_fkey', 'applications', 'vacancies', ['vacancy_id'], ['id'])
+    for name, definition in INDEXES.items():
+        op.execute(f'CREATE INDEX {name} ON {definition}')
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    op.execute('LOCK TABLE applications IN EXCLUSIVE MODE')
+    # The partition key is part of the primary key and can not be NULL
+    op.execute('UPDATE applications SET created_at = now() WHERE created_at IS NULL')
+    op.execute('ALTER TABLE applications ALTER COLUMN created_at SET NOT NULL')
+
+    op.execute(
+        'CREATE TABLE applications_partitioned (LIKE applications INCLUDING DEFAULTS) '
+        'PARTITION BY RANGE (created_at)'
+    )
+    first = bind.execute(sa.text('SELECT min(created_at) FROM applications')).scalar() or datetime.utcnow()
+    month, last = _month_start(first), _month_start(datetime.utcnow(), MONTHS_AHEAD)
+    while month <= last:
+        following = _month_start(month, 1)
+        op.execute(
+            f"CREATE TABLE {PARTITION_PREFIX}{month:%Y%m} PARTITION OF applications_partitioned "
+            f"FOR VALUES FROM ('{month}') TO ('{following}')"
+        )
+        month = following
+    op.execute('CREATE TABLE applications_default PARTITION OF applications_partitioned DEFAULT')
+
+    op.execute('INSERT INTO applications_partitioned SELECT * FROM applications')
+    _swap_in('applications_partitioned', 'id, created_at')
+
+
+def downgrade() -> None:
+    op.execute('LOCK TABLE applications IN EXCLUSIVE MODE')
+    op.execute('CREATE TABLE applications_plain (LIKE applications INCLUDING DEFAULTS)')
+    op.execute('INSERT INTO applications_plain SELECT * FROM applications')
+    # Dropping the partitioned table drops its partitions
+    _swap_in('applications_plain', 'id')
+    op.execute('ALTER TABLE applications ALTER COLUMN created_at DROP NOT NULL')
@@ -0,0 +1,79 @@
+"""Employers table, vacancies keep only employer_id
+
+Revision ID: employers
+Revises: vacancy_payload_json
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'employers'
+down_revision = 'vacancy_payload_json'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'employers',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('alternate_url', sa.String(), nullable=True),
+        sa.Column('logo_url', sa.String(), nullable=True),
+        sa.Column('trusted', sa.Boolean(), nullable=True),
+        sa.Column('accredited_it_employer', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.add_column('vacancies', sa.Column('employer_id', sa.String(), nullable=True))
+
+    # Latest projected employer of each id, then vacancies drop their copy
+    op.execute(
+        """
+        INSERT INTO employers (id, name, alternate_url)
+        SELECT DISTINCT ON (full_data->'employer'->>'id')
+            full_data->'employer'->>'id',
+            coalesce(full_data->'employer'->>'name', ''),
+            full_data->'employer'->>'alternate_url'
+        FROM vacancies
+        WHERE full_data->'employer'->>'id' IS NOT NULL
+        ORDER BY full_data->'employer'->>'id', updated_at DESC
+        """
+    )
+    op.execute(
+        """
+        UPDATE vacancies SET
+            employer_id = full_data->'employer'->>'id',
+            full_data = full_data - 'employer',
+            payload_json = (full_data - 'employer')::text
+        WHERE full_data->'employer'->>'id' IS NOT NULL
+        """
+    )
+
+    op.create_index('ix_vacancies_employer_id', 'vacancies', ['employer_id'])
+    op.create_foreign_key(
+        'vacancies_employer_id_fkey', 'vacancies', 'employers', ['employer_id'], ['id']
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        UPDATE vacancies v SET
+            full_data = v.full_data || jsonb_build_object('employer', jsonb_strip_nulls(
+                jsonb_build_object('id', e.id, 'name', e.name, 'alternate_url', e.alternate_url)
+            )),
+            payload_json = (v.full_data || jsonb_build_object('employer', jsonb_strip_nulls(
+                jsonb_build_object('id', e.id, 'name', e.name, 'alternate_url', e.alternate_url)
+            )))::text
+        FROM employers e
+        WHERE e.id = v.employer_id
+        """
+    )
+    op.drop_constraint('vacancies_employer_id_fkey', 'vacancies', type_='foreignkey')
+    op.drop_index('ix_vacancies_employer_id', table_name='vacancies')
+    op.drop_column('vacancies', 'employer_id')
+    op.drop_table('employers')
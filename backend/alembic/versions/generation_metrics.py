@@ -0,0 +1,43 @@
+"""Add generation_metrics table
+
+Revision ID: generation_metrics
+Revises: vacancy_description_tokens
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'generation_metrics'
+down_revision = 'vacancy_description_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('generation_metrics',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('provider', sa.String(), nullable=True),
+        sa.Column('model', sa.String(), nullable=True),
+        sa.Column('prompt_filename', sa.String(), nullable=True),
+        sa.Column('input_tokens', sa.Integer(), nullable=True),
+        sa.Column('output_tokens', sa.Integer(), nullable=True),
+        sa.Column('cached_tokens', sa.Integer(), nullable=True),
+        sa.Column('queue_wait_ms', sa.Integer(), nullable=True),
+        sa.Column('ttft_ms', sa.Integer(), nullable=True),
+        sa.Column('provider_latency_ms', sa.Integer(), nullable=True),
+        sa.Column('total_latency_ms', sa.Integer(), nullable=True),
+        sa.Column('is_fallback', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_generation_metrics_created_at', 'generation_metrics', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_generation_metrics_created_at', table_name='generation_metrics')
+    op.drop_table('generation_metrics')
@@ -0,0 +1,28 @@
+"""Add model routing columns to generation_metrics
+
+Revision ID: generation_metrics_routing
+Revises: letter_drafts
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'generation_metrics_routing'
+down_revision = 'letter_drafts'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('generation_metrics', sa.Column('route', sa.String(), nullable=True))
+    op.add_column('generation_metrics',
+        sa.Column('is_shadow', sa.Boolean(), nullable=False, server_default=sa.false()))
+    op.add_column('generation_metrics', sa.Column('letter_length', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('generation_metrics', 'letter_length')
+    op.drop_column('generation_metrics', 'is_shadow')
+    op.drop_column('generation_metrics', 'route')
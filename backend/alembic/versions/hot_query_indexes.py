@@ -0,0 +1,51 @@
+"""Indexes for hot application, vacancy and pseudonymization queries
+
+Revision ID: hot_query_indexes
+Revises: employers
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'hot_query_indexes'
+down_revision = 'employers'
+branch_labels = None
+depends_on = None
+
+# name -> definition; IF NOT EXISTS because tables created by create_all()
+# or add.txt may already have some of them
+INDEXES = {
+    # "already applied" checks and the applied flag in search
+    'ix_applications_user_vacancy_success':
+        "applications (user_id, vacancy_id) WHERE status = 'success'",
+    # NOT EXISTS in the vacancy cleanup
+    'ix_applications_vacancy_id': 'applications (vacancy_id)',
+    # /api/stats/cover-letters 24h count
+    'ix_applications_created_at': 'applications (created_at)',
+    # Vacancy cleanup by last search time
+    'ix_vacancies_last_searched_at': 'vacancies (last_searched_at)',
+    # Expired session cleanup and mappings of a session (also the cascade delete)
+    'pseudonymization.idx_mapping_sessions_expires': 'pseudonymization.mapping_sessions (expires_at)',
+    'pseudonymization.idx_mappings_session': 'pseudonymization.mappings (session_id)',
+}
+
+# Declared by remove_letter_generation but missing in databases created by
+# create_all() before the models listed it; not dropped on downgrade
+EXISTING = {
+    # /api/user-info 24h count and history by user
+    'idx_applications_user_created': 'applications (user_id, created_at)',
+}
+
+
+def upgrade() -> None:
+    # Built without blocking writes to the live tables
+    with op.get_context().autocommit_block():
+        for name, definition in {**EXISTING, **INDEXES}.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name.split('.')[-1]} ON {definition}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
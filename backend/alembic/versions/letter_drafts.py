@@ -0,0 +1,43 @@
+"""Add letter_drafts table for speculative letter generation
+
+Revision ID: letter_drafts
+Revises: vacancy_simhash
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'letter_drafts'
+down_revision = 'vacancy_simhash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('letter_drafts',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('vacancy_id', sa.String(), nullable=False),
+        sa.Column('resume_id', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='pending'),
+        sa.Column('content', sa.Text(), nullable=True),
+        sa.Column('prompt_filename', sa.String(), nullable=True),
+        sa.Column('ai_model', sa.String(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('job_id', sa.String(), nullable=True),
+        sa.Column('charged_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'vacancy_id', 'resume_id', name='uq_letter_drafts_user_vacancy_resume')
+    )
+    op.create_index('ix_letter_drafts_created_at', 'letter_drafts', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_letter_drafts_created_at', table_name='letter_drafts')
+    op.drop_table('letter_drafts')
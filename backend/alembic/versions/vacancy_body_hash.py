@@ -0,0 +1,24 @@
+"""Add body hash to vacancies to skip unchanged refreshes
+
+Revision ID: vacancy_body_hash
+Revises: vacancy_digest
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'vacancy_body_hash'
+down_revision = 'vacancy_digest'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # NULL never matches, so each existing row is written once more on its next refresh
+    op.add_column('vacancies', sa.Column('body_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('vacancies', 'body_hash')
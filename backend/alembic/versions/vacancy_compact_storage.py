@@ -0,0 +1,109 @@
+"""Store projected vacancy payload as JSONB, description only once, LZ4 TOAST
+
+Revision ID: vacancy_compact_storage
+Revises: vacancy_body_hash
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'vacancy_compact_storage'
+down_revision = 'vacancy_body_hash'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of crud/vacancy.py PROJECTED_FIELDS / PROJECTED_NESTED at this revision
+TOP_LEVEL = (
+    'id', 'name', 'key_skills', 'salary', 'published_at', 'alternate_url',
+    'apply_alternate_url', 'area', 'employer', 'experience', 'employment', 'schedule',
+)
+NESTED = {
+    'area': ('id', 'name'),
+    'employer': ('id', 'name', 'alternate_url'),
+    'experience': ('id', 'name'),
+    'employment': ('id', 'name'),
+    'schedule': ('id', 'name'),
+}
+
+
+def _nested_sql(field, keys):
+    pairs = ', '.join(f"'{key}', full_data->'{field}'->'{key}'" for key in keys)
+    return (
+        f"CASE WHEN jsonb_typeof(full_data->'{field}') = 'object' "
+        f"THEN jsonb_strip_nulls(jsonb_build_object({pairs})) END"
+    )
+
+
+def _supports_lz4() -> bool:
+    """PostgreSQL 14+ built with lz4; elsewhere the columns keep pglz"""
+    return bool(op.get_bind().execute(sa.text(
+        "SELECT 'lz4' = ANY(enumvals) FROM pg_settings WHERE name = 'default_toast_compression'"
+    )).scalar())
+
+
+def upgrade() -> None:
+    # New TOAST values of both columns are compressed with LZ4 (PostgreSQL 14+)
+    if _supports_lz4():
+        op.execute(
+            "ALTER TABLE vacancies ALTER COLUMN description SET COMPRESSION lz4, "
+            "ALTER COLUMN full_data SET COMPRESSION lz4"
+        )
+    op.alter_column(
+        'vacancies',
+        'full_data',
+        type_=postgresql.JSONB(),
+        existing_type=sa.JSON(),
+        postgresql_using='full_data::jsonb',
+    )
+
+    keys = ', '.join(f"'{key}'" for key in TOP_LEVEL)
+    nested = ' || '.join(
+        f"jsonb_strip_nulls(jsonb_build_object('{field}', {_nested_sql(field, nested_keys)}))"
+        for field, nested_keys in NESTED.items()
+    )
+    # key_skills keep only names; description leaves full_data. Concatenating an
+    # empty string rewrites the description so it is recompressed with LZ4.
+    # body_hash is reset because it covered the unprojected body.
+    op.execute(
+        f"""
+        UPDATE vacancies SET
+            full_data = (
+                SELECT coalesce(jsonb_object_agg(key, value), '{{}}'::jsonb)
+                FROM jsonb_each(full_data)
+                WHERE key IN ({keys}) AND jsonb_typeof(value) <> 'null'
+            )
+            || {nested}
+            || CASE WHEN jsonb_typeof(full_data->'key_skills') = 'array' THEN jsonb_build_object(
+                'key_skills',
+                (SELECT coalesce(jsonb_agg(jsonb_build_object('name', s->'name')), '[]'::jsonb)
+                 FROM jsonb_array_elements(full_data->'key_skills') s
+                 WHERE s ? 'name')
+            ) ELSE '{{}}'::jsonb END,
+            description = description || '',
+            body_hash = NULL
+        WHERE full_data IS NOT NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    # Fields dropped by the projection are not restored
+    op.execute(
+        "UPDATE vacancies SET full_data = full_data || jsonb_build_object('description', description) "
+        "WHERE full_data IS NOT NULL"
+    )
+    op.alter_column(
+        'vacancies',
+        'full_data',
+        type_=sa.JSON(),
+        existing_type=postgresql.JSONB(),
+        postgresql_using='full_data::json',
+    )
+    if _supports_lz4():
+        op.execute(
+            "ALTER TABLE vacancies ALTER COLUMN description SET COMPRESSION default, "
+            "ALTER COLUMN full_data SET COMPRESSION default"
+        )
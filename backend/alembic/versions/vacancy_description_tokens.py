@@ -0,0 +1,25 @@
+"""Add cached description token count to vacancies
+
+Revision ID: vacancy_description_tokens
+Revises: remove_letter_generation
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'vacancy_description_tokens'
+down_revision = 'remove_letter_generation'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Filled in at ingest, NULL rows are counted on the fly until refreshed
+    op.add_column('vacancies',
+        sa.Column('description_tokens', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('vacancies', 'description_tokens')
@@ -0,0 +1,26 @@
+"""Add content hash and prompt digest to vacancies
+
+Revision ID: vacancy_digest
+Revises: generation_metrics_routing
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'vacancy_digest'
+down_revision = 'generation_metrics_routing'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Filled in at ingest, existing rows get them on their next refresh
+    op.add_column('vacancies', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.add_column('vacancies', sa.Column('digest', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('vacancies', 'digest')
+    op.drop_column('vacancies', 'content_hash')
@@ -0,0 +1,49 @@
+"""Replace the vacancy SimHash with MinHash and a GIN index on its LSH bands
+
+Revision ID: vacancy_minhash
+Revises: applications_partitioned
+Create Date: 2026-10-20 16:00:00.000000
+
+A one-word edit of a short HH description moved the SimHash by up to 12
+bits, past what the four 16-bit band indexes could look up.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = 'vacancy_minhash'
+down_revision = 'applications_partitioned'
+branch_labels = None
+depends_on = None
+
+SIMHASH_BANDS = 4
+
+
+def upgrade() -> None:
+    for band in range(SIMHASH_BANDS):
+        op.drop_index(f'ix_vacancies_simhash_band{band}', table_name='vacancies')
+    op.drop_column('vacancies', 'simhash')
+
+    # Filled in at ingest, NULL rows are never reported as duplicates
+    op.add_column('vacancies', sa.Column('minhash', postgresql.ARRAY(sa.Integer()), nullable=True))
+    op.add_column('vacancies', sa.Column('minhash_bands', postgresql.ARRAY(sa.BigInteger()), nullable=True))
+    op.create_index(
+        'ix_vacancies_minhash_bands', 'vacancies', ['minhash_bands'], postgresql_using='gin'
+    )
+    # Unchanged refreshes only touch timestamps, forget the hashes so the next one writes the fingerprint
+    op.execute('UPDATE vacancies SET body_hash = NULL')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_vacancies_minhash_bands', table_name='vacancies')
+    op.drop_column('vacancies', 'minhash_bands')
+    op.drop_column('vacancies', 'minhash')
+
+    op.add_column('vacancies', sa.Column('simhash', sa.BigInteger(), nullable=True))
+    for band in range(SIMHASH_BANDS):
+        op.create_index(
+            f'ix_vacancies_simhash_band{band}',
+            'vacancies',
+            [sa.text(f'((simhash >> {band * 16}) & 65535)')],
+        )
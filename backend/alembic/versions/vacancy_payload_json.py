@@ -0,0 +1,34 @@
+"""Pre-serialized vacancy payload for search responses
+
+Revision ID: vacancy_payload_json
+Revises: vacancy_compact_storage
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'vacancy_payload_json'
+down_revision = 'vacancy_compact_storage'
+branch_labels = None
+depends_on = None
+
+
+def _supports_lz4() -> bool:
+    """PostgreSQL 14+ built with lz4; elsewhere the columns keep pglz"""
+    return bool(op.get_bind().execute(sa.text(
+        "SELECT 'lz4' = ANY(enumvals) FROM pg_settings WHERE name = 'default_toast_compression'"
+    )).scalar())
+
+
+def upgrade() -> None:
+    op.add_column('vacancies', sa.Column('payload_json', sa.Text(), nullable=True))
+    if _supports_lz4():
+        op.execute("ALTER TABLE vacancies ALTER COLUMN payload_json SET COMPRESSION lz4")
+    # jsonb text output is valid JSON, rows written later use the compact form
+    op.execute("UPDATE vacancies SET payload_json = full_data::text WHERE full_data IS NOT NULL")
+
+
+def downgrade() -> None:
+    op.drop_column('vacancies', 'payload_json')
@@ -0,0 +1,34 @@
+"""Add SimHash fingerprint and LSH band indexes to vacancies
+
+Revision ID: vacancy_simhash
+Revises: generation_metrics
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = 'vacancy_simhash'
+down_revision = 'generation_metrics'
+branch_labels = None
+depends_on = None
+
+BANDS = 4
+
+
+def upgrade() -> None:
+    # Filled in at ingest, NULL rows are never reported as duplicates
+    op.add_column('vacancies', sa.Column('simhash', sa.BigInteger(), nullable=True))
+    for band in range(BANDS):
+        op.create_index(
+            f'ix_vacancies_simhash_band{band}',
+            'vacancies',
+            [sa.text(f'((simhash >> {band * 16}) & 65535)')],
+        )
+
+
+def downgrade() -> None:
+    for band in range(BANDS):
+        op.drop_index(f'ix_vacancies_simhash_band{band}', table_name='vacancies')
+    op.drop_column('vacancies', 'simhash')
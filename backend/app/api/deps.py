@@ -53,3 +53,13 @@ def check_user_credits(user: User = Depends(get_current_user)) -> User:
             detail="Недостаточно токенов. Пожалуйста пополните"
         )
     return user
+
+def require_admin(user: User = Depends(get_current_user)) -> User:
+    """Only users listed in ADMIN_HH_USER_IDS"""
+    admins = {hh_user_id.strip() for hh_user_id in settings.ADMIN_HH_USER_IDS.split(",") if hh_user_id.strip()}
+    if user.hh_user_id not in admins:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return user
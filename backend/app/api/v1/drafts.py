@@ -0,0 +1,126 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from uuid import UUID
+import logging
+
+from ...api.deps import get_current_user, check_user_credits, get_db
+from ...core.config import settings
+from ...crud.letter_draft import LetterDraftCRUD
+from ...models.db import LetterDraft, User
+from ...models.schemas import CoverLetter
+from ...services.bulk import BulkLetterService
+from ...services.drafts import DraftService
+from ...services.hh.service import HHService
+
+router = APIRouter(prefix="/api/drafts", tags=["drafts"])
+hh_service = HHService()
+draft_service = DraftService()
+bulk_service = BulkLetterService(hh_service)
+logger = logging.getLogger(__name__)
+
+
+class DraftsRequest(BaseModel):
+    vacancy_ids: List[str]  # in the order the user picked them
+    resume_id: Optional[str] = None
+
+
+def _public_view(draft: LetterDraft) -> dict:
+    """Draft fields visible before opening, the letter itself is not included"""
+    return {
+        "draft_id": str(draft.id),
+        "vacancy_id": draft.vacancy_id,
+        "resume_id": draft.resume_id,
+        "status": draft.status,
+        "charged": draft.charged_at is not None,
+        "created_at": draft.created_at,
+    }
+
+
+@router.post("")
+async def schedule_drafts(request: DraftsRequest, user: User = Depends(check_user_credits)):
+    """Pre-generate letters for the first selected vacancies in the background"""
+    resume_id = request.resume_id
+    if not resume_id:
+        resume = await hh_service.get_user_resume(user.hh_user_id)
+        if not resume:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resume not found")
+        resume_id = resume.get("id")
+
+    return await draft_service.schedule(
+        str(user.id),
+        user.hh_user_id,
+        [{"vacancy_id": vacancy_id} for vacancy_id in request.vacancy_ids],
+        default_resume_id=resume_id,
+    )
+
+
+@router.post("/bulk")
+async def schedule_bulk_drafts(request: DraftsRequest, user: User = Depends(check_user_credits)):
+    """
+    Generate letters for many vacancies at once through a provider batch.
+
+    Cheaper than one request per letter but takes minutes to hours; the
+    drafts become ready as the batch completes and are charged when opened.
+    At most as many letters as the user has credits, within the draft budgets.
+    """
+    if not settings.AI_BATCH_PROVIDER:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Bulk letters are disabled")
+    if not request.vacancy_ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No vacancies selected")
+    if len(request.vacancy_ids) > settings.AI_BATCH_MAX_LETTERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.AI_BATCH_MAX_LETTERS} vacancies per request"
+        )
+
+    resume_id = request.resume_id
+    if not resume_id:
+        resume = await hh_service.get_user_resume(user.hh_user_id)
+        if not resume:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Resume not found")
+        resume_id = resume.get("id")
+
+    return await bulk_service.schedule(
+        str(user.id), user.hh_user_id, request.vacancy_ids, resume_id, user.credits
+    )
+
+
+@router.get("")
+async def list_drafts(
+    vacancy_ids: Optional[str] = Query(None, description="Comma separated vacancy ids"),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Drafts of the user that have not expired yet"""
+    ids = [v for v in vacancy_ids.split(",") if v] if vacancy_ids else None
+    drafts = LetterDraftCRUD.get_user_drafts(db, user.id, ids, settings.DRAFTS_MAX_AGE_HOURS)
+    return {"drafts": [_public_view(draft) for draft in drafts]}
+
+
+@router.post("/{draft_id}/open", response_model=CoverLetter)
+async def open_draft(
+    draft_id: UUID,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Get the letter of a ready draft, the first open charges one credit"""
+    draft = LetterDraftCRUD.get_by_id(db, draft_id)
+    if not draft or draft.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Draft not found")
+    if draft.status != "ready":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Draft is {draft.status}")
+
+    if not LetterDraftCRUD.charge(db, draft):
+        raise HTTPException(
+            status_code=status.HTTP_402_PAYMENT_REQUIRED,
+            detail="Недостаточно токенов. Пожалуйста пополните"
+        )
+    logger.info(f"Opened letter draft {draft_id} for user {user.id}")
+
+    return CoverLetter(
+        content=draft.content,
+        prompt_filename=draft.prompt_filename,
+        ai_model=draft.ai_model
+    )
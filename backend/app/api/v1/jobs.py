@@ -0,0 +1,58 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from typing import Dict, Any
+import json
+import logging
+
+from ...api.deps import get_current_user
+from ...core.config import settings
+from ...models.db import User
+from ...services.jobs import JobQueue
+
+router = APIRouter(prefix="/api/jobs", tags=["jobs"])
+job_queue = JobQueue()
+logger = logging.getLogger(__name__)
+
+
+def _public_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job fields visible to the client"""
+    return {
+        "job_id": job["id"],
+        "type": job["type"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "result": job.get("result"),
+        "error": job.get("error") or None,
+    }
+
+
+async def _get_own_job(job_id: str, user: User) -> Dict[str, Any]:
+    job = await job_queue.get(job_id)
+    if not job or job.get("user_id") != str(user.id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, user: User = Depends(get_current_user)):
+    """Poll job status and result"""
+    return _public_view(await _get_own_job(job_id, user))
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str, user: User = Depends(get_current_user)):
+    """Server-sent events with job state until it is done or failed"""
+    await _get_own_job(job_id, user)
+
+    async def stream():
+        async for job in job_queue.subscribe(job_id, settings.JOB_SUBSCRIBE_TIMEOUT):
+            if job.get("heartbeat"):
+                yield ": keep-alive\n\n"
+                continue
+            yield f"data: {json.dumps(_public_view(job), ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
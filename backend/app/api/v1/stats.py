@@ -1,11 +1,21 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
 from datetime import datetime, timedelta
+from ...api.deps import require_admin
 from ...core.database import get_db
+from ...core.loop_monitor import LoopLagMonitor
+from ...services.admission import admission_controller
+from ...services.employer_cache import EmployerCache
+from ...services.maintenance import REPORT_KEY
+from ...services.redis_service import RedisService
+from ...services.write_behind import LastSearchedBuffer
+from ...crud.generation_metric import GenerationMetricCRUD
+from ...crud.vacancy import VacancyCRUD
 from ...models.db import Application
 
 router = APIRouter(prefix="/api/stats", tags=["stats"])
+redis_service = RedisService()
 
 @router.get("/cover-letters")
 async def get_cover_letter_stats(db: Session = Depends(get_db)):
@@ -26,4 +36,67 @@ async def get_cover_letter_stats(db: Session = Depends(get_db)):
         "total_generated": total_count + 1000,
         "last_24h_generated": last_24h_count,
         "timestamp": datetime.utcnow().isoformat()
-    }
\ No newline at end of file
+    }
+
+@router.get("/runtime", dependencies=[Depends(require_admin)])
+async def get_runtime_stats():
+    """Event loop lag, the last_searched_at write-behind buffer, elided vacancy writes and the employer cache"""
+    return {
+        "event_loop_lag": LoopLagMonitor.snapshot(),
+        "last_searched_buffer": LastSearchedBuffer.snapshot(),
+        "vacancy_writes": dict(VacancyCRUD.write_stats),
+        "employer_cache": EmployerCache.snapshot(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.get("/admission", dependencies=[Depends(require_admin)])
+async def get_admission_stats():
+    """AI admission control: in-flight generations, queue depth and wait times"""
+    return {
+        **admission_controller.snapshot(),
+        "shared_in_use": await admission_controller.shared.in_use(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.get("/maintenance", dependencies=[Depends(require_admin)])
+async def get_maintenance_stats():
+    """Last database cleanup run: deleted rows, batches and duration per table"""
+    return {
+        "last_run": await redis_service.get_json(REPORT_KEY),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+
+
+@router.get("/generation", dependencies=[Depends(require_admin)])
+async def get_generation_stats(
+    group_by: str = Query("provider,model,prompt_filename"),
+    hours: int = Query(24, ge=1, le=24 * 90),
+    include_shadow: bool = Query(False),
+    db: Session = Depends(get_db),
+):
+    """
+    Generation latency percentiles (p50/p95/p99) and token usage per dimension.
+
+    Shadow requests (route comparison, nobody waits for them) are left out
+    unless include_shadow is set or the result is grouped by is_shadow.
+    """
+    dimensions = [d.strip() for d in group_by.split(",") if d.strip()]
+    unknown = [d for d in dimensions if d not in GenerationMetricCRUD.DIMENSIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown dimensions: {', '.join(unknown)}. "
+                   f"Allowed: {', '.join(GenerationMetricCRUD.DIMENSIONS)}"
+        )
+    
+    since = datetime.utcnow() - timedelta(hours=hours)
+    return {
+        "group_by": dimensions,
+        "since": since.isoformat(),
+        "groups": GenerationMetricCRUD.aggregate(
+            db, dimensions, since, include_shadow or "is_shadow" in dimensions
+        ),
+        "timestamp": datetime.utcnow().isoformat()
+    }
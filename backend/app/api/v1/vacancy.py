@@ -1,16 +1,24 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, Request, status
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import Optional
 from pydantic import BaseModel
 import asyncio
 from ...api.deps import get_current_user, check_user_credits, get_db
+from ...core.config import settings
 from ...core.database import SessionLocal
+from ...core.deadline import deadline_scope
 from ...crud.user import UserCRUD
 from ...crud.application import ApplicationCRUD
+from ...crud.payment import PaymentCRUD
+from ...crud.letter_draft import LetterDraftCRUD
 
 from ...models.db import User
 from ...services.hh.service import HHService
 from ...services.redis_service import RedisService
+from ...services.admission import AdmissionRejected, PRIORITY_PAID, PRIORITY_TRIAL
+from ...services.jobs import JobQueue, JobQueueFull, JOB_COVER_LETTER
+from ...services.drafts import DraftService
+from ...services.vacancy_payload import dump_search_result
 import logging
 from ...models.schemas import (
     CoverLetter,
@@ -20,6 +28,8 @@ from ...models.schemas import (
 router = APIRouter(prefix="/api", tags=["vacancy"])
 hh_service = HHService()
 redis_service = RedisService()
+job_queue = JobQueue(redis_service.redis)
+draft_service = DraftService(redis_service.redis)
 logger = logging.getLogger(__name__)
 
 
@@ -27,6 +37,40 @@ class ApplyRequest(BaseModel):
     message: str
     resume_id: Optional[str] = None
 
+
+def _get_generation_priority(user: User) -> int:
+    """Paying users are served ahead of trial users when the AI queue is busy"""
+    with SessionLocal() as db:
+        is_paid = PaymentCRUD.has_successful_payment(db, user.id)
+    return PRIORITY_PAID if is_paid else PRIORITY_TRIAL
+
+
+async def _schedule_search_drafts(user: User, result: dict, resume_id: Optional[str]):
+    """
+    Pre-generate letters for the top of the page: the order is relevance
+    when the page was ranked, HH order otherwise. Never fails the search.
+    """
+    candidates = [
+        {
+            "vacancy_id": item["id"],
+            "resume_id": resume_id or (item.get("relevance") or {}).get("resume_id"),
+        }
+        for item in result.get("items") or []
+        if not item.get("applied")
+    ]
+    if not candidates:
+        return
+    try:
+        default_resume_id = resume_id
+        if not all(c["resume_id"] for c in candidates):
+            resume = await hh_service.get_user_resume(user.hh_user_id)
+            default_resume_id = resume.get("id") if resume else None
+        result["drafts"] = await draft_service.schedule(
+            str(user.id), user.hh_user_id, candidates, default_resume_id
+        )
+    except Exception as e:
+        logger.error(f"Failed to schedule letter drafts for user {user.id}: {e}")
+
 @router.get("/vacancies")
 async def get_vacancies(
     text: Optional[str] = Query(None),
@@ -48,6 +92,9 @@ async def get_vacancies(
     saved_search_url: Optional[str] = Query(None),
     no_magic: Optional[bool] = Query(None),
     filter_applied: Optional[bool] = Query(True),
+    rank: Optional[bool] = Query(False),
+    collapse_duplicates: Optional[bool] = Query(False),
+    pregenerate: Optional[bool] = Query(False),
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
@@ -56,9 +103,13 @@ async def get_vacancies(
     # If saved_search_url is provided, use it directly
     if saved_search_url:
         result = await hh_service.search_vacancies_by_url(
-            user.hh_user_id, saved_search_url, str(user.id), filter_applied
+            user.hh_user_id, saved_search_url, str(user.id), filter_applied,
+            rank=rank, rank_resume_id=resume_id,
+            collapse_duplicates=collapse_duplicates,
         )
-        return result
+        if pregenerate and user.credits > 0:
+            await _schedule_search_drafts(user, result, resume_id)
+        return Response(dump_search_result(result), media_type="application/json")
     
     params = {"page": page, "per_page": per_page}
 
@@ -90,11 +141,20 @@ async def get_vacancies(
     if no_magic is not None:
         params["no_magic"] = "true" if no_magic else "false"
 
+    # rank=true orders the page by local relevance to resume_id (or to
+    # every resume of the user, suggesting the best one per vacancy)
     result = await hh_service.search_vacancies_with_descriptions(
-        user.hh_user_id, params, str(user.id), filter_applied
+        user.hh_user_id, params, str(user.id), filter_applied,
+        rank=rank, rank_resume_id=resume_id,
+        collapse_duplicates=collapse_duplicates,
     )
+    # Opt-in: letters for the top vacancies are generated in the background
+    # and charged only when opened
+    if pregenerate and user.credits > 0:
+        await _schedule_search_drafts(user, result, resume_id)
     
-    return result
+    # Cached vacancies are spliced from their stored JSON, not re-encoded
+    return Response(dump_search_result(result), media_type="application/json")
 
 
 @router.get("/vacancy/{vacancy_id}")
@@ -103,6 +163,17 @@ async def get_vacancy_details(vacancy_id: str, user: User = Depends(get_current_
     return await hh_service.get_vacancy_details(user.hh_user_id, vacancy_id)
 
 
+@router.get("/vacancy/{vacancy_id}/duplicate-letter")
+async def get_duplicate_letter(vacancy_id: str, user: User = Depends(get_current_user)):
+    """
+    Letter the user already sent to a near-duplicate of this vacancy (same
+    text posted again, e.g. for another city). Lets the client offer to
+    reuse it instead of paying for a new generation.
+    """
+    letter = await hh_service.find_duplicate_letter(user.hh_user_id, user.id, vacancy_id)
+    return {"letter": letter}
+
+
 @router.post("/vacancy/{vacancy_id}/generate-letter", response_model=CoverLetter)
 async def generate_letter(
     vacancy_id: str,
@@ -121,23 +192,53 @@ async def generate_letter(
     )
     
     try:
+        # A letter pre-generated in the background is returned right away, once:
+        # asking again (regenerate) generates a new one, the draft stays under /api/drafts
+        with SessionLocal() as db:
+            draft = LetterDraftCRUD.get_ready(
+                db, user.id, vacancy_id, resume_id, settings.DRAFTS_MAX_AGE_HOURS, unopened=True
+            )
+            charged = LetterDraftCRUD.charge_unopened(db, draft) if draft else None
+            if charged is False:
+                raise HTTPException(
+                    status_code=status.HTTP_402_PAYMENT_REQUIRED,
+                    detail="Failed to deduct credits"
+                )
+            if charged:
+                logger.info(f"Returned letter draft {draft.id} for vacancy {vacancy_id}")
+                return CoverLetter(
+                    content=draft.content,
+                    prompt_filename=draft.prompt_filename,
+                    ai_model=draft.ai_model
+                )
+        
         # Get vacancy details first
         # vacancy = await hh_service.get_vacancy_details(user.hh_user_id, vacancy_id)
         # vacancy_title = vacancy.get("name", "Неизвестная вакансия")
         
-        # Set timeout for the entire operation
-        generation_timeout = 75  # seconds (slightly more than AI service timeout)
+        # One deadline for the entire operation: HH requests, DB statements,
+        # admission queue and AI providers all get what is left of it
+        generation_timeout = settings.LETTER_REQUEST_DEADLINE
+        priority = _get_generation_priority(user)
         
         try:
-            # Generate letter with timeout protection at API level
-            result = await asyncio.wait_for(
-                hh_service.generate_cover_letter(
-                    user.hh_user_id, 
-                    vacancy_id, 
-                    resume_id,
-                    str(user.id)
-                ),
-                timeout=generation_timeout
+            with deadline_scope(generation_timeout):
+                # Hard stop a moment after the deadline, inner layers normally give up first
+                result = await asyncio.wait_for(
+                    hh_service.generate_cover_letter(
+                        user.hh_user_id, 
+                        vacancy_id, 
+                        resume_id,
+                        str(user.id),
+                        priority
+                    ),
+                    timeout=generation_timeout + 2
+                )
+        except AdmissionRejected as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Сервис генерации перегружен, попробуйте позже",
+                headers={"Retry-After": str(e.retry_after)}
             )
         except asyncio.TimeoutError:
             logger.error(f"Letter generation timed out after {generation_timeout}s for vacancy {vacancy_id}")
@@ -177,6 +278,47 @@ async def generate_letter(
             detail=str(e)
         )
 
+@router.post("/vacancy/{vacancy_id}/generate-letter/async")
+async def enqueue_generate_letter(
+    vacancy_id: str,
+    resume_id: Optional[str] = None,
+    user: User = Depends(check_user_credits),
+):
+    """
+    Queue cover letter generation for a background worker.
+
+    Returns a job id to poll at /api/jobs/{job_id} or to follow at
+    /api/jobs/{job_id}/events. One credit is reserved right away, so a user
+    cannot queue more letters than they have credits; the worker gives it
+    back if the job fails or only a fallback letter comes out.
+    """
+    with SessionLocal() as db:
+        if not UserCRUD.decrement_credits(db, user.id):
+            raise HTTPException(
+                status_code=status.HTTP_402_PAYMENT_REQUIRED,
+                detail="Недостаточно токенов. Пожалуйста пополните"
+            )
+    try:
+        job_id = await job_queue.enqueue(
+            JOB_COVER_LETTER,
+            {
+                "hh_user_id": user.hh_user_id,
+                "user_id": str(user.id),
+                "vacancy_id": vacancy_id,
+                "resume_id": resume_id,
+                "priority": _get_generation_priority(user),
+                "credit_reserved": True,
+            },
+            str(user.id),
+        )
+    except Exception as e:
+        with SessionLocal() as db:
+            UserCRUD.add_credits(db, user.id, 1)
+        if isinstance(e, JobQueueFull):
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+        raise
+    return {"job_id": job_id, "status": "queued"}
+
 @router.post("/vacancy/{vacancy_id}/apply")
 async def apply_to_vacancy(
     vacancy_id: str,
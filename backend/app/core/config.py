@@ -14,6 +14,8 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str = "your-secret-key"
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_HOURS: int = 24
+    # Comma separated hh_user_id of users allowed to read /api/stats internals
+    ADMIN_HH_USER_IDS: str = ""
     ROBOKASSA_MERCHANT_LOGIN: str = "hhbot"
     ROBOKASSA_PASSWORD_1: str = ""
     ROBOKASSA_PASSWORD_2: str = ""
@@ -25,6 +27,103 @@ class Settings(BaseSettings):
     HH_RETRY_COUNT: int = 3
     HH_APP_NAME: str = "hh_agent"
     HH_CONTACT_EMAIL: str = "support@hhagent.ru"
+    # AI providers in priority order, comma separated (openai, gemini)
+    AI_PROVIDERS: str = "openai,gemini"
+    AI_HEDGE_PERCENTILE: float = 0.9
+    AI_HEDGE_MIN_DELAY: float = 10.0
+    AI_HEDGE_DEFAULT_DELAY: float = 30.0
+    AI_PROVIDER_FAILURE_THRESHOLD: int = 3
+    AI_PROVIDER_COOLDOWN: int = 300
+    # OpenAI model routing: full and fast routes (model, reasoning effort),
+    # thresholds for the fast route and the share of shadow comparisons
+    OPENAI_FULL_MODEL: str = "gpt-5"
+    OPENAI_FULL_EFFORT: str = "low"
+    OPENAI_FAST_MODEL: str = "gpt-5-mini"
+    OPENAI_FAST_EFFORT: str = "minimal"
+    AI_ROUTING_SHORT_INPUT_TOKENS: int = 2500
+    AI_ROUTING_SIMPLE_COMPLEXITY: float = 0.35
+    AI_ROUTING_LATENCY_SLO: float = 30.0
+    AI_ROUTING_SHADOW_RATE: float = 0.02
+    # Bulk letters through a provider batch API: openai, fake (local stand-in) or empty (default) to disable
+    AI_BATCH_PROVIDER: str = ""
+    AI_BATCH_MAX_LETTERS: int = 200
+    AI_BATCH_POLL_INTERVAL: float = 60.0
+    AI_FAKE_BATCH_DELAY: float = 5.0
+    # Deadline for the synchronous generate-letter request, seconds
+    LETTER_REQUEST_DEADLINE: float = 75.0
+    # Admission control in front of the AI providers. AI_MAX_CONCURRENCY caps
+    # generations of all processes together (leases in Redis)
+    AI_MAX_CONCURRENCY: int = 8
+    # Slots speculative work leaves to interactive requests
+    AI_SPECULATIVE_RESERVED_SLOTS: int = 2
+    # Speculative and shadow generations per process while Redis (and so the
+    # shared cap) is unavailable
+    AI_SPECULATIVE_FALLBACK_SLOTS: int = 1
+    # Lease of a shared slot taken without a deadline, seconds
+    AI_SLOT_LEASE: float = 180.0
+    AI_MAX_QUEUE: int = 100
+    AI_INITIAL_SERVICE_TIME: float = 20.0
+    # Background jobs (Redis Streams)
+    JOB_WORKER_CONCURRENCY: int = 4
+    JOB_MAX_ATTEMPTS: int = 3
+    # Unacked jobs idle this long are retried, must exceed JOB_TIMEOUT
+    JOB_CLAIM_IDLE_MS: int = 180_000
+    # Deadline for a single job attempt, seconds
+    JOB_TIMEOUT: float = 150.0
+    JOB_RESULT_TTL: int = 3600
+    JOB_PENDING_TTL: int = 86400
+    # Jobs queued or running at most; enqueue is rejected beyond that, the
+    # stream is never trimmed (acked messages are deleted right away)
+    JOB_MAX_BACKLOG: int = 10000
+    JOB_SUBSCRIBE_TIMEOUT: int = 180
+    # Lifetime of pseudonymization mappings in Redis, matches mapping_sessions.expires_at
+    PSEUDONYM_MAPPING_TTL: int = 7 * 24 * 3600
+    # Speculative letter drafts: vacancies per request, generations per user
+    # and in total per day, hours a draft stays valid
+    DRAFTS_TOP_K: int = 3
+    DRAFTS_USER_DAILY_LIMIT: int = 10
+    DRAFTS_GLOBAL_DAILY_LIMIT: int = 2000
+    DRAFTS_MAX_AGE_HOURS: int = 24
+    # Token budgets for the per-resume and per-vacancy prompt blocks
+    PROMPT_RESUME_TOKEN_BUDGET: int = 1500
+    PROMPT_VACANCY_TOKEN_BUDGET: int = 1500
+    # Prepared resume texts by content hash, seconds
+    RESUME_PREPARED_CACHE_TTL: int = 86400
+    # Vacancy digest used in prompts instead of the full description
+    VACANCY_DIGEST_TOKEN_BUDGET: int = 600
+    # Process pool for CPU-bound work such as HTML extraction (0 = run inline)
+    CPU_POOL_WORKERS: int = 2
+    CPU_POOL_BATCH_SIZE: int = 50
+    # Smaller batches (total input characters) are processed inline
+    CPU_POOL_MIN_COST: int = 200_000
+    # Local vacancy ranking: vocabulary size and number of vacancies in IDF statistics
+    RELEVANCE_MAX_TERMS: int = 200_000
+    RELEVANCE_MAX_DOCUMENTS: int = 100_000
+    # Event loop lag sampling interval and warning threshold, seconds
+    LOOP_LAG_INTERVAL: float = 0.5
+    LOOP_LAG_WARN_THRESHOLD: float = 0.1
+    # Write-behind of vacancies.last_searched_at: flush interval (0 = write inline),
+    # ids that trigger an early flush and the most ids kept while the DB is unavailable
+    LAST_SEARCHED_FLUSH_INTERVAL: float = 5.0
+    LAST_SEARCHED_FLUSH_SIZE: int = 1000
+    LAST_SEARCHED_MAX_BUFFER: int = 50_000
+    # Cleanup of old vacancies, orphaned employers, pseudonymization sessions and drafts by the job worker:
+    # run interval (0 = off), how often workers check for a due run, lock TTL, all seconds;
+    # rows per DELETE, pause between batches and batch cap per run and table
+    MAINTENANCE_INTERVAL: int = 3600
+    MAINTENANCE_CHECK_INTERVAL: float = 60.0
+    MAINTENANCE_LOCK_TTL: int = 300
+    MAINTENANCE_BATCH_SIZE: int = 1000
+    MAINTENANCE_BATCH_PAUSE: float = 0.5
+    MAINTENANCE_MAX_BATCHES: int = 1000
+    MAINTENANCE_VACANCY_RETENTION_DAYS: int = 7
+    # In-process cache of employers served inside vacancy payloads: entries and TTL, seconds
+    EMPLOYER_CACHE_SIZE: int = 20_000
+    EMPLOYER_CACHE_TTL: int = 3600
+    # Monthly partitions of applications: months created ahead, and age in months after which
+    # a partition is rebuilt with its letters compressed (0 = never)
+    APPLICATIONS_PARTITIONS_AHEAD: int = 3
+    APPLICATIONS_COMPRESS_AFTER_MONTHS: int = 6
     @field_validator('ROBOKASSA_TEST_MODE', mode='before')
     @classmethod
     def parse_bool(cls, v):
@@ -0,0 +1,87 @@
+# app/core/cpu_pool.py
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CPUPool:
+    """
+    Shared process pool for CPU-bound work (HTML extraction and the like).
+
+    Threads do not help here because of the GIL, so batches are shipped to
+    worker processes and the event loop only awaits the result. With
+    CPU_POOL_WORKERS=0 batches run inline, which is handy for local runs.
+    """
+    _executor: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def get_executor(cls) -> Optional[ProcessPoolExecutor]:
+        """Get the shared pool, None when offloading is disabled"""
+        if settings.CPU_POOL_WORKERS <= 0:
+            return None
+        if cls._executor is None:
+            # spawn: forking a process that already runs an event loop and
+            # client threads is not safe
+            cls._executor = ProcessPoolExecutor(
+                max_workers=settings.CPU_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"CPU process pool initialized with {settings.CPU_POOL_WORKERS} workers")
+        return cls._executor
+
+    @classmethod
+    async def map_batches(
+        cls,
+        func: Callable[[List[Any]], List[Any]],
+        items: List[Any],
+        cost: Optional[int] = None,
+    ) -> List[Any]:
+        """
+        Run a batch function over items in the pool.
+
+        Items are split into one chunk per worker (at most CPU_POOL_BATCH_SIZE
+        items each) to amortize pickling, results keep the input order.
+        Batches with a `cost` (e.g. total input size) below CPU_POOL_MIN_COST
+        run inline: shipping them to a process costs more than the work.
+        """
+        if not items:
+            return []
+
+        executor = cls.get_executor()
+        if executor is None or (cost is not None and cost < settings.CPU_POOL_MIN_COST):
+            return func(items)
+
+        chunk_size = max(
+            1,
+            min(
+                settings.CPU_POOL_BATCH_SIZE,
+                -(-len(items) // settings.CPU_POOL_WORKERS),
+            ),
+        )
+        loop = asyncio.get_running_loop()
+        chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+        results = await asyncio.gather(
+            *(loop.run_in_executor(executor, func, chunk) for chunk in chunks)
+        )
+        return [item for chunk in results for item in chunk]
+
+    @classmethod
+    def warm_up(cls):
+        """Start worker processes ahead of the first request"""
+        executor = cls.get_executor()
+        if executor is not None:
+            for _ in range(settings.CPU_POOL_WORKERS):
+                executor.submit(int)
+
+    @classmethod
+    def close(cls):
+        """Shut the pool down"""
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=True, cancel_futures=True)
+            cls._executor = None
+            logger.info("CPU process pool closed")
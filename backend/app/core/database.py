@@ -1,11 +1,27 @@
-from sqlalchemy import create_engine
+import logging
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
+from ..core import deadline
 from ..core.config import settings
 
+logger = logging.getLogger(__name__)
+
 engine = create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+@event.listens_for(SessionLocal, "after_begin")
+def _apply_deadline(session, transaction, connection):
+    """Bound every statement of the transaction by the request deadline"""
+    left = deadline.remaining()
+    if left is None or connection.dialect.name != "postgresql":
+        return
+    deadline.check("database transaction")
+    # SET LOCAL ends with the transaction, pooled connections stay unaffected
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(1, int(left * 1000))}")
+
 def get_db():
     db = SessionLocal()
     try:
@@ -16,4 +32,11 @@ def get_db():
 # Create all tables
 def create_tables():
     from ..models.db import Base
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    from ..crud.application import ApplicationCRUD
+    Base.metadata.create_all(bind=engine)
+    # Partitions for this and the next months, the job worker keeps creating them ahead
+    try:
+        with SessionLocal() as db:
+            ApplicationCRUD.ensure_partitions(db, settings.APPLICATIONS_PARTITIONS_AHEAD)
+    except Exception as e:
+        logger.warning(f"Failed to create application partitions: {e}")
\ No newline at end of file
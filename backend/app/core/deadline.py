@@ -0,0 +1,61 @@
+# app/core/deadline.py
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# Absolute time.monotonic() value by which the current request must finish.
+# Tasks created inside the scope inherit it (asyncio copies the context).
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request-scoped deadline has passed"""
+
+
+def get_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+@contextmanager
+def deadline_scope(timeout: float):
+    """
+    Set the deadline `timeout` seconds from now for the enclosed code.
+
+    A nested scope can only shorten the deadline, never extend it.
+    """
+    deadline = time.monotonic() + timeout
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the deadline, None when there is none"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check(operation: str = "operation"):
+    """Raise DeadlineExceeded instead of starting work that cannot finish in time"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Deadline exceeded before {operation}")
+
+
+def timeout_for(limit: float, operation: str = "operation") -> float:
+    """
+    Timeout for a downstream call: its own limit capped by the time left.
+
+    Raises DeadlineExceeded if nothing is left.
+    """
+    check(operation)
+    left = remaining()
+    return limit if left is None else min(limit, left)
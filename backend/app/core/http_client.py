@@ -8,6 +8,8 @@ from .config import settings
 logger = logging.getLogger(__name__)
 
 class HTTPClient:
+    # Per-phase timeout of the main client, requests may lower it to fit a deadline
+    DEFAULT_TIMEOUT = 60.0
     _instance: Optional[httpx.AsyncClient] = None
     _ai_client: Optional[httpx.AsyncClient] = None  # Separate client for AI requests
     
@@ -16,12 +18,7 @@ class HTTPClient:
         """Get main HTTP client for HH API requests"""
         if cls._instance is None:
             cls._instance = httpx.AsyncClient(
-                timeout=httpx.Timeout(
-                    connect=60.0,  
-                    read=60.0,     
-                    write=60.0,    
-                    pool=60.0      
-                ),
+                timeout=httpx.Timeout(cls.DEFAULT_TIMEOUT),
                 headers={
                     "User-Agent": f"{settings.HH_APP_NAME}/1.0 ({settings.HH_CONTACT_EMAIL})",
                     "HH-User-Agent": f"{settings.HH_APP_NAME}/1.0 ({settings.HH_CONTACT_EMAIL})"
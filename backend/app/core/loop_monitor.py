@@ -0,0 +1,77 @@
+# app/core/loop_monitor.py
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """
+    Measures how long the event loop is blocked.
+
+    A background task sleeps for a fixed interval and records how late it
+    wakes up. Anything above a few milliseconds is time the loop spent in
+    synchronous code instead of serving other requests.
+    """
+    _task: Optional[asyncio.Task] = None
+    _samples: deque = deque(maxlen=1000)
+    _max_lag: float = 0.0
+    _blocked_total: float = 0.0
+    _started_at: float = 0.0
+
+    @classmethod
+    def start(cls):
+        """Start sampling on the running loop"""
+        if cls._task is None and settings.LOOP_LAG_INTERVAL > 0:
+            cls._started_at = time.monotonic()
+            cls._task = asyncio.create_task(cls._run(settings.LOOP_LAG_INTERVAL))
+            logger.info(f"Event loop lag monitor started (interval {settings.LOOP_LAG_INTERVAL}s)")
+
+    @classmethod
+    async def _run(cls, interval: float):
+        while True:
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            lag = max(0.0, time.monotonic() - expected)
+            cls._samples.append(lag)
+            cls._blocked_total += lag
+            if lag > cls._max_lag:
+                cls._max_lag = lag
+            if lag >= settings.LOOP_LAG_WARN_THRESHOLD:
+                logger.warning(f"Event loop was blocked for {lag * 1000:.0f} ms")
+
+    @classmethod
+    def snapshot(cls) -> Dict[str, Any]:
+        """Lag percentiles over the recent samples, in milliseconds"""
+        ordered = sorted(cls._samples)
+
+        def percentile(p: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2)
+
+        uptime = time.monotonic() - cls._started_at if cls._task else 0.0
+        return {
+            "running": cls._task is not None,
+            "samples": len(ordered),
+            "p50_ms": percentile(0.5),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(cls._max_lag * 1000, 2),
+            "blocked_ratio": round(cls._blocked_total / uptime, 4) if uptime else None,
+        }
+
+    @classmethod
+    async def stop(cls):
+        """Stop sampling"""
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+            logger.info("Event loop lag monitor stopped")
@@ -2,5 +2,7 @@ from .user import UserCRUD
 from .payment import PaymentCRUD
 from .vacancy import VacancyCRUD
 from .application import ApplicationCRUD
+from .letter_draft import LetterDraftCRUD
+from .employer import EmployerCRUD
 
-__all__ = ["UserCRUD", "PaymentCRUD", "VacancyCRUD", "ApplicationCRUD"]
\ No newline at end of file
+__all__ = ["UserCRUD", "PaymentCRUD", "VacancyCRUD", "ApplicationCRUD", "LetterDraftCRUD", "EmployerCRUD"]
\ No newline at end of file
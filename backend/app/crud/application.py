@@ -1,12 +1,34 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, desc
+from sqlalchemy import and_, desc, insert, text
 from typing import List, Optional
-from datetime import datetime
+from datetime import date, datetime
 from uuid import UUID, uuid4
 
 from ..models.db import Application, Mapping, MappingSession
 from ..models.schemas import ApplicationCreate
 
+PARTITION_PREFIX = "applications_p"
+# Reloption marking a partition rebuilt with compressed letters
+COMPRESSED_OPTION = "toast_tuple_target=128"
+
+
+def _month_start(value: date, offset: int = 0) -> date:
+    """First day of the month `offset` months from the one of `value`"""
+    index = value.year * 12 + value.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_name(month: date) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def _is_partitioned(db: Session) -> bool:
+    if db.bind.dialect.name != "postgresql":
+        return False
+    return bool(db.execute(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('applications')")
+    ).scalar())
+
 class ApplicationCRUD:
     @staticmethod
     def create(
@@ -63,6 +85,21 @@ class ApplicationCRUD:
         
         return [app.vacancy_id for app in applied]
 
+    @staticmethod
+    def get_latest_user_letter(
+        db: Session, user_id: UUID, vacancy_ids: List[str]
+    ) -> Optional[Application]:
+        """Most recent successful application of the user to any of the vacancies"""
+        if not vacancy_ids:
+            return None
+        return db.query(Application).filter(
+            and_(
+                Application.user_id == user_id,
+                Application.vacancy_id.in_(vacancy_ids),
+                Application.status == "success"
+            )
+        ).order_by(desc(Application.created_at)).first()
+
     @staticmethod
     def get_user_applications(
         db: Session, 
@@ -131,25 +168,22 @@ class ApplicationCRUD:
         user_id: UUID, 
         mappings: List[dict]
     ) -> None:
-        """Save pseudonymization mappings using ORM"""
+        """Save a mapping session and all its mappings in one transaction"""
         try:
-            # Create mapping session
-            mapping_session = MappingSession(
-                id=session_id,
-                user_id=user_id
+            db.execute(insert(MappingSession).values(id=session_id, user_id=user_id))
+            # One executemany, sent as a multi-row INSERT instead of a row per add()
+            db.execute(
+                insert(Mapping),
+                [
+                    {
+                        'session_id': session_id,
+                        'original_value': mapping['original'],
+                        'pseudonym': mapping['pseudonym'],
+                        'data_type': mapping['type'],
+                    }
+                    for mapping in mappings
+                ]
             )
-            db.add(mapping_session)
-            
-            # Add mappings
-            for mapping in mappings:
-                mapping_obj = Mapping(
-                    session_id=session_id,
-                    original_value=mapping['original'],
-                    pseudonym=mapping['pseudonym'],
-                    data_type=mapping['type']
-                )
-                db.add(mapping_obj)
-            
             db.commit()
             
         except Exception as e:
@@ -176,17 +210,124 @@ class ApplicationCRUD:
         ]
 
     @staticmethod
-    def cleanup_expired_mappings(db: Session) -> int:
-        """Clean up expired pseudonymization mappings"""
+    def cleanup_expired_mappings(db: Session, limit: int = 1000) -> int:
+        """
+        Delete one batch of up to `limit` expired pseudonymization sessions
+        (cascades to mappings), returns the number deleted.
+        """
         try:
-            # Delete expired mapping sessions (cascades to mappings)
-            deleted_count = db.query(MappingSession).filter(
-                MappingSession.expires_at < datetime.utcnow()
-            ).delete()
+            deleted_count = db.execute(
+                text(
+                    """
+                    DELETE FROM pseudonymization.mapping_sessions
+                    WHERE ctid = ANY(ARRAY(
+                        SELECT ctid FROM pseudonymization.mapping_sessions
+                        WHERE expires_at < now()
+                        LIMIT :limit
+                        FOR UPDATE SKIP LOCKED
+                    ))
+                    """
+                ),
+                {"limit": limit},
+            ).rowcount
             
             db.commit()
             return deleted_count
             
         except Exception as e:
             db.rollback()
-            raise e
\ No newline at end of file
+            raise e
+
+    @staticmethod
+    def ensure_partitions(db: Session, months_ahead: int = 3) -> int:
+        """
+        Create monthly partitions of applications from the current month to
+        `months_ahead` months ahead, returns the number created.
+
+        Rows of the month that already landed in the default partition are
+        moved into the new one in the same transaction.
+        """
+        if not _is_partitioned(db):
+            return 0
+        this_month = _month_start(datetime.utcnow())
+        created = 0
+        for offset in range(months_ahead + 1):
+            start, end = _month_start(this_month, offset), _month_start(this_month, offset + 1)
+            name = _partition_name(start)
+            if db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar():
+                continue
+            db.execute(text(f"CREATE TABLE {name} (LIKE applications INCLUDING DEFAULTS)"))
+            db.execute(
+                text(
+                    f"""
+                    WITH moved AS (
+                        DELETE FROM applications_default
+                        WHERE created_at >= :start AND created_at < :end
+                        RETURNING *
+                    )
+                    INSERT INTO {name} SELECT * FROM moved
+                    """
+                ),
+                {"start": start, "end": end},
+            )
+            db.execute(text(
+                f"ALTER TABLE applications ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"
+            ))
+            db.commit()
+            created += 1
+        return created
+
+    @staticmethod
+    def compress_old_partition(db: Session, after_months: int) -> int:
+        """
+        Rebuild the oldest monthly partition older than `after_months`
+        months that is not compressed yet, returns 1 if one was rebuilt.
+
+        Letters are mostly below the 2 KB TOAST threshold and stored raw; the
+        copy has toast_tuple_target=128 and message storage MAIN, so they are
+        compressed and kept inline. The copy gets its indexes, foreign keys
+        and a CHECK matching the bounds before the swap, so the parent is
+        locked only for the detach and attach, not for a scan.
+        """
+        if after_months <= 0 or not _is_partitioned(db):
+            return 0
+        cutoff = _month_start(datetime.utcnow(), -after_months)
+        partitions = db.execute(
+            text(
+                """
+                SELECT c.relname, c.reloptions FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'applications'::regclass AND c.relname LIKE :pattern
+                ORDER BY c.relname
+                """
+            ),
+            {"pattern": f"{PARTITION_PREFIX}%"},
+        ).all()
+        for name, reloptions in partitions:
+            start = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m").date()
+            end = _month_start(start, 1)
+            if end > cutoff:
+                break
+            if COMPRESSED_OPTION in (reloptions or []):
+                continue
+
+            copy = f"{name}_compressed"
+            for statement in (
+                f"LOCK TABLE {name} IN SHARE MODE",
+                f"CREATE TABLE {copy} (LIKE {name} INCLUDING ALL) WITH ({COMPRESSED_OPTION})",
+                f"ALTER TABLE {copy} ALTER COLUMN message SET STORAGE MAIN",
+                f"INSERT INTO {copy} SELECT * FROM {name}",
+                f"ALTER TABLE {copy} ADD CONSTRAINT {copy}_bounds "
+                f"CHECK (created_at >= '{start}' AND created_at < '{end}')",
+                f"ALTER TABLE {copy} ADD FOREIGN KEY (user_id) REFERENCES users (id)",
+                f"ALTER TABLE {copy} ADD FOREIGN KEY (vacancy_id) REFERENCES vacancies (id)",
+                f"ALTER TABLE applications DETACH PARTITION {name}",
+                f"DROP TABLE {name}",
+                f"ALTER TABLE {copy} RENAME TO {name}",
+                f"ALTER TABLE applications ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')",
+                f"ALTER TABLE {name} DROP CONSTRAINT {copy}_bounds",
+            ):
+                db.execute(text(statement))
+            db.commit()
+            return 1
+        return 0
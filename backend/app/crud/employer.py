@@ -0,0 +1,66 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert
+from typing import Any, Dict, List
+
+from ..models.db import Employer
+
+
+class EmployerCRUD:
+    # Employer fields served inside vacancy payloads
+    SERVED_FIELDS = ("id", "name", "alternate_url")
+
+    @staticmethod
+    def to_served(employer: Employer) -> Dict[str, Any]:
+        """Employer object as it appears in a vacancy payload"""
+        served = {field: getattr(employer, field) for field in EmployerCRUD.SERVED_FIELDS}
+        return {k: v for k, v in served.items() if v is not None}
+
+    @staticmethod
+    def upsert(db: Session, employer_data: Dict[str, Any]) -> None:
+        """
+        Insert or refresh an employer from an HH vacancy body, without commit.
+
+        The conflicting row is always updated, which also locks it against a
+        concurrent orphan cleanup until the vacancy referencing it is written.
+        """
+        values = {
+            "name": employer_data.get("name") or "",
+            "alternate_url": employer_data.get("alternate_url"),
+            "logo_url": (employer_data.get("logo_urls") or {}).get("90"),
+            "trusted": employer_data.get("trusted"),
+            "accredited_it_employer": employer_data.get("accredited_it_employer"),
+        }
+        statement = insert(Employer).values(id=employer_data["id"], **values)
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[Employer.id],
+                set_={**values, "updated_at": func.now()},
+            )
+        )
+
+    @staticmethod
+    def get_many(db: Session, employer_ids: List[str]) -> List[Employer]:
+        if not employer_ids:
+            return []
+        return db.query(Employer).filter(Employer.id.in_(employer_ids)).all()
+
+    @staticmethod
+    def delete_orphans(db: Session, limit: int = 1000) -> int:
+        """Delete one batch of up to `limit` employers without vacancies, returns the number deleted"""
+        deleted = db.execute(
+            text(
+                """
+                DELETE FROM employers
+                WHERE ctid = ANY(ARRAY(
+                    SELECT e.ctid FROM employers e
+                    WHERE NOT EXISTS (SELECT 1 FROM vacancies v WHERE v.employer_id = e.id)
+                    LIMIT :limit
+                    FOR UPDATE SKIP LOCKED
+                ))
+                """
+            ),
+            {"limit": limit},
+        ).rowcount
+        db.commit()
+        return deleted
@@ -0,0 +1,62 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case
+from typing import Any, Dict, List, Sequence
+from datetime import datetime
+from decimal import Decimal
+
+from ..models.db import GenerationMetric
+
+
+class GenerationMetricCRUD:
+    # Columns the aggregation can be grouped by
+    DIMENSIONS = ("provider", "model", "prompt_filename", "is_fallback", "route", "is_shadow")
+    # Columns reported as p50/p95/p99
+    LATENCIES = ("total_latency_ms", "provider_latency_ms", "ttft_ms", "queue_wait_ms")
+
+    @staticmethod
+    def create(db: Session, **values) -> GenerationMetric:
+        metric = GenerationMetric(**values)
+        db.add(metric)
+        db.commit()
+        return metric
+
+    @staticmethod
+    def aggregate(
+        db: Session, group_by: Sequence[str], since: datetime, include_shadow: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Latency percentiles and token usage per group since a point in time"""
+        dimensions = [getattr(GenerationMetric, name) for name in group_by]
+        columns = list(dimensions) + [
+            func.count(GenerationMetric.id).label("count"),
+            func.avg(case((GenerationMetric.is_fallback, 1), else_=0)).label("fallback_rate"),
+            func.avg(GenerationMetric.letter_length).label("avg_letter_length"),
+            func.avg(GenerationMetric.input_tokens).label("avg_input_tokens"),
+            func.avg(GenerationMetric.cached_tokens).label("avg_cached_tokens"),
+            func.avg(GenerationMetric.output_tokens).label("avg_output_tokens"),
+            func.sum(GenerationMetric.input_tokens).label("total_input_tokens"),
+            func.sum(GenerationMetric.cached_tokens).label("total_cached_tokens"),
+            func.sum(GenerationMetric.output_tokens).label("total_output_tokens"),
+        ]
+        for name in GenerationMetricCRUD.LATENCIES:
+            column = getattr(GenerationMetric, name)
+            for p in (50, 95, 99):
+                columns.append(
+                    func.percentile_cont(p / 100).within_group(column).label(f"{name}_p{p}")
+                )
+
+        query = db.query(*columns).filter(GenerationMetric.created_at >= since)
+        if not include_shadow:
+            query = query.filter(GenerationMetric.is_shadow.is_(False))
+        rows = (
+            query
+            .group_by(*dimensions)
+            .order_by(*dimensions)
+            .all()
+        )
+        return [
+            {
+                key: round(float(value), 3) if isinstance(value, (float, Decimal)) else value
+                for key, value in row._mapping.items()
+            }
+            for row in rows
+        ]
@@ -0,0 +1,194 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import update, delete, select, and_, or_, desc, func
+from sqlalchemy.dialects.postgresql import insert
+from typing import List, Optional
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from ..models.db import LetterDraft, User
+
+DRAFT_PENDING = "pending"
+DRAFT_READY = "ready"
+DRAFT_FAILED = "failed"
+
+
+class LetterDraftCRUD:
+    @staticmethod
+    def get_by_id(db: Session, draft_id: UUID) -> Optional[LetterDraft]:
+        return db.query(LetterDraft).filter(LetterDraft.id == draft_id).first()
+
+    @staticmethod
+    def get_user_drafts(
+        db: Session, user_id: UUID, vacancy_ids: Optional[List[str]] = None, max_age_hours: int = 24
+    ) -> List[LetterDraft]:
+        """Not expired drafts of the user, newest first"""
+        query = db.query(LetterDraft).filter(
+            and_(
+                LetterDraft.user_id == user_id,
+                LetterDraft.created_at >= datetime.utcnow() - timedelta(hours=max_age_hours),
+            )
+        )
+        if vacancy_ids is not None:
+            query = query.filter(LetterDraft.vacancy_id.in_(vacancy_ids))
+        return query.order_by(desc(LetterDraft.created_at)).all()
+
+    @staticmethod
+    def get_ready(
+        db: Session,
+        user_id: UUID,
+        vacancy_id: str,
+        resume_id: Optional[str],
+        max_age_hours: int = 24,
+        unopened: bool = False,
+    ) -> Optional[LetterDraft]:
+        """Ready draft for the vacancy (any resume when resume_id is None), not charged yet if `unopened`"""
+        query = db.query(LetterDraft).filter(
+            and_(
+                LetterDraft.user_id == user_id,
+                LetterDraft.vacancy_id == vacancy_id,
+                LetterDraft.status == DRAFT_READY,
+                LetterDraft.created_at >= datetime.utcnow() - timedelta(hours=max_age_hours),
+            )
+        )
+        if unopened:
+            query = query.filter(LetterDraft.charged_at.is_(None))
+        if resume_id:
+            query = query.filter(LetterDraft.resume_id == resume_id)
+        return query.order_by(desc(LetterDraft.created_at)).first()
+
+    @staticmethod
+    def create_pending(
+        db: Session, user_id: UUID, vacancy_id: str, resume_id: str, max_age_hours: int = 24
+    ) -> Optional[UUID]:
+        """
+        Reserve a draft for generation, returns its id.
+
+        A failed or expired draft for the same vacancy and resume is reset,
+        None means a live one already exists.
+        """
+        cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+        statement = insert(LetterDraft).values(
+            user_id=user_id, vacancy_id=vacancy_id, resume_id=resume_id, status=DRAFT_PENDING
+        )
+        statement = statement.on_conflict_do_update(
+            constraint="uq_letter_drafts_user_vacancy_resume",
+            set_={
+                "status": DRAFT_PENDING,
+                "content": None,
+                "error": None,
+                "job_id": None,
+                "charged_at": None,
+                "created_at": func.now(),
+                "updated_at": func.now(),
+            },
+            where=or_(
+                LetterDraft.status == DRAFT_FAILED,
+                LetterDraft.created_at < cutoff,
+            ),
+        ).returning(LetterDraft.id)
+
+        draft_id = db.execute(statement).scalar()
+        db.commit()
+        return draft_id
+
+    @staticmethod
+    def set_job(db: Session, draft_id: UUID, job_id: str) -> None:
+        db.execute(update(LetterDraft).where(LetterDraft.id == draft_id).values(job_id=job_id))
+        db.commit()
+
+    @staticmethod
+    def complete(
+        db: Session, draft_id: UUID, content: str, prompt_filename: str, ai_model: str
+    ) -> None:
+        db.execute(
+            update(LetterDraft)
+            .where(LetterDraft.id == draft_id)
+            .values(
+                status=DRAFT_READY,
+                content=content,
+                prompt_filename=prompt_filename,
+                ai_model=ai_model,
+                error=None,
+            )
+        )
+        db.commit()
+
+    @staticmethod
+    def fail(db: Session, draft_id: UUID, error: str) -> bool:
+        """Mark a pending draft failed, False if it was not pending (already finished or failed)"""
+        result = db.execute(
+            update(LetterDraft)
+            .where(LetterDraft.id == draft_id, LetterDraft.status == DRAFT_PENDING)
+            .values(status=DRAFT_FAILED, error=error)
+        )
+        db.commit()
+        return result.rowcount > 0
+
+    @staticmethod
+    def charge(db: Session, draft: LetterDraft) -> bool:
+        """
+        Charge one credit for a ready draft, once.
+
+        Returns False if the user has no credits; an already charged draft
+        is free.
+        """
+        return LetterDraftCRUD.charge_unopened(db, draft) is not False
+
+    @staticmethod
+    def charge_unopened(db: Session, draft: LetterDraft) -> Optional[bool]:
+        """
+        Charge one credit for a ready draft nobody has opened yet.
+
+        Marking the draft and decrementing credits happen in one
+        transaction, so concurrent opens cannot charge twice. Returns True
+        if this call charged it, False if the user has no credits and None
+        if the draft was already charged.
+        """
+        try:
+            marked = db.execute(
+                update(LetterDraft)
+                .where(
+                    and_(
+                        LetterDraft.id == draft.id,
+                        LetterDraft.status == DRAFT_READY,
+                        LetterDraft.charged_at.is_(None),
+                    )
+                )
+                .values(charged_at=datetime.utcnow())
+            ).rowcount
+            if not marked:
+                db.rollback()
+                return None
+
+            charged = db.execute(
+                update(User)
+                .where(and_(User.id == draft.user_id, User.credits > 0))
+                .values(credits=User.credits - 1)
+            ).rowcount
+            if not charged:
+                db.rollback()
+                return False
+
+            db.commit()
+            return True
+
+        except Exception as e:
+            db.rollback()
+            raise e
+
+    @staticmethod
+    def delete_expired(db: Session, max_age_hours: int = 24, limit: int = 1000) -> int:
+        """Delete one batch of up to `limit` drafts older than max_age_hours"""
+        cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+        batch = (
+            select(LetterDraft.id)
+            .where(LetterDraft.created_at < cutoff)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        deleted = db.execute(
+            delete(LetterDraft).where(LetterDraft.id.in_(batch))
+        ).rowcount
+        db.commit()
+        return deleted
@@ -85,4 +85,13 @@ class PaymentCRUD:
     def get_user_payments(db: Session, user_id: UUID) -> List[Payment]:
         return db.query(Payment).filter(
             Payment.user_id == user_id
-        ).order_by(Payment.created_at.desc()).all()
\ No newline at end of file
+        ).order_by(Payment.created_at.desc()).all()
+    
+    @staticmethod
+    def has_successful_payment(db: Session, user_id: UUID) -> bool:
+        return db.query(
+            db.query(Payment).filter(
+                Payment.user_id == user_id,
+                Payment.status == "success"
+            ).exists()
+        ).scalar()
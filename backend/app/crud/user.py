@@ -45,17 +45,14 @@ class UserCRUD:
     
     @staticmethod
     def decrement_credits(db: Session, user_id: UUID) -> bool:
-        user = UserCRUD.get_by_id(db, user_id)
-        if not user or user.credits <= 0:
-            return False
-        
-        db.execute(
+        """Take one credit, False if the user has none (checked in the same UPDATE)"""
+        charged = db.execute(
             update(User)
-            .where(User.id == user_id)
+            .where(User.id == user_id, User.credits > 0)
             .values(credits=User.credits - 1)
-        )
+        ).rowcount
         db.commit()
-        return True
+        return charged > 0
     
     @staticmethod
     def add_credits(db: Session, user_id: UUID, credits: int) -> Optional[User]:
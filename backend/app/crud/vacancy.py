@@ -1,10 +1,54 @@
+import hashlib
+import json
 from sqlalchemy.orm import Session
-from sqlalchemy import update, and_
+from sqlalchemy import update, text
 from typing import Optional, List, Dict, Any
 from datetime import datetime, timedelta
 from uuid import UUID
 
 from ..models.db import Vacancy
+from ..services.employer_cache import EmployerCache
+from ..services.dedup import bands, similarity, NEAR_DUPLICATE_SIMILARITY
+from ..services.digest import DIGEST_VERSION
+from ..services.vacancy_ingest import text_fields
+from ..services.vacancy_payload import StoredVacancy, dump_json
+from .employer import EmployerCRUD
+
+# HH vacancy fields used by the UI, prompts and ranking, the rest of the body is not stored
+PROJECTED_FIELDS = (
+    "id", "name", "description", "key_skills", "salary", "published_at", "alternate_url",
+    "apply_alternate_url", "area", "employer", "experience", "employment", "schedule",
+)
+# Kept keys of nested objects
+PROJECTED_NESTED = {
+    "area": ("id", "name"),
+    "employer": ("id", "name", "alternate_url"),
+    "experience": ("id", "name"),
+    "employment": ("id", "name"),
+    "schedule": ("id", "name"),
+}
+
+
+def project_vacancy(vacancy_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Subset of an HH vacancy body that is stored and served"""
+    projected = {}
+    for field in PROJECTED_FIELDS:
+        value = vacancy_data.get(field)
+        if value is None:
+            continue
+        if field in PROJECTED_NESTED and isinstance(value, dict):
+            value = {key: value[key] for key in PROJECTED_NESTED[field] if value.get(key) is not None}
+        elif field == "key_skills":
+            value = [{"name": s.get("name")} for s in value if s.get("name")]
+        projected[field] = value
+    return projected
+
+
+def _body_hash(projected: Dict[str, Any]) -> str:
+    """Hash of the stored part of the HH body; includes DIGEST_VERSION so a new digest format rewrites rows"""
+    payload = json.dumps([DIGEST_VERSION, projected], ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
 
 class VacancyCRUD:
     @staticmethod
@@ -13,25 +57,127 @@ class VacancyCRUD:
         return db.query(Vacancy).filter(Vacancy.id == vacancy_id).first()
     
     @staticmethod
-    def create_or_update(db: Session, vacancy_data: Dict[str, Any]) -> Vacancy:
-        """Create new vacancy or update existing"""
+    def to_payload(db: Session, vacancy: Vacancy) -> Dict[str, Any]:
+        """
+        Vacancy as served to the UI and prompts. The description is stored only
+        in its column, the employer only in employers (read via EmployerCache).
+        """
+        payload = {**(vacancy.full_data or {}), "description": vacancy.description or ""}
+        if vacancy.employer_id:
+            employer = EmployerCache.get(db, vacancy.employer_id)
+            if employer:
+                payload["employer"] = employer
+        return payload
+    
+    @staticmethod
+    def get_payloads(db: Session, vacancy_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        {id: {"payload", "minhash"}} for the vacancies found, one query.
+        
+        Payloads are StoredVacancy over the JSON serialized at ingest, full_data
+        is only decoded for rows written before payload_json existed.
+        """
+        if not vacancy_ids:
+            return {}
+        rows = db.query(
+            Vacancy.id, Vacancy.payload_json, Vacancy.description, Vacancy.employer_id, Vacancy.minhash
+        ).filter(Vacancy.id.in_(vacancy_ids)).all()
+        employers = EmployerCache.get_json(db, [row.employer_id for row in rows if row.employer_id])
+        legacy = [row.id for row in rows if row.payload_json is None]
+        full_data = dict(
+            db.query(Vacancy.id, Vacancy.full_data).filter(Vacancy.id.in_(legacy)).all()
+        ) if legacy else {}
+        return {
+            row.id: {
+                "payload": StoredVacancy(
+                    row.id,
+                    row.payload_json or dump_json(full_data.get(row.id) or {"id": row.id}),
+                    row.description,
+                    employers.get(row.employer_id),
+                ),
+                "minhash": row.minhash,
+            }
+            for row in rows
+        }
+    
+    # Refreshes per process: written rows and unchanged ones that only got new timestamps
+    write_stats = {"written": 0, "elided": 0}
+    
+    @staticmethod
+    def create_or_update(
+        db: Session, vacancy_data: Dict[str, Any], fields: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Create new vacancy or update existing, returns whether the row was written.
+        
+        Only project_vacancy() fields are stored, also serialized once into
+        payload_json for search responses; the employer goes to the employers
+        table and only its id stays on the vacancy. A refresh with the same projected
+        body only touches updated_at and last_searched_at, which keeps
+        full_data and the indexes untouched.
+        
+        `fields` are the text_fields() computed with the extraction in the CPU
+        pool (HHService._prepare_vacancies), they are computed here when omitted.
+        """
         vacancy_id = vacancy_data["id"]
-        existing = VacancyCRUD.get_by_id(db, vacancy_id)
+        existing = db.query(Vacancy.body_hash, Vacancy.content_hash, Vacancy.digest).filter(
+            Vacancy.id == vacancy_id
+        ).first()
+        projected = project_vacancy(vacancy_data)
+        body_hash = _body_hash(projected)
+        now = datetime.utcnow()
+        
+        if existing and existing.body_hash == body_hash:
+            db.execute(
+                update(Vacancy)
+                .where(Vacancy.id == vacancy_id)
+                .values(updated_at=now, last_searched_at=now)
+            )
+            db.commit()
+            VacancyCRUD.write_stats["elided"] += 1
+            return False
+        
+        # Description is kept only in its own column, employers with an id only in theirs
+        employer = projected.get("employer") or {}
+        employer_id = employer.get("id")
+        full_data = {
+            k: v for k, v in projected.items()
+            if k != "description" and not (k == "employer" and employer_id)
+        }
+        if fields is None:
+            fields = text_fields(vacancy_data)
         
         # Подготовка данных для сохранения
         db_data = {
             "id": vacancy_id,
             "name": vacancy_data.get("name", ""),
             "employer_name": vacancy_data.get("employer", {}).get("name"),
+            "employer_id": employer_id,
             "area_name": vacancy_data.get("area", {}).get("name"),
             "description": vacancy_data.get("description", ""),
+            "description_tokens": fields["description_tokens"],
             "experience": vacancy_data.get("experience", {}).get("name"),
             "employment": vacancy_data.get("employment", {}).get("name"),
             "schedule": vacancy_data.get("schedule", {}).get("name"),
             "key_skills": [s.get("name") for s in vacancy_data.get("key_skills", [])],
-            "full_data": vacancy_data
+            "minhash": fields["minhash"],
+            "minhash_bands": fields["minhash_bands"],
+            "content_hash": fields["content_hash"],
+            "body_hash": body_hash,
+            "full_data": full_data,
+            "payload_json": dump_json(full_data),
         }
         
+        # Digest is rebuilt only when the text changed
+        if (
+            existing
+            and existing.content_hash == db_data["content_hash"]
+            and (existing.digest is None or existing.digest.get("version") == DIGEST_VERSION)
+        ):
+            db_data["digest"] = existing.digest
+        else:
+            db_data["digest"] = fields["digest"]
+        
         # Обработка зарплаты
         if vacancy_data.get("salary"):
             salary = vacancy_data["salary"]
@@ -39,31 +185,80 @@ class VacancyCRUD:
             db_data["salary_to"] = salary.get("to")
             db_data["salary_currency"] = salary.get("currency")
         
+        if employer_id:
+            EmployerCRUD.upsert(db, vacancy_data["employer"])
+        
         if existing:
             # Обновляем существующую
-            for key, value in db_data.items():
-                setattr(existing, key, value)
-            existing.updated_at = datetime.utcnow()
-            existing.last_searched_at = datetime.utcnow()
-            db.commit()
-            db.refresh(existing)
-            return existing
+            db.execute(
+                update(Vacancy)
+                .where(Vacancy.id == vacancy_id)
+                .values(
+                    **{k: v for k, v in db_data.items() if k != "id"},
+                    updated_at=now,
+                    last_searched_at=now,
+                )
+            )
         else:
             # Создаем новую
-            vacancy = Vacancy(**db_data)
-            db.add(vacancy)
-            db.commit()
-            db.refresh(vacancy)
-            return vacancy
+            db.add(Vacancy(**db_data))
+        db.commit()
+        if employer_id:
+            EmployerCache.put(employer)
+        VacancyCRUD.write_stats["written"] += 1
+        return True
+    
+    @staticmethod
+    def get_description_tokens(db: Session, vacancy_id: str) -> Optional[int]:
+        """Get cached token count of vacancy description"""
+        row = db.query(Vacancy.description_tokens).filter(Vacancy.id == vacancy_id).first()
+        return row.description_tokens if row else None
+    
+    @staticmethod
+    def get_prompt_meta(db: Session, vacancy_id: str) -> Dict[str, Any]:
+        """Values precomputed at ingest for prompt building, one query"""
+        row = db.query(Vacancy.description_tokens, Vacancy.digest).filter(Vacancy.id == vacancy_id).first()
+        if not row:
+            return {"description_tokens": None, "digest": None}
+        return {"description_tokens": row.description_tokens, "digest": row.digest}
     
     @staticmethod
-    def update_last_searched(db: Session, vacancy_ids: List[str]) -> None:
+    def find_near_duplicates(
+        db: Session, fingerprint: Optional[List[int]], exclude_id: Optional[str] = None, limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        """
+        Vacancies with estimated similarity of at least NEAR_DUPLICATE_SIMILARITY,
+        most similar first. Candidates share an LSH band (GIN index on minhash_bands).
+        """
+        if fingerprint is None:
+            return []
+
+        query = db.query(Vacancy.id, Vacancy.name, Vacancy.minhash).filter(
+            Vacancy.minhash_bands.overlap(bands(fingerprint))
+        )
+        if exclude_id:
+            query = query.filter(Vacancy.id != exclude_id)
+
+        duplicates = []
+        for row in query.limit(limit * 4).all():
+            score = similarity(fingerprint, row.minhash)
+            if score >= NEAR_DUPLICATE_SIMILARITY:
+                duplicates.append({"id": row.id, "name": row.name, "similarity": score})
+        duplicates.sort(key=lambda d: -d["similarity"])
+        return duplicates[:limit]
+
+    @staticmethod
+    def update_last_searched(
+        db: Session, vacancy_ids: List[str], searched_at: Optional[datetime] = None
+    ) -> None:
         """Update last_searched_at for multiple vacancies"""
         if vacancy_ids:
+            # Sorted ids lock rows in the same order in concurrent batches
             db.execute(
                 update(Vacancy)
-                .where(Vacancy.id.in_(vacancy_ids))
-                .values(last_searched_at=datetime.utcnow())
+                .where(Vacancy.id.in_(sorted(set(vacancy_ids))))
+                .values(last_searched_at=searched_at or datetime.utcnow())
+                .execution_options(synchronize_session=False)
             )
             db.commit()
     
@@ -91,22 +286,29 @@ class VacancyCRUD:
         return stale_ids
     
     @staticmethod
-    def clean_old_vacancies(db: Session, days: int = 7) -> int:
-        """Delete vacancies not searched for X days"""
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        
-        # Находим старые вакансии без откликов
-        old_vacancies = db.query(Vacancy).filter(
-            and_(
-                Vacancy.last_searched_at < cutoff_date,
-                ~Vacancy.applications.any()  # Не имеют откликов
-            )
-        ).all()
-        
-        count = len(old_vacancies)
-        
-        for vacancy in old_vacancies:
-            db.delete(vacancy)
+    def clean_old_vacancies(db: Session, days: int = 7, limit: int = 1000) -> int:
+        """
+        Delete one batch of up to `limit` vacancies not searched for X days
+        and without applications, returns the number deleted.
         
+        Rows are picked by ctid in a single statement; rows locked by a
+        concurrent refresh are skipped until the next batch.
+        """
+        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        deleted = db.execute(
+            text(
+                """
+                DELETE FROM vacancies
+                WHERE ctid = ANY(ARRAY(
+                    SELECT v.ctid FROM vacancies v
+                    WHERE v.last_searched_at < :cutoff
+                      AND NOT EXISTS (SELECT 1 FROM applications a WHERE a.vacancy_id = v.id)
+                    LIMIT :limit
+                    FOR UPDATE SKIP LOCKED
+                ))
+                """
+            ),
+            {"cutoff": cutoff_date, "limit": limit},
+        ).rowcount
         db.commit()
-        return count
\ No newline at end of file
+        return deleted
@@ -27,8 +27,11 @@ logger.info(f"ROBOKASSA_TEST_MODE from settings: {settings.ROBOKASSA_TEST_MODE}"
 logger.info(f"DATABASE_URL: {'SET' if settings.DATABASE_URL else 'NOT SET'}")
 logger.info("========================")
 
-from .api.v1 import auth, vacancy, payment, user, saved_searches, stats
+from .api.v1 import auth, vacancy, payment, user, saved_searches, stats, jobs, drafts
 from .core.http_client import HTTPClient
+from .core.cpu_pool import CPUPool
+from .core.loop_monitor import LoopLagMonitor
+from .services.write_behind import LastSearchedBuffer
 
 # User-Agent Middleware для всех исходящих запросов
 class UserAgentMiddleware(BaseHTTPMiddleware):
@@ -37,11 +40,21 @@ class UserAgentMiddleware(BaseHTTPMiddleware):
         response = await call_next(request)
         return response
 
+# Startup event
+@app.on_event("startup")
+async def startup_event():
+    CPUPool.warm_up()
+    LoopLagMonitor.start()
+    LastSearchedBuffer.start()
+
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
+    await LoopLagMonitor.stop()
+    await LastSearchedBuffer.stop()
     await HTTPClient.close()
     logger.info("HTTP client closed")
+    CPUPool.close()
 
 # Статический список origins для разработки и продакшена
 origins = [
@@ -82,6 +95,8 @@ app.include_router(payment.router)
 app.include_router(user.router)
 app.include_router(saved_searches.router)
 app.include_router(stats.router)
+app.include_router(jobs.router)
+app.include_router(drafts.router)
 
 @app.get("/")
 async def root():
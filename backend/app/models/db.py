@@ -1,4 +1,6 @@
-from sqlalchemy import Column, String, Integer, DateTime, Numeric, UUID, ForeignKey, Text, JSON, text
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, Numeric, UUID, ForeignKey, Text, JSON, Boolean, Index, UniqueConstraint, text
+from sqlalchemy import DDL, event
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -37,33 +39,90 @@ class Payment(Base):
     # Relationships
     user = relationship("User", back_populates="payments")
 
+class Employer(Base):
+    """HH employer, shared by all its vacancies instead of being repeated in each payload"""
+    __tablename__ = "employers"
+    
+    id = Column(String, primary_key=True)  # HH employer ID
+    name = Column(String, nullable=False)
+    alternate_url = Column(String)
+    logo_url = Column(String)  # Логотип 90px
+    trusted = Column(Boolean)
+    accredited_it_employer = Column(Boolean)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
 class Vacancy(Base):
     __tablename__ = "vacancies"
     
     id = Column(String, primary_key=True)  # HH vacancy ID
     name = Column(String, nullable=False)
     employer_name = Column(String)
+    employer_id = Column(String, ForeignKey("employers.id"), index=True)  # Работодатель хранится один раз в employers
     area_name = Column(String)
     salary_from = Column(Integer)
     salary_to = Column(Integer)
     salary_currency = Column(String)
     description = Column(Text)  # Полное текстовое описание
+    description_tokens = Column(Integer)  # Количество токенов описания (считается при загрузке)
     key_skills = Column(JSON)  # Список навыков
     experience = Column(String)  # Требуемый опыт
     employment = Column(String)  # Тип занятости
     schedule = Column(String)  # График работы
-    full_data = Column(JSON)  # Полный ответ от HH API для дополнительных полей
+    full_data = Column(JSONB)  # Поля ответа HH для UI и промптов (crud/vacancy.project_vacancy), без описания и работодателя
+    payload_json = Column(Text)  # Те же поля, сериализованные при загрузке: поиск отдаёт их без декодирования
+    minhash = Column(ARRAY(Integer))  # MinHash текста для поиска почти-дубликатов (services/dedup.py)
+    minhash_bands = Column(ARRAY(BigInteger))  # Ключи LSH-полос MinHash, почти-дубликаты делят хотя бы один
+    content_hash = Column(String(64))  # sha256 названия, описания и навыков (services/digest.py)
+    digest = Column(JSON)  # Сжатое описание для промпта, считается один раз на content_hash
+    body_hash = Column(String(64))  # sha256 всего ответа HH, неизменённые обновления не перезаписывают строку
     
     # Метки времени
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
-    last_searched_at = Column(DateTime, server_default=func.now())
+    last_searched_at = Column(DateTime, server_default=func.now(), index=True)  # Очистка неиспользуемых вакансий
     
     # Relationships
     applications = relationship("Application", back_populates="vacancy")
 
+# LSH index: candidates are found by band key overlap (minhash_bands && ARRAY[...])
+Index("ix_vacancies_minhash_bands", Vacancy.minhash_bands, postgresql_using="gin")
+
+def _supports_lz4(ddl, target, bind, **kw) -> bool:
+    """Servers built without lz4 (some local builds) keep the default pglz"""
+    return bool(bind.exec_driver_sql(
+        "SELECT 'lz4' = ANY(enumvals) FROM pg_settings WHERE name = 'default_toast_compression'"
+    ).scalar())
+
+
+# Large values are TOASTed with LZ4: faster to compress and read than the default pglz
+event.listen(
+    Vacancy.__table__,
+    "after_create",
+    DDL(
+        "ALTER TABLE vacancies ALTER COLUMN description SET COMPRESSION lz4, "
+        "ALTER COLUMN full_data SET COMPRESSION lz4, "
+        "ALTER COLUMN payload_json SET COMPRESSION lz4"
+    ).execute_if(dialect="postgresql", callable_=_supports_lz4),
+)
+
 class Application(Base):
     __tablename__ = "applications"
+    __table_args__ = (
+        # История и счётчик за 24 часа по пользователю
+        Index("idx_applications_user_created", "user_id", "created_at"),
+        # Проверки "уже откликался": только успешные отклики
+        Index(
+            "ix_applications_user_vacancy_success", "user_id", "vacancy_id",
+            postgresql_where=text("status = 'success'"),
+        ),
+        # NOT EXISTS при очистке вакансий
+        Index("ix_applications_vacancy_id", "vacancy_id"),
+        # Общая статистика за 24 часа
+        Index("ix_applications_created_at", "created_at"),
+        # Помесячные секции по created_at (crud/application.py ensure_partitions)
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -75,16 +134,72 @@ class Application(Base):
     error_message = Column(Text)  # NEW: для хранения ошибок
     prompt_filename = Column(String)  # Какой промпт использовался для генерации
     ai_model = Column(String)  # Какая модель использовалась
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTime, primary_key=True, server_default=func.now())  # Ключ секционирования входит в PK
     
     # Relationships
     user = relationship("User", back_populates="applications")
     vacancy = relationship("Vacancy", back_populates="applications")
 
+# Rows outside the monthly partitions land here until ensure_partitions() moves them out
+event.listen(
+    Application.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS applications_default PARTITION OF applications DEFAULT").execute_if(
+        dialect="postgresql"
+    ),
+)
+
+class LetterDraft(Base):
+    """Letter generated in the background ahead of time, charged when first opened"""
+    __tablename__ = "letter_drafts"
+    __table_args__ = (
+        UniqueConstraint("user_id", "vacancy_id", "resume_id", name="uq_letter_drafts_user_vacancy_resume"),
+    )
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    vacancy_id = Column(String, nullable=False)  # без FK: черновик не должен мешать очистке вакансий
+    resume_id = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, ready, failed
+    content = Column(Text)
+    prompt_filename = Column(String)
+    ai_model = Column(String)
+    error = Column(Text)
+    job_id = Column(String)
+    charged_at = Column(DateTime)  # NULL пока пользователь не открыл письмо
+    created_at = Column(DateTime, server_default=func.now(), index=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class GenerationMetric(Base):
+    """Append-only log of cover letter generations for latency and cost analysis"""
+    __tablename__ = "generation_metrics"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    created_at = Column(DateTime, server_default=func.now(), index=True)
+    user_id = Column(UUID(as_uuid=True))  # без FK: лог не должен мешать удалению пользователей
+    provider = Column(String)
+    model = Column(String)
+    prompt_filename = Column(String)
+    route = Column(String)  # Маршрут политики выбора модели (full, fast)
+    is_shadow = Column(Boolean, nullable=False, default=False)  # Теневой запрос для сравнения маршрутов
+    letter_length = Column(Integer)  # Длина сгенерированного текста в символах
+    input_tokens = Column(Integer)
+    output_tokens = Column(Integer)
+    cached_tokens = Column(Integer)
+    queue_wait_ms = Column(Integer)  # Ожидание в admission control
+    ttft_ms = Column(Integer)  # Время до первого токена
+    provider_latency_ms = Column(Integer)  # Вызов провайдера, победившего в хедже
+    total_latency_ms = Column(Integer)  # Вся генерация, включая подготовку текста
+    is_fallback = Column(Boolean, nullable=False, default=False)
+    error = Column(Text)
+
 # Simplified Pseudonymization models
 class MappingSession(Base):
     __tablename__ = "mapping_sessions"
-    __table_args__ = {'schema': 'pseudonymization'}
+    __table_args__ = (
+        Index("idx_mapping_sessions_expires", "expires_at"),
+        {'schema': 'pseudonymization'},
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
@@ -98,7 +213,10 @@ class MappingSession(Base):
 
 class Mapping(Base):
     __tablename__ = "mappings"
-    __table_args__ = {'schema': 'pseudonymization'}
+    __table_args__ = (
+        Index("idx_mappings_session", "session_id"),
+        {'schema': 'pseudonymization'},
+    )
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     session_id = Column(UUID(as_uuid=True), ForeignKey("pseudonymization.mapping_sessions.id", ondelete="CASCADE"), nullable=False)
@@ -0,0 +1,297 @@
+# app/services/admission.py
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Lower value is served first
+PRIORITY_PAID = 0
+PRIORITY_TRIAL = 1
+# Speculative background work, only runs when nobody is waiting
+PRIORITY_SPECULATIVE = 2
+
+SHARED_SLOTS_KEY = "admission:slots"
+# Polling for a shared slot backs off between these intervals, seconds
+SHARED_POLL_MIN = 0.05
+SHARED_POLL_MAX = 1.0
+# Lease kept past the caller's deadline, covers the hard stop after it
+SHARED_LEASE_MARGIN = 10.0
+
+# Take a lease if fewer than ARGV[1] are live. Expiry uses the Redis clock,
+# so hosts with skewed clocks agree on it; leases of crashed processes expire
+_ACQUIRE_SLOT = """
+local now = redis.call('time')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+redis.call('zremrangebyscore', KEYS[1], '-inf', now)
+if redis.call('zcard', KEYS[1]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('zadd', KEYS[1], now + tonumber(ARGV[2]), ARGV[3])
+return 1
+"""
+
+# Live leases by the same Redis clock
+_COUNT_SLOTS = """
+local now = redis.call('time')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+return redis.call('zcount', KEYS[1], '(' .. now, '+inf')
+"""
+# Token of a speculative slot taken from the local fallback cap, not from Redis
+LOCAL_SPECULATIVE_LEASE = "local-speculative"
+
+
+class AdmissionRejected(Exception):
+    """Request shed before reaching the AI provider"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class SharedSlots:
+    """
+    Generation slots shared by every process (API, job and shadow workers):
+    leases in a Redis sorted set, at most `limit` live at once.
+
+    Speculative work leaves `reserved` slots to interactive requests. If
+    Redis is unavailable the lease is skipped and only the per-process
+    limit applies, generation does not stop because of it; speculative and
+    shadow work is then capped at `fallback_speculative` per process, as
+    every process would otherwise run it up to its own limit.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        reserved: int,
+        fallback_speculative: int,
+        redis_client: Optional[redis.Redis] = None,
+    ):
+        self.limit = limit
+        self.reserved = reserved
+        self.fallback_speculative = fallback_speculative
+        self.redis = redis_client or redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self.unavailable_total = 0
+        self.local_speculative = 0
+
+    async def acquire(self, priority: int, deadline: Optional[float]) -> Optional[str]:
+        """
+        Wait for a lease until `deadline`, returns its token (None when Redis
+        is unavailable, LOCAL_SPECULATIVE_LEASE for speculative work then) or
+        raises AdmissionRejected
+        """
+        limit = self.limit - self.reserved if priority >= PRIORITY_SPECULATIVE else self.limit
+        token = uuid.uuid4().hex
+        delay = SHARED_POLL_MIN
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            lease = (remaining if remaining is not None else settings.AI_SLOT_LEASE) + SHARED_LEASE_MARGIN
+            try:
+                if await self.redis.eval(_ACQUIRE_SLOT, 1, SHARED_SLOTS_KEY, max(limit, 1), lease, token):
+                    return token
+            except RedisError as e:
+                self.unavailable_total += 1
+                logger.warning(f"Shared AI slots unavailable, using the process limit only: {e}")
+                return self._acquire_local(priority)
+            if remaining is not None and remaining <= delay:
+                raise AdmissionRejected("no shared AI slot before the deadline", SHARED_POLL_MAX)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, SHARED_POLL_MAX)
+
+    def _acquire_local(self, priority: int) -> Optional[str]:
+        if priority < PRIORITY_SPECULATIVE:
+            return None
+        if self.local_speculative >= self.fallback_speculative:
+            raise AdmissionRejected("shared AI slots unavailable, speculative work is limited", SHARED_POLL_MAX)
+        self.local_speculative += 1
+        return LOCAL_SPECULATIVE_LEASE
+
+    async def release(self, token: Optional[str]):
+        if token is None:
+            return
+        if token == LOCAL_SPECULATIVE_LEASE:
+            self.local_speculative -= 1
+            return
+        try:
+            await self.redis.zrem(SHARED_SLOTS_KEY, token)
+        except RedisError as e:
+            # The lease expires on its own
+            logger.warning(f"Failed to release shared AI slot: {e}")
+
+    async def in_use(self) -> Optional[int]:
+        """Live leases, None when Redis is unavailable"""
+        try:
+            return await self.redis.eval(_COUNT_SLOTS, 1, SHARED_SLOTS_KEY)
+        except RedisError:
+            return None
+
+
+class AdmissionController:
+    """
+    Admission control in front of the AI providers.
+
+    In this process at most `max_concurrency` generations run at once, the
+    rest wait in a priority queue (paying users first, FIFO within a
+    priority). A request is rejected right away if the queue is full or its
+    estimated wait exceeds the time left until its deadline, instead of
+    timing out after holding a connection for minutes. An admitted request
+    then takes one of the `shared` slots, which cap the generations of all
+    processes together.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue: int,
+        initial_service_time: float,
+        smoothing: float = 0.2,
+        shared: Optional[SharedSlots] = None,
+    ):
+        self.shared = shared
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.smoothing = smoothing
+        self.avg_service_time = initial_service_time
+        self.in_flight = 0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._waiting = 0
+        self._seq = itertools.count()
+        self.wait_times = deque(maxlen=500)
+        self.admitted_total = 0
+        self.rejected_total = 0
+
+    def estimate_wait(self, priority: int) -> float:
+        """Expected queue wait for a new request with the given priority"""
+        if self.in_flight < self.max_concurrency and not self._waiting:
+            return 0.0
+        ahead = sum(
+            1 for p, _, f in self._waiters if p <= priority and not f.done()
+        )
+        # Requests ahead are served max_concurrency at a time
+        rounds = ahead // self.max_concurrency + 1
+        return rounds * self.avg_service_time
+
+    def _reject(self, reason: str, retry_after: float):
+        self.rejected_total += 1
+        retry_after = max(1, math.ceil(retry_after))
+        logger.warning(f"Admission rejected: {reason} (retry after {retry_after}s)")
+        raise AdmissionRejected(reason, retry_after)
+
+    async def _acquire(self, priority: int, deadline: Optional[float]):
+        if self.in_flight < self.max_concurrency and not self._waiting:
+            self.in_flight += 1
+            return
+
+        if self._waiting >= self.max_queue:
+            self._reject("AI queue is full", self.estimate_wait(priority))
+
+        estimated = self.estimate_wait(priority)
+        remaining = None if deadline is None else deadline - time.monotonic()
+        # Leave time for the generation itself, not only the queue
+        if remaining is not None and estimated + self.avg_service_time > remaining:
+            self._reject(
+                f"estimated wait {estimated:.1f}s exceeds deadline", estimated
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._waiting += 1
+        try:
+            # The slot is handed over by _release_slot(), in_flight stays the same
+            await asyncio.wait_for(future, timeout=remaining)
+        except asyncio.TimeoutError:
+            self._reject("deadline expired in AI queue", self.estimate_wait(priority))
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Got the slot at the same moment the caller gave up
+                self._release_slot()
+            raise
+        finally:
+            self._waiting -= 1
+
+    def _release_slot(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_TRIAL, deadline: Optional[float] = None):
+        """Hold a generation slot, `deadline` is a time.monotonic() value"""
+        queued_at = time.monotonic()
+        await self._acquire(priority, deadline)
+        lease = None
+        try:
+            if self.shared is not None:
+                lease = await self.shared.acquire(priority, deadline)
+        except AdmissionRejected as e:
+            self._release_slot()
+            self._reject(e.reason, self.avg_service_time)
+        except BaseException:
+            self._release_slot()
+            raise
+        started_at = time.monotonic()
+        self.admitted_total += 1
+        self.wait_times.append(started_at - queued_at)
+        try:
+            yield
+        finally:
+            service_time = time.monotonic() - started_at
+            self.avg_service_time += self.smoothing * (service_time - self.avg_service_time)
+            self._release_slot()
+            if lease is not None:
+                await self.shared.release(lease)
+
+    def snapshot(self) -> Dict[str, Any]:
+        ordered = sorted(self.wait_times)
+
+        def percentile(p: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3)
+
+        return {
+            "max_concurrency": self.max_concurrency,
+            "shared_limit": self.shared.limit if self.shared else None,
+            "shared_unavailable_total": self.shared.unavailable_total if self.shared else None,
+            "local_speculative": self.shared.local_speculative if self.shared else None,
+            "in_flight": self.in_flight,
+            "queue_depth": self._waiting,
+            "max_queue": self.max_queue,
+            "avg_service_time": round(self.avg_service_time, 2),
+            "estimated_wait": round(self.estimate_wait(PRIORITY_TRIAL), 2),
+            "wait_p50": percentile(0.5),
+            "wait_p95": percentile(0.95),
+            "admitted_total": self.admitted_total,
+            "rejected_total": self.rejected_total,
+        }
+
+
+# One controller per process: every HHService/AIService instance shares it.
+# AI_MAX_CONCURRENCY caps all processes together, one process may use all of it
+admission_controller = AdmissionController(
+    max_concurrency=settings.AI_MAX_CONCURRENCY,
+    max_queue=settings.AI_MAX_QUEUE,
+    initial_service_time=settings.AI_INITIAL_SERVICE_TIME,
+    shared=SharedSlots(
+        settings.AI_MAX_CONCURRENCY,
+        settings.AI_SPECULATIVE_RESERVED_SLOTS,
+        settings.AI_SPECULATIVE_FALLBACK_SLOTS,
+    ),
+)
@@ -1,4 +1,6 @@
+from .base import GenerationResult
 from .openai_provider import OpenAIProvider
 from .gemini_provider import GeminiProvider
+from .router import ProviderRouter
 
-__all__ = ["OpenAIProvider", "GeminiProvider"]
\ No newline at end of file
+__all__ = ["GenerationResult", "OpenAIProvider", "GeminiProvider", "ProviderRouter"]
@@ -0,0 +1,24 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass
+class GenerationResult:
+    """Provider response with token usage reported by the API"""
+    text: str
+    model: str
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    provider: Optional[str] = None
+    route: Optional[str] = None  # routing policy route, for providers that have one
+    ttft: Optional[float] = None  # seconds to the first streamed token
+    latency: Optional[float] = None  # seconds for the whole provider call
+
+    @property
+    def usage(self) -> dict:
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cached_tokens": self.cached_tokens,
+        }
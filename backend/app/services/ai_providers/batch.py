@@ -0,0 +1,182 @@
+# app/services/ai_providers/batch.py
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .base import GenerationResult
+from .routing import Route
+from ..token_budget import count_tokens
+
+logger = logging.getLogger(__name__)
+
+BATCH_IN_PROGRESS = "in_progress"
+BATCH_COMPLETED = "completed"
+# Batch API states after which nothing changes any more
+TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+@dataclass
+class BatchRequest:
+    """One letter in a batch"""
+    custom_id: str
+    system_prompt: str
+    user_prompt: str
+    route: Route
+    cache_key: Optional[str] = None
+
+
+@dataclass
+class BatchOutcome:
+    """Batch state; results and errors are filled once it is terminal"""
+    status: str
+    results: Dict[str, GenerationResult] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL_STATUSES
+
+
+class OpenAIBatchProvider:
+    """
+    OpenAI Batch API over /v1/responses.
+
+    Requests are uploaded as one JSONL file and processed within 24 hours at
+    a lower price and outside the synchronous rate limits.
+    """
+    name = "openai-batch"
+
+    def __init__(self, client):
+        self.client = client
+
+    @staticmethod
+    def _request_line(request: BatchRequest) -> str:
+        body = {
+            "model": request.route.model,
+            "instructions": request.system_prompt,
+            "input": request.user_prompt,
+            "reasoning": {"effort": request.route.effort},
+            "text": {"verbosity": "low"},
+        }
+        if request.cache_key:
+            body["prompt_cache_key"] = request.cache_key
+        return json.dumps(
+            {"custom_id": request.custom_id, "method": "POST", "url": "/v1/responses", "body": body},
+            ensure_ascii=False,
+        )
+
+    async def submit(self, requests: List[BatchRequest]) -> str:
+        data = "\n".join(self._request_line(r) for r in requests).encode("utf-8")
+        upload = await self.client.files.create(file=("letters.jsonl", data), purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=upload.id,
+            endpoint="/v1/responses",
+            completion_window="24h",
+        )
+        logger.info(f"Submitted OpenAI batch {batch.id} with {len(requests)} requests")
+        return batch.id
+
+    async def poll(self, batch_id: str) -> BatchOutcome:
+        batch = await self.client.batches.retrieve(batch_id)
+        outcome = BatchOutcome(status=batch.status)
+        if not outcome.done:
+            return outcome
+
+        # Expired and cancelled batches still return what was finished
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await self.client.files.content(file_id)
+            for line in content.text.splitlines():
+                if line.strip():
+                    self._parse_line(json.loads(line), outcome)
+        logger.info(
+            f"OpenAI batch {batch_id} {batch.status}: "
+            f"{len(outcome.results)} results, {len(outcome.errors)} errors"
+        )
+        return outcome
+
+    @staticmethod
+    def _parse_line(line: Dict[str, Any], outcome: BatchOutcome):
+        custom_id = line.get("custom_id")
+        response = line.get("response") or {}
+        body = response.get("body") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            error = line.get("error") or body.get("error") or f"status {response.get('status_code')}"
+            outcome.errors[custom_id] = str(error)[:1000]
+            return
+
+        text = "".join(
+            part.get("text", "")
+            for item in body.get("output") or []
+            if item.get("type") == "message"
+            for part in item.get("content") or []
+            if part.get("type") == "output_text"
+        ).strip()
+        if not text:
+            outcome.errors[custom_id] = "Empty response"
+            return
+
+        usage = body.get("usage") or {}
+        outcome.results[custom_id] = GenerationResult(
+            text=text,
+            model=body.get("model"),
+            input_tokens=usage.get("input_tokens"),
+            output_tokens=usage.get("output_tokens"),
+            cached_tokens=(usage.get("input_tokens_details") or {}).get("cached_tokens"),
+        )
+
+
+class FakeBatchProvider:
+    """
+    Local stand-in for a batch API, so bulk generation runs offline.
+
+    A batch completes `completion_delay` seconds after submission with a
+    template letter per request; token usage is estimated locally. State is
+    kept in the process, so submit and poll must happen in the same one
+    (the job worker does both).
+    """
+    name = "fake-batch"
+
+    def __init__(self, completion_delay: float = 5.0, failure_rate: float = 0.0):
+        self.completion_delay = completion_delay
+        self.failure_rate = failure_rate
+        self._batches: Dict[str, Dict[str, Any]] = {}
+
+    async def submit(self, requests: List[BatchRequest]) -> str:
+        batch_id = f"fake_batch_{uuid.uuid4().hex}"
+        self._batches[batch_id] = {"submitted_at": time.monotonic(), "requests": list(requests)}
+        await asyncio.sleep(0)
+        return batch_id
+
+    async def poll(self, batch_id: str) -> BatchOutcome:
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            return BatchOutcome(status="expired")
+        if time.monotonic() - batch["submitted_at"] < self.completion_delay:
+            return BatchOutcome(status=BATCH_IN_PROGRESS)
+
+        outcome = BatchOutcome(status=BATCH_COMPLETED)
+        requests = batch["requests"]
+        failures = int(len(requests) * self.failure_rate)
+        for index, request in enumerate(requests):
+            if index < failures:
+                outcome.errors[request.custom_id] = "Simulated failure"
+                continue
+            text = (
+                "Здравствуйте!\n\nМеня заинтересовала ваша вакансия, мой опыт "
+                "соответствует её требованиям. Буду рад обсудить детали."
+            )
+            outcome.results[request.custom_id] = GenerationResult(
+                text=text,
+                model=request.route.model,
+                input_tokens=count_tokens(request.system_prompt) + count_tokens(request.user_prompt),
+                output_tokens=count_tokens(text),
+                cached_tokens=0,
+            )
+        del self._batches[batch_id]
+        return outcome
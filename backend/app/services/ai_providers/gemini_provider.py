@@ -1,7 +1,12 @@
+import asyncio
 import logging
 import time
+from typing import Optional
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
+from .base import GenerationResult
+from .routing import Route
+from ...core import deadline
 
 logger = logging.getLogger(__name__)
 
@@ -13,10 +18,22 @@ class GeminiProvider:
         
         genai.configure(api_key=api_key)
         self.model = "gemini-2.5-pro"
+        self.timeout = 120  # Maximum time for AI request
         logger.info(f"Gemini provider initialized with key length: {len(api_key)}")
     
-    async def generate(self, system_prompt: str, user_prompt: str) -> str:
-        """Generate response using Google Gemini API"""
+    async def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        cache_key: Optional[str] = None,
+        route: Optional[Route] = None,
+    ) -> GenerationResult:
+        """Generate response using Google Gemini API.
+
+        The system prompt is passed as `system_instruction` so it stays an
+        identical prefix across requests and benefits from implicit caching.
+        `route` is ignored, Gemini has a single configured model.
+        """
         logger.info(f"Prompt lengths - system: {len(system_prompt)}, user: {len(user_prompt)}")
         
         start_time = time.time()
@@ -50,17 +67,27 @@ class GeminiProvider:
                     "top_p": 0.8,
                     "max_output_tokens": 10000,
                 },
-                safety_settings=safety_settings
+                safety_settings=safety_settings,
+                system_instruction=system_prompt
             )
             
-            # Combine prompts
-            full_prompt = f"{system_prompt}\n\n{user_prompt}"
-            
-            # Generate response
-            response = gemini_model.generate_content(full_prompt)
+            # Generate response, streamed to measure time to first token;
+            # bounded by the request deadline
+            timeout = deadline.timeout_for(self.timeout, "Gemini request")
+
+            async def consume_stream():
+                response = await gemini_model.generate_content_async(
+                    user_prompt, stream=True, request_options={"timeout": timeout}
+                )
+                first_chunk = time.time() - start_time
+                async for _ in response:
+                    pass
+                return response, first_chunk
+
+            response, ttft = await asyncio.wait_for(consume_stream(), timeout=timeout)
             
             elapsed = time.time() - start_time
-            logger.info(f"Gemini request completed in {elapsed:.2f}s")
+            logger.info(f"Gemini request completed in {elapsed:.2f}s (first chunk after {ttft:.2f}s)")
             
             # Check for response
             if not response.parts or not response.text:
@@ -70,16 +97,23 @@ class GeminiProvider:
             
             text = response.text.strip()
             
+            result = GenerationResult(text=text, model=self.model, ttft=ttft, latency=elapsed)
+            
             # Log token usage if available
             if hasattr(response, 'usage_metadata'):
+                usage = response.usage_metadata
+                result.input_tokens = usage.prompt_token_count
+                result.output_tokens = usage.candidates_token_count
+                result.cached_tokens = getattr(usage, 'cached_content_token_count', None)
                 logger.info(
-                    f"Gemini token usage - prompt: {response.usage_metadata.prompt_token_count}, "
-                    f"completion: {response.usage_metadata.candidates_token_count}, "
-                    f"total: {response.usage_metadata.total_token_count}"
+                    f"Gemini token usage - prompt: {usage.prompt_token_count}, "
+                    f"cached: {result.cached_tokens}, "
+                    f"completion: {usage.candidates_token_count}, "
+                    f"total: {usage.total_token_count}"
                 )
             
             logger.info(f"Generated response length: {len(text)} characters")
-            return text
+            return result
             
         except Exception as e:
             elapsed = time.time() - start_time
@@ -4,6 +4,10 @@ import time
 import asyncio
 from openai import AsyncOpenAI
 from typing import Optional
+from .base import GenerationResult
+from .routing import ModelRoutingPolicy, Route, ROUTE_FAST, ROUTE_FULL
+from ...core import deadline
+from ...core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -16,88 +20,111 @@ class OpenAIProvider:
         if not api_key:
             raise ValueError("OpenAI API key is required")
         self.api_key = api_key
-        # self.models = ["gpt-5", "gpt-5-mini", "gpt-5-nano"]
+        self.routing = ModelRoutingPolicy(
+            routes={
+                ROUTE_FULL: Route(ROUTE_FULL, settings.OPENAI_FULL_MODEL, settings.OPENAI_FULL_EFFORT),
+                ROUTE_FAST: Route(ROUTE_FAST, settings.OPENAI_FAST_MODEL, settings.OPENAI_FAST_EFFORT),
+            },
+            short_input_tokens=settings.AI_ROUTING_SHORT_INPUT_TOKENS,
+            simple_complexity=settings.AI_ROUTING_SIMPLE_COMPLEXITY,
+            latency_slo=settings.AI_ROUTING_LATENCY_SLO,
+        )
         self.timeout = 120  # Maximum time for AI request
+        # One long-lived client so keep-alive connections are reused between letters
+        self.client = AsyncOpenAI(
+            api_key=self.api_key,
+            timeout=self.timeout,
+            max_retries=2  # Limit retries
+        )
         logger.info("OpenAIProvider initialized (key length=%d)", len(api_key))
 
-    async def generate(self, system_prompt: str, user_prompt: str, model: str = "gpt-5") -> str:
+    async def generate(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        cache_key: Optional[str] = None,
+        route: Optional[Route] = None,
+    ) -> GenerationResult:
         """
-        Call Responses API with timeout protection
+        Call Responses API with timeout protection.
+
+        The static system prompt goes into `instructions` and the user prompt
+        (resume block first, vacancy block last) into `input`, so consecutive
+        requests for the same resume share a cacheable prefix. `cache_key` is
+        forwarded as `prompt_cache_key` to route them to the same cache.
+        `route` (model and reasoning effort) comes from self.routing, the
+        full route by default.
         """
-        logger.info("OpenAIProvider.generate start - model=%s", model)
+        route = route or self.routing.default
+        model = route.model
+        logger.info("OpenAIProvider.generate start - route=%s model=%s", route.name, model)
         start = time.time()
 
         try:
-            # Create client with timeout
-            client = AsyncOpenAI(
-                api_key=self.api_key,
-                timeout=self.timeout,  # Add timeout
-                max_retries=2  # Limit retries
-            )
-            
-            # Combine prompts
-            combined_input = f"{system_prompt}\n\n{user_prompt}"
             logger.info(
-                "OpenAI request prepared: system_len=%d user_len=%d",
+                "OpenAI request prepared: system_len=%d user_len=%d cache_key=%s",
                 len(system_prompt or ""),
                 len(user_prompt or ""),
+                cache_key,
             )
-            
+
+            request = {
+                "model": model,
+                "instructions": system_prompt,
+                "input": user_prompt,
+                "reasoning": {"effort": route.effort},
+                "text": {"verbosity": "low"},
+            }
+            if cache_key:
+                request["prompt_cache_key"] = cache_key
+
+            # Streamed so time to first token can be measured, the letter
+            # itself is still returned as a whole
+            ttft = None
+
+            # Never wait longer than the request deadline allows
+            timeout = deadline.timeout_for(self.timeout, "OpenAI request")
+
+            async def consume_stream():
+                nonlocal ttft
+                stream = await self.client.responses.create(**request, stream=True, timeout=timeout)
+                final = None
+                async for event in stream:
+                    if event.type == "response.output_text.delta":
+                        if ttft is None:
+                            ttft = time.time() - start
+                    elif event.type in ("response.completed", "response.incomplete"):
+                        final = event.response
+                    elif event.type in ("response.failed", "error"):
+                        raise RuntimeError(f"OpenAI stream ended with {event.type}")
+                if final is None:
+                    raise RuntimeError("OpenAI stream ended without a response")
+                return final
+
             # Wrap in asyncio timeout for additional protection
             try:
-                resp = await asyncio.wait_for(
-                    client.responses.create(
-                        model=model,
-                        input=combined_input,
-                        reasoning={"effort": "low"},  
-                        text={"verbosity": "low"}
-                    ),
-                    timeout=self.timeout
-                )
+                resp = await asyncio.wait_for(consume_stream(), timeout=timeout)
             except asyncio.TimeoutError:
-                logger.error(f"OpenAI request timed out after {self.timeout}s")
-                raise TimeoutError(f"OpenAI request timed out after {self.timeout}s")
-            finally:
-                # Always close the client
-                await client.close()
+                logger.error(f"OpenAI request timed out after {timeout:.1f}s")
+                raise TimeoutError(f"OpenAI request timed out after {timeout:.1f}s")
 
             elapsed = time.time() - start
-            logger.info("Responses API completed in %.2fs", elapsed)
-
-            # Handle response extraction (keeping your existing logic)
-            if hasattr(resp, 'output_text') and resp.output_text:
-                return resp.output_text.strip()
-            elif hasattr(resp, 'output') and resp.output:
-                if isinstance(resp.output, str):
-                    return resp.output.strip()
-                elif hasattr(resp.output, 'text'):
-                    return resp.output.text.strip()
-                elif hasattr(resp.output, 'content'):
-                    return resp.output.content.strip()
-                elif isinstance(resp.output, list):
-                    text_parts = []
-                    for item in resp.output:
-                        if item is None:
-                            continue
-                        
-                        if hasattr(item, 'text') and item.text:
-                            text_parts.append(str(item.text))
-                        elif hasattr(item, 'content') and item.content:
-                            text_parts.append(str(item.content))
-                        elif isinstance(item, str):
-                            text_parts.append(item)
-                        elif hasattr(item, 'type') and item.type == 'text' and hasattr(item, 'text'):
-                            text_parts.append(str(item.text))
-                    
-                    if text_parts:
-                        result = "".join(text_parts).strip()
-                        logger.info("Assembled response from %d text parts", len(text_parts))
-                        return result
-                    else:
-                        logger.warning("No valid text parts found in response output list")
-            
-            logger.error("Could not extract text from Responses API response")
-            raise RuntimeError("Could not extract text from Responses API response")
+            self.routing.record_latency(route, elapsed)
+            logger.info("Responses API completed in %.2fs (first token after %s s)", elapsed,
+                        f"{ttft:.2f}" if ttft is not None else "n/a")
+
+            text = self._extract_output_text(resp)
+            result = GenerationResult(
+                text=text, model=model, route=route.name, ttft=ttft, latency=elapsed,
+                **self._extract_usage(resp)
+            )
+            logger.info(
+                "OpenAI token usage - input: %s (cached: %s), output: %s",
+                result.input_tokens,
+                result.cached_tokens,
+                result.output_tokens,
+            )
+            return result
 
         except TimeoutError:
             # Re-raise timeout errors
@@ -106,3 +133,53 @@ class OpenAIProvider:
             elapsed = time.time() - start
             logger.error("OpenAI Responses API call failed after %.2fs: %s", elapsed, e, exc_info=True)
             raise
+
+    @staticmethod
+    def _extract_usage(resp) -> dict:
+        """Read input/output/cached token counts from Responses API usage"""
+        usage = getattr(resp, 'usage', None)
+        if not usage:
+            return {}
+        details = getattr(usage, 'input_tokens_details', None)
+        return {
+            "input_tokens": getattr(usage, 'input_tokens', None),
+            "output_tokens": getattr(usage, 'output_tokens', None),
+            "cached_tokens": getattr(details, 'cached_tokens', None) if details else None,
+        }
+
+    @staticmethod
+    def _extract_output_text(resp) -> str:
+        """Extract generated text from Responses API response"""
+        if hasattr(resp, 'output_text') and resp.output_text:
+            return resp.output_text.strip()
+        elif hasattr(resp, 'output') and resp.output:
+            if isinstance(resp.output, str):
+                return resp.output.strip()
+            elif hasattr(resp.output, 'text'):
+                return resp.output.text.strip()
+            elif hasattr(resp.output, 'content'):
+                return resp.output.content.strip()
+            elif isinstance(resp.output, list):
+                text_parts = []
+                for item in resp.output:
+                    if item is None:
+                        continue
+                    
+                    if hasattr(item, 'text') and item.text:
+                        text_parts.append(str(item.text))
+                    elif hasattr(item, 'content') and item.content:
+                        text_parts.append(str(item.content))
+                    elif isinstance(item, str):
+                        text_parts.append(item)
+                    elif hasattr(item, 'type') and item.type == 'text' and hasattr(item, 'text'):
+                        text_parts.append(str(item.text))
+                
+                if text_parts:
+                    result = "".join(text_parts).strip()
+                    logger.info("Assembled response from %d text parts", len(text_parts))
+                    return result
+                else:
+                    logger.warning("No valid text parts found in response output list")
+        
+        logger.error("Could not extract text from Responses API response")
+        raise RuntimeError("Could not extract text from Responses API response")
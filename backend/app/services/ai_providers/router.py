@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from ...core import deadline
+from ...core.deadline import DeadlineExceeded
+from .base import GenerationResult
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderHealth:
+    """Rolling latency and failure statistics for one provider"""
+
+    def __init__(
+        self,
+        window: int = 50,
+        failure_threshold: int = 3,
+        cooldown: float = 300.0,
+        min_samples: int = 5,
+    ):
+        self.latencies = deque(maxlen=window)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self.consecutive_failures = 0
+        self.total_requests = 0
+        self.total_failures = 0
+        self.demoted_until = 0.0
+
+    @property
+    def is_healthy(self) -> bool:
+        return time.monotonic() >= self.demoted_until
+
+    def record_success(self, latency: float):
+        self.total_requests += 1
+        self.latencies.append(latency)
+        self.consecutive_failures = 0
+
+    def record_failure(self) -> bool:
+        """
+        Register a failed call, returns True if the provider got demoted.
+
+        Failures counted up to and during a demotion are forgotten once its
+        cooldown is over: a provider back from cooldown gets the full
+        failure_threshold again.
+        """
+        if self.demoted_until and self.is_healthy:
+            self.demoted_until = 0.0
+            self.consecutive_failures = 0
+        self.total_requests += 1
+        self.total_failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold and self.is_healthy:
+            self.demoted_until = time.monotonic() + self.cooldown
+            return True
+        return False
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Latency percentile over the window, None until enough samples"""
+        if len(self.latencies) < self.min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.is_healthy,
+            "consecutive_failures": self.consecutive_failures,
+            "total_requests": self.total_requests,
+            "total_failures": self.total_failures,
+            "p50_latency": self.percentile(0.5),
+            "p95_latency": self.percentile(0.95),
+        }
+
+
+class ProviderRouter:
+    """
+    Routes generation across several providers.
+
+    The first healthy provider is the primary. If it has not answered by the
+    configured latency percentile, a hedged request goes to the next provider
+    and the first good answer wins, the other call is cancelled. Errors fail
+    over immediately. Providers that keep failing are demoted to the end of
+    the order for a cooldown period.
+    """
+
+    def __init__(
+        self,
+        providers: Dict[str, Any],
+        hedge_percentile: float = 0.9,
+        hedge_min_delay: float = 10.0,
+        hedge_default_delay: float = 30.0,
+        failure_threshold: int = 3,
+        cooldown: float = 300.0,
+    ):
+        if not providers:
+            raise ValueError("At least one AI provider is required")
+        self.providers = providers
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        self.health = {
+            name: ProviderHealth(failure_threshold=failure_threshold, cooldown=cooldown)
+            for name in providers
+        }
+
+    @property
+    def primary(self) -> str:
+        return self._ordered()[0]
+
+    def _ordered(self) -> List[str]:
+        """Provider names in configured order, demoted providers last"""
+        names = list(self.providers)
+        return [n for n in names if self.health[n].is_healthy] + [
+            n for n in names if not self.health[n].is_healthy
+        ]
+
+    def hedge_delay(self, name: str) -> float:
+        """How long to wait for a provider before hedging to the next one"""
+        observed = self.health[name].percentile(self.hedge_percentile)
+        if observed is None:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, observed)
+
+    async def _call(self, name: str, system_prompt: str, user_prompt: str, **kwargs) -> GenerationResult:
+        start = time.monotonic()
+        try:
+            result = await self.providers[name].generate(system_prompt, user_prompt, **kwargs)
+            if not result or not result.text:
+                raise RuntimeError(f"Empty response from {name}")
+        except asyncio.CancelledError:
+            # Lost the hedge race or the caller gave up - not a provider failure
+            raise
+        except DeadlineExceeded:
+            raise
+        except Exception:
+            left = deadline.remaining()
+            if left is not None and left <= 0:
+                # The caller's budget ran out (the provider timeout is capped by it),
+                # whatever the SDK raised - not a provider failure either
+                raise
+            if self.health[name].record_failure():
+                logger.warning(
+                    f"Provider {name} demoted for {self.health[name].cooldown:.0f}s "
+                    f"after {self.health[name].consecutive_failures} consecutive failures"
+                )
+            raise
+        elapsed = time.monotonic() - start
+        self.health[name].record_success(elapsed)
+        result.provider = name
+        if result.latency is None:
+            result.latency = elapsed
+        return result
+
+    async def generate(self, system_prompt: str, user_prompt: str, **kwargs) -> GenerationResult:
+        """Generate with hedging and failover, returns the first good answer"""
+        order = self._ordered()
+        remaining = iter(order)
+        tasks: Dict[asyncio.Task, str] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch() -> bool:
+            name = next(remaining, None)
+            if name is None:
+                return False
+            logger.info(f"Dispatching generation to provider {name}")
+            task = asyncio.create_task(self._call(name, system_prompt, user_prompt, **kwargs))
+            tasks[task] = name
+            return True
+
+        launch()
+        hedge_after = self.hedge_delay(order[0])
+        hedged = len(order) == 1
+
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(
+                    set(tasks),
+                    timeout=None if hedged else hedge_after,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                if not done:
+                    hedged = True
+                    logger.warning(
+                        f"Provider {tasks[next(iter(tasks))]} has not answered in "
+                        f"{hedge_after:.1f}s, sending hedged request"
+                    )
+                    launch()
+                    continue
+
+                for task in done:
+                    name = tasks.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    last_error = error
+                    logger.error(f"Provider {name} failed: {error}")
+
+                if not tasks:
+                    # Everything in flight failed - fail over to the next provider
+                    if not launch():
+                        break
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        raise last_error or RuntimeError("No AI provider available")
+
+    def health_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: health.snapshot() for name, health in self.health.items()}
@@ -0,0 +1,139 @@
+# app/services/ai_providers/routing.py
+import re
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from ..admission import PRIORITY_PAID
+
+ROUTE_FULL = "full"
+ROUTE_FAST = "fast"
+
+_CYRILLIC_RE = re.compile(r"[а-яё]", re.IGNORECASE)
+_LATIN_RE = re.compile(r"[a-z]", re.IGNORECASE)
+_BULLET_RE = re.compile(r"^\s*[-•*]|^\s*\d+[.)]", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class Route:
+    """Model and reasoning effort used for a generation"""
+    name: str
+    model: str
+    effort: str
+
+
+@dataclass
+class RoutingHints:
+    """What the policy knows about a request before sending it"""
+    input_tokens: int
+    language: str  # ru, en or other
+    complexity: float  # 0 (short plain vacancy) .. 1 (long, many requirements)
+    priority: int
+
+
+def detect_language(text: str) -> str:
+    """Dominant script of the text: ru, en or other"""
+    sample = text[:4000]
+    cyrillic = len(_CYRILLIC_RE.findall(sample))
+    latin = len(_LATIN_RE.findall(sample))
+    letters = sum(1 for c in sample if c.isalpha())
+    if not letters:
+        return "other"
+    if cyrillic / letters >= 0.5:
+        return "ru"
+    if latin / letters >= 0.8:
+        return "en"
+    return "other"
+
+
+def vacancy_complexity(vacancy_tokens: int, key_skills: int, vacancy_text: str) -> float:
+    """Rough score of how much a letter has to cover, 0..1"""
+    bullets = len(_BULLET_RE.findall(vacancy_text))
+    return round(
+        0.5 * min(1.0, vacancy_tokens / 1200)
+        + 0.3 * min(1.0, key_skills / 12)
+        + 0.2 * min(1.0, bullets / 15),
+        3,
+    )
+
+
+class ModelRoutingPolicy:
+    """
+    Picks model and reasoning effort per request.
+
+    Short, simple vacancies in Russian or English go to the fast route.
+    Paid users with complex vacancies always get the full route. Other
+    users are moved to the fast route while the full route's p95 latency
+    is above `latency_slo`. Everything else uses the full route.
+
+    Latency samples older than `max_age` seconds are ignored, so a route that
+    stopped receiving traffic is not judged by stale numbers forever.
+    """
+
+    def __init__(
+        self,
+        routes: Dict[str, Route],
+        short_input_tokens: int,
+        simple_complexity: float,
+        latency_slo: float,
+        window: int = 50,
+        min_samples: int = 5,
+        max_age: float = 600.0,
+    ):
+        self.routes = routes
+        self.short_input_tokens = short_input_tokens
+        self.simple_complexity = simple_complexity
+        self.latency_slo = latency_slo
+        self.min_samples = min_samples
+        self.max_age = max_age
+        # (time.monotonic(), latency) per route
+        self.latencies = {name: deque(maxlen=window) for name in routes}
+        self.chosen = {name: 0 for name in routes}
+
+    @property
+    def default(self) -> Route:
+        return self.routes[ROUTE_FULL]
+
+    def record_latency(self, route: Route, latency: float):
+        if route.name in self.latencies:
+            self.latencies[route.name].append((time.monotonic(), latency))
+
+    def p95(self, name: str) -> Optional[float]:
+        cutoff = time.monotonic() - self.max_age
+        samples = [latency for at, latency in self.latencies.get(name, ()) if at >= cutoff]
+        if len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def _select(self, hints: RoutingHints) -> str:
+        simple = hints.complexity <= self.simple_complexity
+        if hints.priority == PRIORITY_PAID and not simple:
+            return ROUTE_FULL
+        if hints.language in ("ru", "en") and simple and hints.input_tokens <= self.short_input_tokens:
+            return ROUTE_FAST
+        full_p95 = self.p95(ROUTE_FULL)
+        if hints.priority != PRIORITY_PAID and full_p95 is not None and full_p95 > self.latency_slo:
+            return ROUTE_FAST
+        return ROUTE_FULL
+
+    def choose(self, hints: Optional[RoutingHints]) -> Route:
+        name = self._select(hints) if hints else ROUTE_FULL
+        self.chosen[name] += 1
+        return self.routes[name]
+
+    def alternative(self, route: Route) -> Route:
+        """The route a shadow request is compared against"""
+        return self.routes[ROUTE_FAST if route.name == ROUTE_FULL else ROUTE_FULL]
+
+    def snapshot(self) -> Dict[str, Dict]:
+        return {
+            name: {
+                "model": route.model,
+                "effort": route.effort,
+                "chosen": self.chosen[name],
+                "p95_latency": self.p95(name),
+            }
+            for name, route in self.routes.items()
+        }
@@ -1,55 +1,110 @@
 # app/services/ai_service.py
 import os
-import re
 import logging
 import random
 import time
 import asyncio
-from typing import Dict, Any, Optional
+import contextvars
+import hashlib
+import uuid
+from typing import Dict, Any, List, Optional, Tuple
 from fastapi import HTTPException
 from concurrent.futures import ThreadPoolExecutor
+from ..core.config import settings
+from ..core.cpu_pool import CPUPool
+from ..core.deadline import deadline_scope, get_deadline
+from ..core.database import SessionLocal
+from ..crud.generation_metric import GenerationMetricCRUD
+from .admission import admission_controller, AdmissionRejected, PRIORITY_SPECULATIVE, PRIORITY_TRIAL
+from .resume_cache import ResumeTextCache, resume_content_hash
+from .ai_providers.batch import BatchRequest, FakeBatchProvider, OpenAIBatchProvider
+from .ai_providers.router import ProviderRouter
+from .ai_providers.routing import Route, RoutingHints, ROUTE_FULL, detect_language, vacancy_complexity
+from .text_extraction import extract_text, extract_texts
+from .token_budget import Section, count_tokens, fit_sections, fit_vacancy_text
 
 logger = logging.getLogger(__name__)
 
+# Heading of the resume block around the prepared resume text
+RESUME_BLOCK_TOKENS = 8
+
 class AIService:
     def __init__(self):
         logger.info("Initializing AI Service...")
         
-        # Provider configuration
-        self.ai_provider = 'openai'
+        # Provider configuration: first healthy provider is primary, the rest
+        # are used for hedged requests and failover
         self.generation_timeout = 120  # Total timeout for generation
         
-        # Initialize providers
-        if self.ai_provider == 'openai':
-            from .ai_providers.openai_provider import OpenAIProvider
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                logger.error("OPENAI_API_KEY environment variable is not set")
-                raise ValueError("OPENAI_API_KEY environment variable is required")
-            self.provider = OpenAIProvider(api_key)
-        elif self.ai_provider == 'gemini':
-            from .ai_providers.gemini_provider import GeminiProvider
-            api_key = os.getenv("GOOGLE_API_KEY")
-            if not api_key:
-                logger.error("GOOGLE_API_KEY environment variable is not set")
-                raise ValueError("GOOGLE_API_KEY environment variable is required")
-            self.provider = GeminiProvider(api_key)
-        else:
-            raise ValueError(f"Unknown AI provider: {self.ai_provider}")
+        providers = {}
+        for name in [p.strip() for p in settings.AI_PROVIDERS.split(",") if p.strip()]:
+            if name == 'openai':
+                from .ai_providers.openai_provider import OpenAIProvider
+                api_key = os.getenv("OPENAI_API_KEY")
+                if not api_key:
+                    logger.warning("OPENAI_API_KEY is not set, skipping OpenAI provider")
+                    continue
+                providers[name] = OpenAIProvider(api_key)
+            elif name == 'gemini':
+                from .ai_providers.gemini_provider import GeminiProvider
+                api_key = os.getenv("GOOGLE_API_KEY")
+                if not api_key:
+                    logger.warning("GOOGLE_API_KEY is not set, skipping Gemini provider")
+                    continue
+                providers[name] = GeminiProvider(api_key)
+            else:
+                raise ValueError(f"Unknown AI provider: {name}")
         
-        logger.info(f"Using AI provider: {self.ai_provider}")
+        if not providers:
+            logger.error("No AI provider API key is configured")
+            raise ValueError("OPENAI_API_KEY or GOOGLE_API_KEY environment variable is required")
+        
+        self.provider = ProviderRouter(
+            providers,
+            hedge_percentile=settings.AI_HEDGE_PERCENTILE,
+            hedge_min_delay=settings.AI_HEDGE_MIN_DELAY,
+            hedge_default_delay=settings.AI_HEDGE_DEFAULT_DELAY,
+            failure_threshold=settings.AI_PROVIDER_FAILURE_THRESHOLD,
+            cooldown=settings.AI_PROVIDER_COOLDOWN,
+        )
+        
+        logger.info(f"Using AI providers: {', '.join(providers)}")
         
         # Prompts
         self.prompts = ["new_gpt.md"]
         self.prompts_dir = os.path.join(os.path.dirname(__file__), "prompts")
         self._prompts_cache = {}
+        self._prompt_tokens = {}
+        
+        # Shadow requests on the alternative route, kept to avoid garbage collection
+        self._shadow_tasks = set()
         
         # Thread pool for CPU-bound tasks
         self.executor = ThreadPoolExecutor(max_workers=4)
         
+        self.resume_cache = ResumeTextCache()
+        
         self._validate_and_cache_prompts()
+        
+        self.batch_provider = self._create_batch_provider()
         logger.info("AI Service initialization completed successfully")
     
+    def _create_batch_provider(self):
+        """Provider for bulk letters, None when bulk mode is not available"""
+        name = settings.AI_BATCH_PROVIDER
+        if name == "fake":
+            return FakeBatchProvider(settings.AI_FAKE_BATCH_DELAY)
+        if name == "openai" and "openai" in self.provider.providers:
+            return OpenAIBatchProvider(self.provider.providers["openai"].client)
+        if name:
+            logger.warning(f"Batch provider {name} is not available, bulk letters are disabled")
+        return None
+    
+    @property
+    def ai_provider(self) -> str:
+        """Name of the provider that currently receives requests first"""
+        return self.provider.primary
+    
     def _validate_and_cache_prompts(self):
         """Validation and caching of prompts"""
         logger.info("Validating and caching prompt files...")
@@ -84,44 +139,27 @@ class AIService:
     
     def _extract_text(self, html_text: str) -> str:
         """Extract text from HTML - CPU-bound operation"""
-        if not html_text:
-            return ""
-        
-        # Remove scripts and styles
-        text = re.sub(r'<(script|style).*?>.*?</\1>', '', html_text, flags=re.DOTALL | re.IGNORECASE)
-        # Remove HTML tags
-        text = re.sub(r'<.*?>', ' ', text)
-        # Replace HTML entities
-        text = re.sub(r'&nbsp;', ' ', text)
-        text = re.sub(r'&quot;', '"', text)
-        text = re.sub(r'&amp;', '&', text)
-        text = re.sub(r'&lt;', '<', text)
-        text = re.sub(r'&gt;', '>', text)
-        # Normalize spaces
-        text = ' '.join(text.split())
-        
-        return text.strip()
+        return extract_text(html_text)
     
     async def _extract_text_async(self, html_text: str) -> str:
-        """Run CPU-bound text extraction in thread pool"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(self.executor, self._extract_text, html_text)
+        """Run CPU-bound text extraction in the shared process pool"""
+        return (await CPUPool.map_batches(extract_texts, [html_text], cost=len(html_text)))[0]
     
     def _prepare_resume_text(self, resume: dict) -> str:
-        """Prepare resume text for AI"""
+        """Prepare resume text for AI, fitted into the resume token budget"""
         if not resume:
             return ""
         
-        parts = []
+        sections = []
         
         # About section
         if resume.get('skills'):
-            parts.append(f"О себе: {resume['skills']}")
+            sections.append(Section(head="О себе: ", body=resume['skills'], priority=70, min_tokens=60))
         
-        # Work experience
+        # Work experience, HH returns it most recent first
         if resume.get('experience'):
-            parts.append("\nОпыт работы:")
-            for exp in resume['experience']:
+            sections.append(Section(head="\nОпыт работы:", priority=100))
+            for index, exp in enumerate(resume['experience']):
                 exp_parts = []
                 
                 if exp.get('company'):
@@ -133,15 +171,23 @@ class AIService:
                     if exp.get('end'):
                         period += f" по {exp['end']}"
                     exp_parts.append(period)
-                if exp.get('description'):
-                    exp_parts.append(f"Описание: {exp['description']}")
                 
-                if exp_parts:
-                    parts.append("- " + ", ".join(exp_parts))
+                description = f"Описание: {exp['description']}" if exp.get('description') else ""
+                if description and exp_parts:
+                    description = ", " + description
+                
+                if exp_parts or description:
+                    recent = index < 3
+                    sections.append(Section(
+                        head="- " + ", ".join(exp_parts),
+                        body=description,
+                        priority=90 - index * 10 if recent else 40 - index,
+                        min_tokens=80 if recent else 0,
+                    ))
         
         # Education
         if resume.get('education', {}).get('primary'):
-            parts.append("\nОбразование:")
+            sections.append(Section(head="\nОбразование:", priority=30))
             for edu in resume['education']['primary']:
                 edu_parts = []
                 
@@ -153,7 +199,7 @@ class AIService:
                     edu_parts.append(f"Год окончания: {edu['year']}")
                 
                 if edu_parts:
-                    parts.append("- " + ", ".join(edu_parts))
+                    sections.append(Section(head="- " + ", ".join(edu_parts), priority=25))
         
         # Languages
         if resume.get('language'):
@@ -163,31 +209,290 @@ class AIService:
                     lang_list.append(f"{lang['name']} - {lang['level']['name']}")
             
             if lang_list:
-                parts.append(f"\nЯзыки: {', '.join(lang_list)}")
+                sections.append(Section(head=f"\nЯзыки: {', '.join(lang_list)}", priority=60))
         
-        return '\n'.join(parts)
+        kept = fit_sections(sections, settings.PROMPT_RESUME_TOKEN_BUDGET)
+        return '\n'.join(section.render() for section in kept)
     
-    async def _prepare_vacancy_text(self, vacancy: dict) -> str:
-        """Prepare vacancy text with async HTML extraction"""
+    async def _get_resume_text(self, resume: dict) -> Tuple[str, int]:
+        """Prepared resume text and its tokens, cached by resume content"""
+        if not resume:
+            return "", 0
+        
+        content_hash = resume_content_hash(resume)
+        cached = await self.resume_cache.get(content_hash)
+        if cached is not None:
+            return cached["text"], cached["tokens"]
+        
+        loop = asyncio.get_event_loop()
+        text = await loop.run_in_executor(self.executor, self._prepare_resume_text, resume)
+        tokens = count_tokens(text)
+        if text:
+            await self.resume_cache.set(content_hash, text, tokens)
+        return text, tokens
+    
+    def _fit_vacancy_text(self, text: str, key_skills: list, known_tokens: Optional[int]) -> str:
+        """Fit vacancy text into the vacancy token budget - CPU-bound operation"""
+        return fit_vacancy_text(text, key_skills, settings.PROMPT_VACANCY_TOKEN_BUDGET, known_tokens)
+    
+    async def _prepare_vacancy_text(self, vacancy: dict, known_tokens: Optional[int] = None) -> str:
+        """Prepare vacancy text with async HTML extraction and token budgeting"""
         if not vacancy or not vacancy.get('description'):
             return ""
         
         description = vacancy['description']
         if '<' in description and '>' in description:
             # Use async text extraction for CPU-bound operation
-            return await self._extract_text_async(description)
+            description = await self._extract_text_async(description)
+            known_tokens = None
+        
+        key_skills = [s.get('name') for s in vacancy.get('key_skills') or [] if s.get('name')]
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self.executor, self._fit_vacancy_text, description, key_skills, known_tokens
+        )
+    
+    def _build_resume_block(self, resume_text: str) -> str:
+        """Per-resume part of the user prompt, identical for every vacancy"""
+        return f"""
+##Резюме кандидата:
+{resume_text}"""
+    
+    def _build_vacancy_block(self, vacancy_title: str, vacancy_text: str) -> str:
+        """Per-vacancy part of the user prompt, always placed last"""
+        return f"""
+##Позиция
+{vacancy_title}
+##Текст вакансии:
+{vacancy_text}"""
+    
+    def _prompt_cache_key(self, prompt_filename: str, resume_block: str) -> str:
+        """Stable key for the static + per-resume prompt prefix"""
+        digest = hashlib.sha256(f"{prompt_filename}\n{resume_block}".encode("utf-8")).hexdigest()
+        return f"letter:{digest[:32]}"
+    
+    async def generate_cover_letter(
+        self,
+        resume: dict,
+        vacancy: dict,
+        user_id: str,
+        vacancy_meta: Optional[dict] = None,
+        priority: int = PRIORITY_TRIAL,
+        deadline: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generate cover letter with timeout protection and fallback.
+
+        Raises AdmissionRejected when the request is shed by admission
+        control. `deadline` is a time.monotonic() value, by default the
+        request deadline from core.deadline. Every generated
+        letter (fallbacks included) is logged to generation_metrics.
+        """
+        metric = {"user_id": user_id}
+        start = time.monotonic()
+        result = None
+        try:
+            result = await self._generate_cover_letter(
+                resume, vacancy, user_id, vacancy_meta, priority, deadline, metric
+            )
+            return result
+        finally:
+            # result is None only when the request was shed or cancelled
+            if result is not None:
+                metric["is_fallback"] = result["is_fallback"]
+                metric["total_latency_ms"] = int((time.monotonic() - start) * 1000)
+                await self._record_metric(metric)
+    
+    def _routing_policy(self):
+        """Model routing policy of the OpenAI provider, None if it is not configured"""
+        return getattr(self.provider.providers.get("openai"), "routing", None)
+    
+    def _choose_route(
+        self,
+        prompt_filename: str,
+        user_tokens: int,
+        vacancy: dict,
+        vacancy_text: str,
+        priority: int,
+    ) -> Optional[Route]:
+        """Pick model and reasoning effort for this request"""
+        policy = self._routing_policy()
+        if policy is None:
+            return None
+        if prompt_filename not in self._prompt_tokens:
+            self._prompt_tokens[prompt_filename] = count_tokens(self._get_prompt(prompt_filename))
+        
+        hints = RoutingHints(
+            input_tokens=self._prompt_tokens[prompt_filename] + user_tokens,
+            language=detect_language(vacancy_text),
+            complexity=vacancy_complexity(
+                count_tokens(vacancy_text), len(vacancy.get('key_skills') or []), vacancy_text
+            ),
+            priority=priority,
+        )
+        route = policy.choose(hints)
+        logger.info(
+            f"Route {route.name} ({route.model}, effort {route.effort}) for {hints.input_tokens} "
+            f"input tokens, language {hints.language}, complexity {hints.complexity}"
+        )
+        return route
+    
+    def _maybe_shadow(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        cache_key: str,
+        route: Optional[Route],
+        user_id: str,
+        prompt_filename: str,
+    ):
+        """
+        For a sample of requests, send the same prompt to the alternative route
+        in the background. The result is only recorded in generation_metrics
+        (is_shadow) to compare routes, the user never sees it.
+        """
+        policy = self._routing_policy()
+        if policy is None or route is None or random.random() >= settings.AI_ROUTING_SHADOW_RATE:
+            return
+        shadow = self._run_shadow(
+            system_prompt, user_prompt, cache_key, policy.alternative(route), user_id, prompt_filename
+        )
+        # Fresh context: the shadow must not inherit (or be cut by) the request deadline
+        task = asyncio.create_task(shadow, context=contextvars.Context())
+        self._shadow_tasks.add(task)
+        task.add_done_callback(self._shadow_tasks.discard)
+    
+    async def _run_shadow(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        cache_key: str,
+        route: Route,
+        user_id: str,
+        prompt_filename: str,
+    ):
+        metric = {
+            "user_id": user_id,
+            "provider": "openai",
+            "prompt_filename": prompt_filename,
+            "route": route.name,
+            "is_shadow": True,
+            "is_fallback": False,
+        }
+        start = time.monotonic()
+        deadline = start + self.generation_timeout
+        try:
+            # Lowest priority: shadow work is shed first when the service is busy
+            async with admission_controller.slot(PRIORITY_SPECULATIVE, deadline):
+                metric["queue_wait_ms"] = int((time.monotonic() - start) * 1000)
+                with deadline_scope(self.generation_timeout):
+                    generation = await self.provider.providers["openai"].generate(
+                        system_prompt, user_prompt, cache_key=cache_key, route=route
+                    )
+            metric.update(
+                model=generation.model,
+                input_tokens=generation.input_tokens,
+                output_tokens=generation.output_tokens,
+                cached_tokens=generation.cached_tokens,
+                letter_length=len(generation.text),
+                ttft_ms=int(generation.ttft * 1000) if generation.ttft is not None else None,
+                provider_latency_ms=int(generation.latency * 1000) if generation.latency is not None else None,
+            )
+        except AdmissionRejected:
+            return
+        except Exception as e:
+            logger.warning(f"Shadow generation on route {route.name} failed: {e}")
+            # A real request would have fallen back to the template letter
+            metric.update(model=route.model, is_fallback=True, error=str(e)[:1000])
+        metric["total_latency_ms"] = int((time.monotonic() - start) * 1000)
+        await self._record_metric(metric)
+    
+    async def _record_metric(self, metric: Dict[str, Any]):
+        """Persist generation metrics without failing the request"""
+        def write():
+            values = dict(metric)
+            try:
+                values["user_id"] = uuid.UUID(str(values["user_id"])) if values.get("user_id") else None
+            except ValueError:
+                values["user_id"] = None
+            with SessionLocal() as db:
+                GenerationMetricCRUD.create(db, **values)
+        
+        try:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(self.executor, write)
+        except Exception as e:
+            logger.error(f"Failed to record generation metrics: {e}")
+    
+    async def build_prompt(
+        self,
+        resume: dict,
+        vacancy: dict,
+        vacancy_meta: Optional[dict],
+        prompt_filename: str,
+    ) -> Dict[str, Any]:
+        """
+        System and user prompt for one letter.
+
+        Uses the vacancy digest from `vacancy_meta` when there is one, the
+        fitted description otherwise. Returns {"error": ...} instead when the
+        resume or vacancy has no text.
+        """
+        vacancy_meta = vacancy_meta or {}
+        resume_text, resume_tokens = await self._get_resume_text(resume)
+        if vacancy_meta.get('digest'):
+            # Computed once per vacancy content at ingest, much shorter than the text
+            vacancy_text = vacancy_meta['digest']['text']
+        else:
+            vacancy_text = await self._prepare_vacancy_text(vacancy, vacancy_meta.get('description_tokens'))
+        
+        if not resume_text:
+            logger.error("Empty resume text after preparation")
+            return {"error": "empty resume text"}
         
-        return description
+        if not vacancy_text:
+            logger.error("Empty vacancy text after preparation")
+            return {"error": "empty vacancy text"}
+        logger.info(f"Text lengths - Resume: {len(resume_text)}, Vacancy: {len(vacancy_text)}")
+        
+        # Form user prompt: static instructions -> resume -> vacancy, so that
+        # letters for the same resume share the longest possible cached prefix
+        resume_block = self._build_resume_block(resume_text)
+        vacancy_block = self._build_vacancy_block(vacancy.get('name', ''), vacancy_text)
+        return {
+            "system_prompt": self._get_prompt(prompt_filename),
+            "user_prompt": resume_block + vacancy_block,
+            # The resume part is counted once per resume content
+            "user_tokens": resume_tokens + count_tokens(vacancy_block) + RESUME_BLOCK_TOKENS,
+            "cache_key": self._prompt_cache_key(prompt_filename, resume_block),
+            "vacancy_text": vacancy_text,
+        }
     
-    async def generate_cover_letter(self, resume: dict, vacancy: dict, user_id: str) -> Dict[str, Any]:
-        """Generate cover letter with timeout protection and fallback"""
+    @staticmethod
+    def sign_letter(text: str, full_name: str) -> str:
+        return f"""{text}
+
+С уважением,
+{full_name}"""
+    
+    async def _generate_cover_letter(
+        self,
+        resume: dict,
+        vacancy: dict,
+        user_id: str,
+        vacancy_meta: Optional[dict],
+        priority: int,
+        deadline: Optional[float],
+        metric: Dict[str, Any],
+    ) -> Dict[str, Any]:
         logger.info(f"Starting cover letter generation for user: {user_id}")
-        logger.info(f"Using AI provider: {self.ai_provider}")
+        logger.info(f"Primary AI provider: {self.ai_provider}")
         start_time = time.time()
         
         # Select prompt
         selected_prompt = random.choice(self.prompts)
         logger.info(f"Selected prompt: {selected_prompt}")
+        metric["prompt_filename"] = selected_prompt
         
         # Save name for fallback
         first_name = resume.get('first_name', '')
@@ -195,68 +500,186 @@ class AIService:
         full_name = f"{first_name} {last_name}".strip()
         
         try:
-            # Prepare texts asynchronously
-            resume_text = self._prepare_resume_text(resume)
-            vacancy_text = await self._prepare_vacancy_text(vacancy)
-            vacancy_title = vacancy.get('name', '')
-            
-            if not resume_text:
-                logger.error("Empty resume text after preparation")
-                return self._get_fallback_letter(vacancy, full_name, selected_prompt)
-            
-            if not vacancy_text:
-                logger.error("Empty vacancy text after preparation")
+            prompt = await self.build_prompt(resume, vacancy, vacancy_meta, selected_prompt)
+            if "error" in prompt:
+                metric["error"] = prompt["error"]
                 return self._get_fallback_letter(vacancy, full_name, selected_prompt)
-            logger.info(f"Text lengths - Resume: {len(resume_text)}, Vacancy: {len(vacancy_text)}")
+            system_prompt = prompt["system_prompt"]
+            user_prompt = prompt["user_prompt"]
+            cache_key = prompt["cache_key"]
+            vacancy_text = prompt["vacancy_text"]
             
-            # Get prompt from cache
-            system_prompt = self._get_prompt(selected_prompt)
-            
-            # Form user prompt
-            user_prompt = f"""
-##Резюме кандидата:
-{resume_text}
-##Позиция
-{vacancy_title}
-##Текст вакансии:
-{vacancy_text}"""
+            route = self._choose_route(selected_prompt, prompt["user_tokens"], vacancy, vacancy_text, priority)
+            # Known before the call so fallbacks are attributed to the route too
+            metric["route"] = route.name if route else None
             
             # Generate letter with timeout protection
             logger.info(f"Sending request to {self.ai_provider}")
             
+            if deadline is None:
+                deadline = get_deadline() or time.monotonic() + self.generation_timeout
+            
+            queued_at = time.monotonic()
             try:
-                # Add overall timeout for the AI generation
-                letter = await asyncio.wait_for(
-                    self.provider.generate(system_prompt, user_prompt),
-                    timeout=self.generation_timeout
-                )
+                async with admission_controller.slot(priority, deadline):
+                    metric["queue_wait_ms"] = int((time.monotonic() - queued_at) * 1000)
+                    # Whatever is left of the deadline after preparation and queueing;
+                    # providers read the same deadline from the context
+                    budget = max(0.0, min(self.generation_timeout, deadline - time.monotonic()))
+                    with deadline_scope(budget):
+                        generation = await asyncio.wait_for(
+                            self.provider.generate(
+                                system_prompt, user_prompt, cache_key=cache_key, route=route
+                            ),
+                            timeout=budget
+                        )
             except asyncio.TimeoutError:
-                logger.error(f"AI generation timed out after {self.generation_timeout} seconds")
+                logger.error(f"AI generation ran out of time (deadline or {self.generation_timeout}s limit)")
+                metric["error"] = "timeout"
                 # Return fallback on timeout within AI service
                 return self._get_fallback_letter(vacancy, full_name, selected_prompt)
             
-            signed_letter = f"""{letter}
-
-С уважением,
-{full_name}"""
+            metric.update(
+                provider=generation.provider,
+                model=generation.model,
+                route=generation.route,
+                letter_length=len(generation.text),
+                input_tokens=generation.input_tokens,
+                output_tokens=generation.output_tokens,
+                cached_tokens=generation.cached_tokens,
+                ttft_ms=int(generation.ttft * 1000) if generation.ttft is not None else None,
+                provider_latency_ms=int(generation.latency * 1000) if generation.latency is not None else None,
+            )
+            
+            signed_letter = self.sign_letter(generation.text, full_name)
             logger.info(f"Generated letter length: {len(signed_letter)} characters")
             
+            self._maybe_shadow(system_prompt, user_prompt, cache_key, route, user_id, selected_prompt)
+            
             total_duration = time.time() - start_time
-            logger.info(f"Cover letter generation completed in {total_duration:.2f} seconds")
+            logger.info(
+                f"Cover letter generation completed in {total_duration:.2f} seconds "
+                f"(input tokens: {generation.input_tokens}, cached: {generation.cached_tokens})"
+            )
             
             return {
                 "content": signed_letter,
                 "prompt_filename": selected_prompt,
                 "ai_model": 'secret1',
-                "ai_provider": self.ai_provider,
-                "is_fallback": False
+                "ai_provider": generation.provider,
+                "is_fallback": False,
+                "usage": generation.usage
             }
             
+        except AdmissionRejected:
+            # Shed load: the client should retry later, not get a fallback letter
+            raise
         except Exception as e:
             logger.error(f"Error during cover letter generation: {e}", exc_info=True)
+            metric["error"] = str(e)[:1000]
             # Return fallback on any error
             return self._get_fallback_letter(vacancy, full_name, selected_prompt)
     
+    async def submit_bulk(self, items: List[Dict[str, Any]]) -> Tuple[Optional[str], Dict[str, Dict[str, Any]]]:
+        """
+        Submit many letters as one provider batch job.
+
+        `items` are {"custom_id", "resume", "vacancy", "vacancy_meta"}. Returns
+        the batch id (None if nothing could be submitted) and per item what
+        collect_bulk() needs later; items whose prompt cannot be built get
+        {"error"} and are not submitted.
+        """
+        if self.batch_provider is None:
+            raise RuntimeError("Bulk letters are disabled")
+        
+        policy = self._routing_policy()
+        requests, info = [], {}
+        for item in items:
+            resume, vacancy = item["resume"], item["vacancy"]
+            prompt_filename = random.choice(self.prompts)
+            prompt = await self.build_prompt(resume, vacancy, item.get("vacancy_meta"), prompt_filename)
+            if "error" in prompt:
+                info[item["custom_id"]] = {"error": prompt["error"]}
+                continue
+            
+            if policy is not None:
+                route = self._choose_route(
+                    prompt_filename, prompt["user_tokens"], vacancy, prompt["vacancy_text"], PRIORITY_SPECULATIVE
+                )
+            else:
+                route = Route(ROUTE_FULL, settings.OPENAI_FULL_MODEL, settings.OPENAI_FULL_EFFORT)
+            requests.append(BatchRequest(
+                custom_id=item["custom_id"],
+                system_prompt=prompt["system_prompt"],
+                user_prompt=prompt["user_prompt"],
+                route=route,
+                cache_key=prompt["cache_key"],
+            ))
+            info[item["custom_id"]] = {
+                "full_name": f"{resume.get('first_name', '')} {resume.get('last_name', '')}".strip(),
+                "prompt_filename": prompt_filename,
+                "route": route.name,
+            }
+        
+        if not requests:
+            return None, info
+        batch_id = await self.batch_provider.submit(requests)
+        logger.info(f"Submitted {len(requests)} letters as batch {batch_id} ({self.batch_provider.name})")
+        return batch_id, info
+    
+    async def collect_bulk(
+        self, batch_id: str, info: Dict[str, Dict[str, Any]], user_id: str, submitted_at: float
+    ) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Results of a batch per custom id, None while it is still running.
+        
+        A result is shaped like generate_cover_letter() output, or {"error"}.
+        Every letter is recorded in generation_metrics under the batch
+        provider, so cost and latency compare with the synchronous path.
+        `submitted_at` is a time.time() value.
+        """
+        outcome = await self.batch_provider.poll(batch_id)
+        if not outcome.done:
+            return None
+        
+        total_latency_ms = int((time.time() - submitted_at) * 1000)
+        results = {}
+        for custom_id, item in info.items():
+            if "error" in item:
+                results[custom_id] = item
+                continue
+            
+            generation = outcome.results.get(custom_id)
+            metric = {
+                "user_id": user_id,
+                "provider": self.batch_provider.name,
+                "prompt_filename": item["prompt_filename"],
+                "route": item["route"],
+                "total_latency_ms": total_latency_ms,
+            }
+            if generation is None:
+                error = outcome.errors.get(custom_id) or f"Batch {outcome.status} without a result"
+                results[custom_id] = {"error": error}
+                metric.update(is_fallback=True, error=error)
+            else:
+                results[custom_id] = {
+                    "content": self.sign_letter(generation.text, item["full_name"]),
+                    "prompt_filename": item["prompt_filename"],
+                    "ai_model": 'secret1',
+                    "ai_provider": self.batch_provider.name,
+                    "is_fallback": False,
+                    "usage": generation.usage,
+                }
+                metric.update(
+                    model=generation.model,
+                    is_fallback=False,
+                    letter_length=len(generation.text),
+                    **generation.usage,
+                )
+            await self._record_metric(metric)
+        
+        return results
+    
     def _get_fallback_letter(self, vacancy: dict, full_name: str, 
                             prompt_filename: str) -> Dict[str, Any]:
         """Generate fallback letter on error"""
@@ -0,0 +1,235 @@
+# app/services/bulk.py
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import redis.asyncio as redis
+from fastapi import HTTPException
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..crud.letter_draft import LetterDraftCRUD
+from .drafts import DraftService, budget_day
+from .jobs import JobQueue, JobQueueFull, JOB_BULK_LETTERS
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_BATCHES_KEY = "bulk:active"
+# Longer than the 24h completion window of provider batch APIs
+BATCH_RECORD_TTL = 2 * 86400
+POLL_LOCK_TTL = 300
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+# Concurrent vacancy fetches while preparing a batch
+FETCH_CONCURRENCY = 5
+
+
+def _batch_key(batch_id: str) -> str:
+    return f"bulk:{batch_id}"
+
+
+class BulkLetterService:
+    """
+    Overnight generation of many letters through a provider batch API.
+
+    The API creates pending drafts and queues one JOB_BULK_LETTERS job; the
+    job worker builds the prompts and submits them as a single batch, then
+    its poller collects the results into the drafts. Drafts are charged when
+    opened, like speculative ones, and take from the same daily budgets;
+    drafts that fail give their generation back to the budgets of the day
+    they were reserved on.
+    """
+
+    def __init__(self, hh_service=None, redis_client: Optional[redis.Redis] = None):
+        self.hh_service = hh_service
+        self.redis = redis_client or redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self.job_queue = JobQueue(self.redis)
+        self.draft_service = DraftService(self.redis)
+
+    async def schedule(
+        self, user_id: str, hh_user_id: str, vacancy_ids: List[str], resume_id: str, credits: int
+    ) -> Dict[str, Any]:
+        """
+        Reserve drafts for the vacancies and queue the bulk job.
+
+        Only the first `credits` vacancies are taken (more drafts could not be
+        opened) and only as many as the draft budgets allow. Vacancies that
+        already have a live draft are skipped and do not use the budget.
+        """
+        wanted = list(dict.fromkeys(vacancy_ids))[:max(credits, 0)]
+        day = budget_day()
+        granted = await self.draft_service.reserve_budget(user_id, len(wanted)) if wanted else 0
+        budget_exhausted = granted < len(wanted)
+        if budget_exhausted:
+            logger.info(f"Draft budget allows {granted} of {len(wanted)} bulk letters for user {user_id}")
+
+        drafts, skipped = [], []
+        with SessionLocal() as db:
+            for vacancy_id in wanted[:granted]:
+                draft_id = LetterDraftCRUD.create_pending(
+                    db, UUID(user_id), vacancy_id, resume_id, settings.DRAFTS_MAX_AGE_HOURS
+                )
+                if draft_id is None:
+                    skipped.append(vacancy_id)
+                else:
+                    drafts.append({"draft_id": str(draft_id), "vacancy_id": vacancy_id})
+        if skipped:
+            await self.draft_service.release_budget(user_id, len(skipped), day)
+
+        if not drafts:
+            return {"job_id": None, "drafts": [], "skipped": skipped, "budget_exhausted": budget_exhausted}
+
+        try:
+            job_id = await self.job_queue.enqueue(
+                JOB_BULK_LETTERS,
+                {
+                    "user_id": user_id, "hh_user_id": hh_user_id, "resume_id": resume_id,
+                    "drafts": drafts, "budget_day": day,
+                },
+                user_id,
+            )
+        except JobQueueFull as e:
+            await self.fail_drafts(user_id, [draft["draft_id"] for draft in drafts], str(e), day)
+            raise HTTPException(status_code=503, detail=str(e))
+        with SessionLocal() as db:
+            for draft in drafts:
+                LetterDraftCRUD.set_job(db, draft["draft_id"], job_id)
+
+        logger.info(f"Queued bulk job {job_id} with {len(drafts)} letters for user {user_id}")
+        return {"job_id": job_id, "drafts": drafts, "skipped": skipped, "budget_exhausted": budget_exhausted}
+
+    async def fail_drafts(self, user_id: str, draft_ids: List[str], error: str, day: Optional[str]):
+        """Mark pending drafts failed and give their generations back to the budgets of `day`"""
+        with SessionLocal() as db:
+            failed = sum(LetterDraftCRUD.fail(db, draft_id, error) for draft_id in draft_ids)
+        await self.draft_service.release_budget(user_id, failed, day)
+
+    async def submit(self, payload: Dict[str, Any]) -> Optional[str]:
+        """Build prompts for the drafts of a bulk job and submit them as one batch"""
+        ai_service = self.hh_service.ai_service
+        drafts = payload["drafts"]
+        draft_ids = [draft["draft_id"] for draft in drafts]
+        user_id, day = payload["user_id"], payload.get("budget_day")
+
+        resume = await self.hh_service.get_user_resume(payload["hh_user_id"], payload["resume_id"])
+        if not resume:
+            await self.fail_drafts(user_id, draft_ids, "Resume not found", day)
+            return None
+
+        semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+        async def load(draft: Dict[str, str]) -> Optional[Dict[str, Any]]:
+            vacancy_id = draft["vacancy_id"]
+            async with semaphore:
+                try:
+                    vacancy = await self.hh_service.get_vacancy_details(payload["hh_user_id"], vacancy_id)
+                except HTTPException as e:
+                    await self.fail_drafts(user_id, [draft["draft_id"]], e.detail, day)
+                    return None
+            return {
+                "custom_id": draft["draft_id"],
+                "resume": resume,
+                "vacancy": vacancy,
+                "vacancy_meta": self.hh_service._get_vacancy_prompt_meta(vacancy_id),
+            }
+
+        items = [item for item in await asyncio.gather(*(load(d) for d in drafts)) if item]
+        batch_id, info = await ai_service.submit_bulk(items)
+
+        failed = {custom_id: item["error"] for custom_id, item in info.items() if "error" in item}
+        for draft_id, error in failed.items():
+            await self.fail_drafts(user_id, [draft_id], error, day)
+        if batch_id is None:
+            return None
+
+        submitted = {custom_id: item for custom_id, item in info.items() if "error" not in item}
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(_batch_key(batch_id), mapping={
+                "provider": ai_service.batch_provider.name,
+                "user_id": user_id,
+                "budget_day": day or "",
+                "submitted_at": time.time(),
+                "items": json.dumps(submitted, ensure_ascii=False),
+            })
+            pipe.expire(_batch_key(batch_id), BATCH_RECORD_TTL)
+            pipe.sadd(ACTIVE_BATCHES_KEY, batch_id)
+            await pipe.execute()
+        return batch_id
+
+    async def _collect(self, batch_id: str) -> bool:
+        """Fan a finished batch into its drafts, False while it is still running"""
+        ai_service = self.hh_service.ai_service
+        record = await self.redis.hgetall(_batch_key(batch_id))
+        if not record:
+            logger.warning(f"Bulk batch {batch_id} has no record, dropping it")
+            await self.redis.srem(ACTIVE_BATCHES_KEY, batch_id)
+            return True
+        if record["provider"] != ai_service.batch_provider.name:
+            return False
+
+        results = await ai_service.collect_bulk(
+            batch_id, json.loads(record["items"]), record["user_id"], float(record["submitted_at"])
+        )
+        if results is None:
+            return False
+
+        ready = failed = 0
+        with SessionLocal() as db:
+            for draft_id, result in results.items():
+                if "error" in result:
+                    failed += LetterDraftCRUD.fail(db, draft_id, result["error"][:1000])
+                else:
+                    LetterDraftCRUD.complete(
+                        db, draft_id, result["content"], result["prompt_filename"], result["ai_model"]
+                    )
+                    ready += 1
+        await self.draft_service.release_budget(record["user_id"], failed, record.get("budget_day") or None)
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.srem(ACTIVE_BATCHES_KEY, batch_id)
+            pipe.delete(_batch_key(batch_id))
+            await pipe.execute()
+        logger.info(f"Bulk batch {batch_id} collected: {ready}/{len(results)} letters ready")
+        return True
+
+    async def poll_active(self) -> int:
+        """Check every active batch once, returns how many were collected"""
+        if self.hh_service.ai_service.batch_provider is None:
+            return 0
+
+        collected = 0
+        for batch_id in await self.redis.smembers(ACTIVE_BATCHES_KEY):
+            lock_key = f"{_batch_key(batch_id)}:lock"
+            token = uuid.uuid4().hex
+            # Several workers run the poller, one of them handles a batch
+            if not await self.redis.set(lock_key, token, nx=True, ex=POLL_LOCK_TTL):
+                continue
+            try:
+                if await self._collect(batch_id):
+                    collected += 1
+            except Exception as e:
+                logger.error(f"Failed to poll bulk batch {batch_id}: {e}", exc_info=True)
+            finally:
+                # Only our own lock: after POLL_LOCK_TTL another worker may hold it
+                await self.redis.eval(_RELEASE_LOCK, 1, lock_key, token)
+        return collected
+
+    async def run_poller(self, stopping: asyncio.Event):
+        """Poll active batches every AI_BATCH_POLL_INTERVAL until `stopping` is set"""
+        while not stopping.is_set():
+            try:
+                await self.poll_active()
+            except Exception as e:
+                logger.error(f"Bulk poller error: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(stopping.wait(), settings.AI_BATCH_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,120 @@
+# app/services/dedup.py
+import hashlib
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# MinHash of word 3-gram shingles: the share of equal signature values
+# estimates the Jaccard similarity of two texts. HH descriptions are short
+# (60-150 words), one inserted word changes ~5% of the shingles and an
+# appended office sentence ~15%, while unrelated descriptions share almost
+# none (see tests/test_dedup.py on benchmarks/data/hh_descriptions.json).
+MINHASH_PERMUTATIONS = 64
+SHINGLE_SIZE = 3
+NEAR_DUPLICATE_SIMILARITY = 0.7
+
+# LSH: 16 bands of 4 values. Texts with Jaccard 0.7 share a band with
+# probability 0.99 (0.9998 at 0.8), texts with 0.3 with probability 0.12
+MINHASH_BANDS = 16
+BAND_ROWS = MINHASH_PERMUTATIONS // MINHASH_BANDS
+
+_WORD_RE = re.compile(r"[^\W_]+(?:[+#]+)?")
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little")
+
+
+# Permutation i maps a shingle hash h to (A[i] * h + B[i]) mod 2**64 >> 32 (multiply-shift)
+_PERM_A = np.array([_hash64(b"minhash-a%d" % i) | 1 for i in range(MINHASH_PERMUTATIONS)], dtype=np.uint64)
+_PERM_B = np.array([_hash64(b"minhash-b%d" % i) for i in range(MINHASH_PERMUTATIONS)], dtype=np.uint64)
+
+
+def _shingle_hashes(words: List[str]) -> np.ndarray:
+    if len(words) < SHINGLE_SIZE:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {
+            " ".join(words[i:i + SHINGLE_SIZE])
+            for i in range(len(words) - SHINGLE_SIZE + 1)
+        }
+    return np.fromiter(
+        (_hash64(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+    )
+
+
+def minhash(text: str) -> Optional[List[int]]:
+    """
+    MinHash signature of word shingles, MINHASH_PERMUTATIONS signed 32-bit
+    integers (fits INTEGER[]).
+
+    None for text without words.
+    """
+    words = _WORD_RE.findall(text.lower()) if text else []
+    if not words:
+        return None
+    hashes = _shingle_hashes(words)
+    with np.errstate(over="ignore"):
+        permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) >> np.uint64(32)
+    return permuted.min(axis=1).astype(np.uint32).view(np.int32).tolist()
+
+
+def vacancy_minhash(vacancy: Dict[str, Any]) -> Optional[List[int]]:
+    """Fingerprint of the vacancy text, independent of city, salary and id"""
+    skills = " ".join(
+        skill.get("name", "") if isinstance(skill, dict) else str(skill)
+        for skill in vacancy.get("key_skills") or []
+    )
+    return minhash(f"{vacancy.get('name') or ''}\n{vacancy.get('description') or ''}\n{skills}")
+
+
+def similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures"""
+    return sum(x == y for x, y in zip(a, b)) / MINHASH_PERMUTATIONS
+
+
+def is_near_duplicate(a: Optional[List[int]], b: Optional[List[int]]) -> bool:
+    return a is not None and b is not None and similarity(a, b) >= NEAR_DUPLICATE_SIMILARITY
+
+
+def bands(signature: List[int]) -> List[int]:
+    """LSH band keys as signed 64-bit integers, the band number is part of the key"""
+    return [
+        _hash64(
+            band.to_bytes(1, "little")
+            + np.array(signature[band * BAND_ROWS:(band + 1) * BAND_ROWS], dtype=np.int32).tobytes()
+        ) - (1 << 63)
+        for band in range(MINHASH_BANDS)
+    ]
+
+
+def group_near_duplicates(signatures: List[Optional[List[int]]]) -> List[int]:
+    """
+    Group indexes of near-duplicate signatures.
+
+    Returns, for every position, the index of its group representative (the
+    first member in input order). Candidates come from LSH band buckets and
+    are confirmed by the estimated similarity.
+    """
+    parent = list(range(len(signatures)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets: Dict[int, List[int]] = {}
+    for i, signature in enumerate(signatures):
+        if signature is None:
+            continue
+        for key in bands(signature):
+            for j in buckets.setdefault(key, []):
+                if find(i) != find(j) and is_near_duplicate(signature, signatures[j]):
+                    # Smaller index becomes the root, so it stays the representative
+                    a, b = sorted((find(i), find(j)))
+                    parent[b] = a
+            buckets[key].append(i)
+
+    return [find(i) for i in range(len(signatures))]
@@ -0,0 +1,100 @@
+# app/services/digest.py
+import hashlib
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from .ai_providers.routing import detect_language
+from .token_budget import Section, count_tokens, fit_sections, split_vacancy_sections, truncate_tokens
+
+# Bump when the digest format or extraction changes, stored digests are rebuilt
+DIGEST_VERSION = 2
+# Section priorities of token_budget._VACANCY_HEADINGS
+_REQUIREMENTS_PRIORITY = 90
+_STACK_PRIORITY = 85
+_RESPONSIBILITIES_PRIORITY = 80
+_INTRO_PRIORITY = 50
+INTRO_TOKENS = 60
+MAX_STACK_ITEMS = 25
+# A digest saving less than this share of the text is not worth using
+MIN_SAVING = 0.2
+
+_LIST_SPLIT_RE = re.compile(r"[,;\n•·]|\s-\s")
+
+
+def vacancy_content_hash(vacancy: Dict[str, Any]) -> str:
+    """Hash of what the prompt is built from: title, description and key skills"""
+    skills = [s.get("name") for s in vacancy.get("key_skills") or [] if s.get("name")]
+    payload = json.dumps(
+        [vacancy.get("name") or "", vacancy.get("description") or "", skills],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _stack_items(key_skills: List[str], stack_text: str) -> List[str]:
+    items, seen = [], set()
+    for item in key_skills + _LIST_SPLIT_RE.split(stack_text):
+        item = item.strip(" .:-–—\t")
+        if item and len(item) <= 40 and item.lower() not in seen:
+            seen.add(item.lower())
+            items.append(item)
+    return items[:MAX_STACK_ITEMS]
+
+
+def build_digest(text: str, key_skills: Optional[List[str]], budget: int) -> Optional[Dict[str, Any]]:
+    """
+    Compact extractive digest of a plain text vacancy description.
+
+    Keeps the opening lines, requirements, stack and responsibilities found
+    by the usual vacancy headings and drops conditions, company story and the
+    like. None when the text has no such headings or the digest would not be
+    noticeably shorter than the text.
+    """
+    if not text:
+        return None
+    key_skills = key_skills or []
+
+    parts = {_REQUIREMENTS_PRIORITY: [], _STACK_PRIORITY: [], _RESPONSIBILITIES_PRIORITY: []}
+    intro = ""
+    for section in split_vacancy_sections(text):
+        if section.priority == _INTRO_PRIORITY:
+            intro = section.body
+        elif section.priority in parts:
+            parts[section.priority].append(section.body)
+
+    requirements = "\n".join(parts[_REQUIREMENTS_PRIORITY])
+    responsibilities = "\n".join(parts[_RESPONSIBILITIES_PRIORITY])
+    if not requirements and not responsibilities:
+        return None
+    stack = _stack_items(key_skills, "\n".join(parts[_STACK_PRIORITY]))
+
+    sections = {
+        "intro": Section(head="", body=truncate_tokens(intro, INTRO_TOKENS), priority=50),
+        "requirements": Section(head="\nТребования: ", body=requirements, priority=90, min_tokens=120),
+        "stack": Section(head="\nСтек: ", body=", ".join(stack), priority=95, min_tokens=30),
+        "responsibilities": Section(head="\nОбязанности: ", body=responsibilities, priority=80, min_tokens=80),
+    }
+    kept = fit_sections([s for s in sections.values() if s.body], budget)
+    digest_text = "".join(s.render() for s in kept).strip()
+
+    tokens = count_tokens(digest_text)
+    if tokens > (count_tokens(text) + count_tokens(", ".join(key_skills))) * (1 - MIN_SAVING):
+        return None
+
+    return {
+        "version": DIGEST_VERSION,
+        "language": detect_language(text),
+        # Fitted into the budget, a dropped part is empty
+        "requirements": "" if sections["requirements"].dropped else sections["requirements"].body,
+        "stack": stack,
+        "responsibilities": "" if sections["responsibilities"].dropped else sections["responsibilities"].body,
+        "text": digest_text,
+        "tokens": tokens,
+    }
+
+
+def vacancy_digest(vacancy: Dict[str, Any], budget: int) -> Optional[Dict[str, Any]]:
+    """Digest of a vacancy as returned by the HH API with extracted description"""
+    skills = [s.get("name") for s in vacancy.get("key_skills") or [] if s.get("name")]
+    return build_digest(vacancy.get("description") or "", skills, budget)
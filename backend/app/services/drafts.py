@@ -0,0 +1,144 @@
+# app/services/drafts.py
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import redis.asyncio as redis
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..crud.letter_draft import LetterDraftCRUD
+from .admission import PRIORITY_SPECULATIVE
+from .jobs import JobQueue, JobQueueFull, JOB_LETTER_DRAFT
+
+logger = logging.getLogger(__name__)
+
+BUDGET_KEY_TTL = 2 * 86400
+
+# Give generations back to a day's budget, unless its key already expired
+_RELEASE_BUDGET = """
+if redis.call('exists', KEYS[1]) == 1 then
+    return redis.call('decrby', KEYS[1], ARGV[1])
+end
+return 0
+"""
+
+
+def budget_day() -> str:
+    """Day of the budgets reserve_budget() takes from now"""
+    return date.today().isoformat()
+
+
+def _budget_key(scope: str, day: Optional[str] = None) -> str:
+    return f"drafts:budget:{scope}:{day or budget_day()}"
+
+
+class DraftService:
+    """
+    Speculative letter generation.
+
+    Letters for the vacancies a user is most likely to apply to are generated
+    by the job worker at PRIORITY_SPECULATIVE and stored as drafts; the
+    credit is charged only when a draft is opened. Daily budgets per user and
+    in total cap the spend on letters nobody reads.
+    """
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        self.redis = redis_client or redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self.job_queue = JobQueue(self.redis)
+
+    async def reserve_budget(self, user_id: str, count: int = 1) -> int:
+        """Take up to `count` generations from the user and global daily budgets, returns how many"""
+        limits = (
+            (_budget_key(user_id), settings.DRAFTS_USER_DAILY_LIMIT),
+            (_budget_key("all"), settings.DRAFTS_GLOBAL_DAILY_LIMIT),
+        )
+        taken = []
+        for key, limit in limits:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.incrby(key, count)
+                pipe.expire(key, BUDGET_KEY_TTL)
+                used, _ = await pipe.execute()
+            granted = max(0, min(count, limit - (used - count)))
+            if granted < count:
+                # Give back what did not fit, also to the budgets already taken from
+                for taken_key in taken + [key]:
+                    await self.redis.decrby(taken_key, count - granted)
+                count = granted
+            if not count:
+                return 0
+            taken.append(key)
+        return count
+
+    async def release_budget(self, user_id: str, count: int = 1, day: Optional[str] = None):
+        """Give back unused generations to the budgets of `day` (budget_day() at reservation, today by default)"""
+        if count <= 0:
+            return
+        for scope in (user_id, "all"):
+            await self.redis.eval(_RELEASE_BUDGET, 1, _budget_key(scope, day), count)
+
+    async def schedule(
+        self,
+        user_id: str,
+        hh_user_id: str,
+        candidates: List[Dict[str, Optional[str]]],
+        default_resume_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Queue drafts for the first DRAFTS_TOP_K candidates.
+
+        `candidates` are {"vacancy_id", "resume_id"} in preference order
+        (user's selection or relevance), a missing resume_id means
+        `default_resume_id`. Vacancies that already have a live draft are
+        skipped and do not use the budget.
+        """
+        scheduled, skipped = [], []
+        for candidate in candidates:
+            if len(scheduled) >= settings.DRAFTS_TOP_K:
+                break
+            vacancy_id = candidate["vacancy_id"]
+            resume_id = candidate.get("resume_id") or default_resume_id
+            if not resume_id:
+                skipped.append(vacancy_id)
+                continue
+
+            if not await self.reserve_budget(user_id):
+                logger.info(f"Draft budget exhausted for user {user_id}")
+                return {"scheduled": scheduled, "skipped": skipped, "budget_exhausted": True}
+
+            with SessionLocal() as db:
+                draft_id = LetterDraftCRUD.create_pending(
+                    db, UUID(user_id), vacancy_id, resume_id, settings.DRAFTS_MAX_AGE_HOURS
+                )
+            if draft_id is None:
+                await self.release_budget(user_id)
+                skipped.append(vacancy_id)
+                continue
+
+            try:
+                job_id = await self.job_queue.enqueue(
+                    JOB_LETTER_DRAFT,
+                    {
+                        "draft_id": str(draft_id),
+                        "hh_user_id": hh_user_id,
+                        "user_id": user_id,
+                        "vacancy_id": vacancy_id,
+                        "resume_id": resume_id,
+                        "priority": PRIORITY_SPECULATIVE,
+                    },
+                    user_id,
+                )
+            except JobQueueFull as e:
+                # Speculative work is the first to give way to a long backlog
+                with SessionLocal() as db:
+                    LetterDraftCRUD.fail(db, draft_id, str(e))
+                await self.release_budget(user_id)
+                skipped.append(vacancy_id)
+                break
+            with SessionLocal() as db:
+                LetterDraftCRUD.set_job(db, draft_id, job_id)
+            scheduled.append({"draft_id": str(draft_id), "vacancy_id": vacancy_id, "job_id": job_id})
+
+        logger.info(f"Scheduled {len(scheduled)} letter drafts for user {user_id}")
+        return {"scheduled": scheduled, "skipped": skipped, "budget_exhausted": False}
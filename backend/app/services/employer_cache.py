@@ -0,0 +1,74 @@
+# app/services/employer_cache.py
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from .vacancy_payload import dump_json
+
+
+class EmployerCache:
+    """
+    Hot in-process cache of served employer objects, LRU with a TTL.
+
+    Vacancies only store employer_id; responses get the employer from here,
+    already serialized, and misses are read from the employers table in one
+    query. Ingest in this process refreshes the entry right away, other
+    processes see a renamed employer after EMPLOYER_CACHE_TTL.
+    """
+    # id -> (expires at, served object, its JSON)
+    _entries: "OrderedDict[str, Tuple[float, Dict[str, Any], str]]" = OrderedDict()
+    _lock = threading.Lock()
+    _hits: int = 0
+    _misses: int = 0
+
+    @classmethod
+    def put(cls, employer: Dict[str, Any]) -> Tuple[float, Dict[str, Any], str]:
+        """Cache a served employer object, e.g. right after ingest"""
+        entry = (time.monotonic() + settings.EMPLOYER_CACHE_TTL, employer, dump_json(employer))
+        with cls._lock:
+            cls._entries[employer["id"]] = entry
+            cls._entries.move_to_end(employer["id"])
+            while len(cls._entries) > settings.EMPLOYER_CACHE_SIZE:
+                cls._entries.popitem(last=False)
+        return entry
+
+    @classmethod
+    def _get_entries(cls, db: Session, employer_ids: Iterable[str]) -> Dict[str, Tuple[float, Dict[str, Any], str]]:
+        # Imported here: the crud package imports this module through crud/vacancy.py
+        from ..crud.employer import EmployerCRUD
+
+        now = time.monotonic()
+        found, missing = {}, []
+        with cls._lock:
+            for employer_id in set(employer_ids):
+                entry = cls._entries.get(employer_id)
+                if entry is not None and entry[0] > now:
+                    cls._entries.move_to_end(employer_id)
+                    found[employer_id] = entry
+                else:
+                    missing.append(employer_id)
+            cls._hits += len(found)
+            cls._misses += len(missing)
+
+        for employer in EmployerCRUD.get_many(db, missing):
+            found[employer.id] = cls.put(EmployerCRUD.to_served(employer))
+        return found
+
+    @classmethod
+    def get_json(cls, db: Session, employer_ids: Iterable[str]) -> Dict[str, str]:
+        """{id: serialized employer} for the employers found"""
+        return {k: entry[2] for k, entry in cls._get_entries(db, employer_ids).items()}
+
+    @classmethod
+    def get(cls, db: Session, employer_id: str) -> Optional[Dict[str, Any]]:
+        """Served employer object (a copy) or None"""
+        entry = cls._get_entries(db, [employer_id]).get(employer_id)
+        return dict(entry[1]) if entry else None
+
+    @classmethod
+    def snapshot(cls) -> Dict[str, Any]:
+        return {"size": len(cls._entries), "hits": cls._hits, "misses": cls._misses}
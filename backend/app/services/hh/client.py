@@ -2,6 +2,7 @@ import httpx
 import logging
 from typing import Optional, Dict, List, Any
 from fastapi import HTTPException
+from ...core import deadline
 from ...core.config import settings
 from ...core.http_client import HTTPClient
 
@@ -27,20 +28,30 @@ class HHClient:
         data: Dict = None,
         json: Dict = None
     ) -> httpx.Response:
-        """Make HTTP request with proper error handling"""
+        """
+        Make HTTP request with proper error handling.
+
+        Timeouts are capped by the request deadline, if one is set.
+        """
         client = HTTPClient.get_client()
         
         headers = {}
         if token:
             headers.update(self._get_auth_headers(token))
         
+        try:
+            timeout = deadline.timeout_for(HTTPClient.DEFAULT_TIMEOUT, f"{method} {url}")
+        except deadline.DeadlineExceeded as e:
+            logger.error(str(e))
+            raise HTTPException(status_code=504, detail="Request deadline exceeded")
+        
         try:
             if method.upper() == "GET":
-                response = await client.get(url, params=params, headers=headers)
+                response = await client.get(url, params=params, headers=headers, timeout=timeout)
             elif method.upper() == "POST":
-                response = await client.post(url, data=data, json=json, headers=headers)
+                response = await client.post(url, data=data, json=json, headers=headers, timeout=timeout)
             elif method.upper() == "DELETE":
-                response = await client.delete(url, headers=headers)
+                response = await client.delete(url, headers=headers, timeout=timeout)
             else:
                 raise ValueError(f"Unsupported method: {method}")
             
@@ -1,5 +1,6 @@
 from datetime import datetime
 import asyncio
+import time
 from typing import Dict, Any, Optional, List
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
@@ -7,9 +8,15 @@ import logging
 from .client import HHClient
 from ..redis_service import RedisService
 from ..ai_service import AIService
+from ..admission import PRIORITY_TRIAL
+from ..relevance import rank_vacancies
+from ..dedup import group_near_duplicates, vacancy_minhash
+from ..vacancy_ingest import INGEST_FIELDS, ingest_cost, prepare_vacancies
+from ..write_behind import LastSearchedBuffer
 from ...core.config import settings
+from ...core.cpu_pool import CPUPool
 from ...core.database import get_db
-from ...crud.vacancy import VacancyCRUD
+from ...crud.vacancy import VacancyCRUD, project_vacancy
 from ...crud.application import ApplicationCRUD
 
 logger = logging.getLogger(__name__)
@@ -25,6 +32,22 @@ def _resume_item_cache_key(hh_user_id: str, resume_id: str) -> str:
     return f"resumes:api:{hh_user_id}:{resume_id}"
 
 
+def _listing_key(item: Dict[str, Any]) -> Optional[tuple]:
+    """
+    What HH shows for a vacancy in search results. Items with equal keys are
+    reposts of the same text, None when there is too little to tell.
+    """
+    snippet = item.get("snippet") or {}
+    if not (snippet.get("requirement") or snippet.get("responsibility")):
+        return None
+    return (
+        (item.get("employer") or {}).get("id"),
+        item.get("name"),
+        snippet.get("requirement"),
+        snippet.get("responsibility"),
+    )
+
+
 class HHService:
     def __init__(self):
         self.hh_client = HHClient()
@@ -47,6 +70,8 @@ class HHService:
 
         token = await self._get_token(hh_user_id)
         resumes = await self.hh_client.get_resumes(token) or []
+        # Fresh from HH: prepared texts of changed resumes are dropped here
+        await self.ai_service.resume_cache.track(hh_user_id, resumes)
 
         await self.redis_service.set_json(
             cache_key,
@@ -117,24 +142,65 @@ class HHService:
 
 
 
-    async def _load_and_save_vacancy(
-        self, token: str, vacancy_id: str, db: Session
+    async def _prepare_vacancies(self, vacancies: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Convert description HTML to text and compute the stored text fields
+        (digest, MinHash, token count) for a batch of vacancies in the CPU pool.
+        Returns the fields per vacancy for VacancyCRUD.create_or_update.
+        """
+        if not vacancies:
+            return []
+
+        start = time.monotonic()
+        items = [{field: v.get(field) for field in INGEST_FIELDS} for v in vacancies]
+        prepared = await CPUPool.map_batches(prepare_vacancies, items, cost=ingest_cost(items))
+        for vacancy, result in zip(vacancies, prepared):
+            if vacancy.get("description"):
+                vacancy["description"] = result["description"]
+        logger.info(
+            f"Prepared {len(prepared)} vacancies in {(time.monotonic() - start) * 1000:.0f} ms"
+        )
+        return [result["fields"] for result in prepared]
+
+    async def _load_and_save_vacancies(
+        self, token: str, vacancy_ids: List[str], db: Session
     ) -> Dict[str, Any]:
-        """Load vacancy from HH API and save to DB"""
-        try:
-            full_vacancy = await self.hh_client.get_vacancy(token, vacancy_id)
+        """
+        Load vacancies from HH API and save to DB.
 
-            if full_vacancy.get("description"):
-                full_vacancy["description"] = self.ai_service._extract_text(
-                    full_vacancy.get("description", "")
-                )
+        Fetching is I/O-bound and batched per HH_BATCH_SIZE, extraction of the
+        whole set goes to the CPU pool in one call. Returns vacancy or
+        exception per id.
+        """
+        loaded = {}
+        batch_size = settings.HH_BATCH_SIZE
 
-            VacancyCRUD.create_or_update(db, full_vacancy)
-            return full_vacancy
+        for i in range(0, len(vacancy_ids), batch_size):
+            batch = vacancy_ids[i : i + batch_size]
 
-        except Exception as e:
-            logger.error(f"Error loading vacancy {vacancy_id}: {e}")
-            raise e
+            if i > 0:
+                await asyncio.sleep(settings.HH_BATCH_DELAY)
+
+            batch_results = await asyncio.gather(
+                *(self.hh_client.get_vacancy(token, vacancy_id) for vacancy_id in batch),
+                return_exceptions=True,
+            )
+            loaded.update(zip(batch, batch_results))
+
+        vacancies = {k: v for k, v in loaded.items() if not isinstance(v, BaseException)}
+        fields = dict(zip(vacancies, await self._prepare_vacancies(list(vacancies.values()))))
+
+        for vacancy_id, vacancy in loaded.items():
+            if isinstance(vacancy, BaseException):
+                logger.error(f"Error loading vacancy {vacancy_id}: {vacancy}")
+                continue
+            try:
+                VacancyCRUD.create_or_update(db, vacancy, fields[vacancy_id])
+            except Exception as e:
+                logger.error(f"Error saving vacancy {vacancy_id}: {e}")
+                loaded[vacancy_id] = e
+
+        return loaded
 
     async def get_vacancy_details(
         self, hh_user_id: str, vacancy_id: str
@@ -150,27 +216,38 @@ class HHService:
                 db_vacancy
                 and (datetime.utcnow() - db_vacancy.updated_at).total_seconds() < 43200
             ):
-                return db_vacancy.full_data
+                return VacancyCRUD.to_payload(db, db_vacancy)
 
             token = await self._get_token(hh_user_id)
             vacancy = await self.hh_client.get_vacancy(token, vacancy_id)
+            fields = await self._prepare_vacancies([vacancy])
 
-            if vacancy.get("description"):
-                vacancy["description"] = self.ai_service._extract_text(
-                    vacancy.get("description", "")
-                )
-
-            VacancyCRUD.create_or_update(db, vacancy)
-            return vacancy
+            VacancyCRUD.create_or_update(db, vacancy, fields[0])
+            return project_vacancy(vacancy)
 
         finally:
             db_gen.close()
 
 
+    def _get_vacancy_prompt_meta(self, vacancy_id: str) -> Dict[str, Any]:
+        """Get values precomputed at ingest that speed up prompt building"""
+        db_gen = get_db()
+        db = next(db_gen)
+
+        try:
+            return VacancyCRUD.get_prompt_meta(db, vacancy_id)
+        finally:
+            db_gen.close()
+
     async def generate_cover_letter(
-        self, hh_user_id: str, vacancy_id: str, resume_id: str, user_id: str = None
+        self,
+        hh_user_id: str,
+        vacancy_id: str,
+        resume_id: str,
+        user_id: str = None,
+        priority: int = PRIORITY_TRIAL,
     ) -> Dict[str, Any]:
-        """Generate cover letter with proper isolation"""
+        """Generate cover letter with proper isolation, bounded by the request deadline"""
         # Create separate task for AI generation to prevent blocking
         loop = asyncio.get_event_loop()
 
@@ -180,11 +257,14 @@ class HHService:
             raise HTTPException(404, "Resume not found")
 
         vacancy = await self.get_vacancy_details(hh_user_id, vacancy_id)
+        vacancy_meta = self._get_vacancy_prompt_meta(vacancy_id)
 
         try:
             # Create a new task for AI generation
             generation_task = asyncio.create_task(
-                self.ai_service.generate_cover_letter(resume, vacancy, user_id)
+                self.ai_service.generate_cover_letter(
+                    resume, vacancy, user_id, vacancy_meta, priority
+                )
             )
 
             # The timeout is handled inside ai_service, but we can add additional protection
@@ -236,180 +316,258 @@ class HHService:
         return saved_searches
     
     
-    async def search_vacancies_with_descriptions(
-        self, hh_user_id: str, params: Dict[str, Any], user_id: str, filter_applied: bool = True
+    async def _enrich_search_result(
+        self,
+        token: str,
+        result: Dict[str, Any],
+        user_id: str,
+        filter_applied: bool,
+        collapse_duplicates: bool = False,
     ) -> Dict[str, Any]:
-        """Search vacancies and load full descriptions with DB caching and applied check"""
-        token = await self._get_token(hh_user_id)
-
-        result = await self.hh_client.search_vacancies(token, params)
+        """
+        Attach full descriptions (DB cache or HH API) and the applied flag to
+        search items. Cached vacancies stay StoredVacancy, the flag is an overlay.
+        """
+        if not result.get("items"):
+            return result
 
-        if "items" in result and result["items"]:
-            db_gen = get_db()
-            db = next(db_gen)
+        db_gen = get_db()
+        db = next(db_gen)
 
-            try:
-                vacancy_ids = [v["id"] for v in result["items"]]
+        try:
+            vacancy_ids = [v["id"] for v in result["items"]]
+            if LastSearchedBuffer.running():
+                LastSearchedBuffer.add(vacancy_ids)
+            else:
                 VacancyCRUD.update_last_searched(db, vacancy_ids)
 
-                # Получаем список вакансий, на которые пользователь уже откликнулся
-                applied_vacancies = ApplicationCRUD.get_user_applied_vacancies(db, user_id, vacancy_ids)
-                applied_set = set(applied_vacancies)
-
-                # Фильтруем вакансии, на которые уже откликнулись
-                if filter_applied:
-                    filtered_items = [v for v in result["items"] if v["id"] not in applied_set]
-                    # Обновляем результаты
-                    result["items"] = filtered_items
-                    result["found"] = len(filtered_items)
-                    vacancy_ids = [v["id"] for v in filtered_items]
-
-                stale_ids = VacancyCRUD.get_stale_vacancies(db, vacancy_ids, hours=12)
-
-                fresh_vacancies = {}
-                for vacancy_id in vacancy_ids:
-                    if vacancy_id not in stale_ids:
-                        db_vacancy = VacancyCRUD.get_by_id(db, vacancy_id)
-                        if db_vacancy:
-                            fresh_vacancies[vacancy_id] = db_vacancy.full_data
-
-                if stale_ids:
-                    batch_size = settings.HH_BATCH_SIZE
-
-                    for i in range(0, len(stale_ids), batch_size):
-                        batch = stale_ids[i : i + batch_size]
-
-                        if i > 0:
-                            await asyncio.sleep(settings.HH_BATCH_DELAY)
-
-                        batch_tasks = []
-                        for vacancy_id in batch:
-                            batch_tasks.append(
-                                self._load_and_save_vacancy(token, vacancy_id, db)
-                            )
-
-                        batch_results = await asyncio.gather(
-                            *batch_tasks, return_exceptions=True
-                        )
-
-                        for vacancy_id, result_item in zip(batch, batch_results):
-                            if isinstance(result_item, Exception):
-                                logger.error(
-                                    f"Error loading vacancy {vacancy_id}: {result_item}"
-                                )
-                                basic_info = next(
-                                    (
-                                        v
-                                        for v in result["items"]
-                                        if v["id"] == vacancy_id
-                                    ),
-                                    None,
-                                )
-                                if basic_info:
-                                    fresh_vacancies[vacancy_id] = basic_info
-                            else:
-                                fresh_vacancies[vacancy_id] = result_item
-
-                final_items = []
-                for vacancy in result["items"]:
-                    vacancy_data = fresh_vacancies.get(vacancy["id"], vacancy)
-                    
-                    # Добавляем флаг applied (всегда false после фильтрации)
-                    vacancy_data["applied"] = vacancy["id"] in applied_set
-                    
-                    final_items.append(vacancy_data)
-
-                result["items"] = final_items
-
-            finally:
-                db.close()
+            # Получаем список вакансий, на которые пользователь уже откликнулся
+            applied_vacancies = ApplicationCRUD.get_user_applied_vacancies(db, user_id, vacancy_ids)
+            applied_set = set(applied_vacancies)
+
+            # Фильтруем вакансии, на которые уже откликнулись
+            if filter_applied:
+                filtered_items = [v for v in result["items"] if v["id"] not in applied_set]
+                result["items"] = filtered_items
+                result["found"] = len(filtered_items)
+                vacancy_ids = [v["id"] for v in filtered_items]
+
+            stale_ids = VacancyCRUD.get_stale_vacancies(db, vacancy_ids, hours=12)
+
+            stale_set = set(stale_ids)
+            stored = VacancyCRUD.get_payloads(db, [v for v in vacancy_ids if v not in stale_set])
+            fresh_vacancies = {vacancy_id: row["payload"] for vacancy_id, row in stored.items()}
+            fingerprints = {vacancy_id: row["minhash"] for vacancy_id, row in stored.items()}
+
+            if stale_ids:
+                to_load, borrowed = self._split_listed_duplicates(
+                    result["items"], fresh_vacancies, stale_ids
+                )
+                loaded = await self._load_and_save_vacancies(token, to_load, db)
+                for vacancy_id, result_item in loaded.items():
+                    if not isinstance(result_item, BaseException):
+                        fresh_vacancies[vacancy_id] = project_vacancy(result_item)
+
+                items_by_id = {v["id"]: v for v in result["items"]}
+                for vacancy_id, source_id in borrowed.items():
+                    source = fresh_vacancies.get(source_id)
+                    if source:
+                        # Text of the repost, own id, city, salary and links
+                        fresh_vacancies[vacancy_id] = {
+                            **source, **items_by_id[vacancy_id], "description_from": source_id
+                        }
+
+            final_items = []
+            for vacancy in result["items"]:
+                # Basic search info if the full vacancy could not be loaded
+                vacancy_data = fresh_vacancies.get(vacancy["id"], vacancy)
+                vacancy_data["applied"] = vacancy["id"] in applied_set
+                final_items.append(vacancy_data)
+
+            if collapse_duplicates:
+                final_items = self._collapse_near_duplicates(final_items, fingerprints)
+
+            result["items"] = final_items
+
+        finally:
+            db.close()
 
         return result
 
+    def _split_listed_duplicates(
+        self, items: List[Dict[str, Any]], fresh_vacancies: Dict[str, Any], stale_ids: List[str]
+    ):
+        """
+        Skip loading stale vacancies listed exactly like another item on the
+        page. Returns ids to load and {duplicate id: id to copy the text from},
+        preferring sources already in the DB.
+        """
+        items_by_id = {v["id"]: v for v in items}
+        stale_set = set(stale_ids)
+        sources = {}
+        for vacancy_id in [i for i in fresh_vacancies if i in items_by_id] + stale_ids:
+            key = _listing_key(items_by_id.get(vacancy_id, {}))
+            if key is not None:
+                sources.setdefault(key, vacancy_id)
+
+        to_load, borrowed = [], {}
+        for vacancy_id in stale_ids:
+            source_id = sources.get(_listing_key(items_by_id.get(vacancy_id, {})))
+            if source_id is None or source_id == vacancy_id:
+                to_load.append(vacancy_id)
+            else:
+                borrowed[vacancy_id] = source_id
+
+        if borrowed:
+            logger.info(f"Skipped loading {len(borrowed)} reposted vacancies out of {len(stale_set)}")
+        return to_load, borrowed
+
+    def _collapse_near_duplicates(
+        self, items: List[Dict[str, Any]], fingerprints: Dict[str, Optional[List[int]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Keep the first of each group of near-duplicate vacancies, the others
+        are listed in its `duplicates`. Items without a description are never
+        grouped.
+        """
+        values = []
+        for item in items:
+            fingerprint = fingerprints.get(item["id"])
+            if fingerprint is None and item.get("description"):
+                fingerprint = vacancy_minhash(item)
+            values.append(fingerprint)
+
+        groups = group_near_duplicates(values)
+        collapsed = []
+        for index, item in enumerate(items):
+            representative = groups[index]
+            if representative == index:
+                item["duplicates"] = []
+                collapsed.append(item)
+            else:
+                items[representative]["duplicates"].append({
+                    "id": item["id"],
+                    "name": item.get("name"),
+                    "area": (item.get("area") or {}).get("name"),
+                    "salary": item.get("salary"),
+                    "alternate_url": item.get("alternate_url"),
+                    "applied": item.get("applied", False),
+                })
+        return collapsed
+
+    async def find_duplicate_letter(
+        self, hh_user_id: str, user_id: str, vacancy_id: str
+    ) -> Optional[Dict[str, Any]]:
+        """Latest letter the user sent to a near-duplicate of the vacancy, if any"""
+        db_gen = get_db()
+        db = next(db_gen)
+
+        try:
+            db_vacancy = VacancyCRUD.get_by_id(db, vacancy_id)
+            fingerprint = db_vacancy.minhash if db_vacancy else None
+            if fingerprint is None:
+                # Ingested before fingerprints existed, or not loaded yet
+                vacancy = (
+                    VacancyCRUD.to_payload(db, db_vacancy)
+                    if db_vacancy and db_vacancy.full_data
+                    else await self.get_vacancy_details(hh_user_id, vacancy_id)
+                )
+                fingerprint = vacancy_minhash(vacancy)
+
+            duplicates = VacancyCRUD.find_near_duplicates(db, fingerprint, exclude_id=vacancy_id)
+            if not duplicates:
+                return None
+
+            application = ApplicationCRUD.get_latest_user_letter(
+                db, user_id, [d["id"] for d in duplicates]
+            )
+            if not application:
+                return None
+
+            score = next(d["similarity"] for d in duplicates if d["id"] == application.vacancy_id)
+            return {
+                "vacancy_id": application.vacancy_id,
+                "vacancy_title": application.vacancy_title,
+                "message": application.message,
+                "prompt_filename": application.prompt_filename,
+                "ai_model": application.ai_model,
+                "similarity": score,
+            }
+        finally:
+            db_gen.close()
+
+    async def _rank_search_result(
+        self, hh_user_id: str, result: Dict[str, Any], resume_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Score items against the selected resume (or all user's resumes) and
+        sort them by relevance. Each item gets `relevance` with its best
+        score, the suggested resume and per-resume scores.
+        """
+        items = result.get("items")
+        if not items:
+            return result
+
+        if resume_id:
+            resume = await self.get_user_resume(hh_user_id, resume_id)
+            resumes = [resume] if resume else []
+        else:
+            resumes = await self.get_user_resumes(hh_user_id)
+        if not resumes:
+            return result
+
+        start = time.monotonic()
+        ranked = rank_vacancies(items, resumes)
+        for item, relevance in zip(items, ranked):
+            item["relevance"] = relevance
+
+        # Stable sort: equal scores keep HH order
+        result["items"] = sorted(
+            items, key=lambda item: -(item["relevance"] or {}).get("score", 0.0)
+        )
+        logger.info(
+            f"Ranked {len(items)} vacancies against {len(resumes)} resumes "
+            f"in {(time.monotonic() - start) * 1000:.0f} ms"
+        )
+        return result
+
+    async def search_vacancies_with_descriptions(
+        self,
+        hh_user_id: str,
+        params: Dict[str, Any],
+        user_id: str,
+        filter_applied: bool = True,
+        rank: bool = False,
+        rank_resume_id: Optional[str] = None,
+        collapse_duplicates: bool = False,
+    ) -> Dict[str, Any]:
+        """Search vacancies and load full descriptions with DB caching and applied check"""
+        token = await self._get_token(hh_user_id)
+        result = await self.hh_client.search_vacancies(token, params)
+        result = await self._enrich_search_result(
+            token, result, user_id, filter_applied, collapse_duplicates
+        )
+        if rank:
+            result = await self._rank_search_result(hh_user_id, result, rank_resume_id)
+        return result
+
     async def search_vacancies_by_url(
-        self, hh_user_id: str, search_url: str, user_id: str, filter_applied: bool = True
+        self,
+        hh_user_id: str,
+        search_url: str,
+        user_id: str,
+        filter_applied: bool = True,
+        rank: bool = False,
+        rank_resume_id: Optional[str] = None,
+        collapse_duplicates: bool = False,
     ) -> Dict[str, Any]:
         """Search vacancies by saved search URL"""
         token = await self._get_token(hh_user_id)
-        
         # Use the URL directly with HH API
         result = await self.hh_client.search_vacancies_by_url(token, search_url)
-        
-        if "items" in result and result["items"]:
-            db_gen = get_db()
-            db = next(db_gen)
-
-            try:
-                vacancy_ids = [v["id"] for v in result["items"]]
-                VacancyCRUD.update_last_searched(db, vacancy_ids)
-
-                # Get list of vacancies user has already applied to
-                applied_vacancies = ApplicationCRUD.get_user_applied_vacancies(db, user_id, vacancy_ids)
-                applied_set = set(applied_vacancies)
-
-                # Filter out applied vacancies
-                if filter_applied:
-                    filtered_items = [v for v in result["items"] if v["id"] not in applied_set]
-                    result["items"] = filtered_items
-                    result["found"] = len(filtered_items)
-                    vacancy_ids = [v["id"] for v in filtered_items]
-
-                # Continue with loading descriptions...
-                stale_ids = VacancyCRUD.get_stale_vacancies(db, vacancy_ids, hours=12)
-
-                fresh_vacancies = {}
-                for vacancy_id in vacancy_ids:
-                    if vacancy_id not in stale_ids:
-                        db_vacancy = VacancyCRUD.get_by_id(db, vacancy_id)
-                        if db_vacancy:
-                            fresh_vacancies[vacancy_id] = db_vacancy.full_data
-
-                if stale_ids:
-                    batch_size = settings.HH_BATCH_SIZE
-
-                    for i in range(0, len(stale_ids), batch_size):
-                        batch = stale_ids[i : i + batch_size]
-
-                        if i > 0:
-                            await asyncio.sleep(settings.HH_BATCH_DELAY)
-
-                        batch_tasks = []
-                        for vacancy_id in batch:
-                            batch_tasks.append(
-                                self._load_and_save_vacancy(token, vacancy_id, db)
-                            )
-
-                        batch_results = await asyncio.gather(
-                            *batch_tasks, return_exceptions=True
-                        )
-
-                        for vacancy_id, result_item in zip(batch, batch_results):
-                            if isinstance(result_item, Exception):
-                                logger.error(
-                                    f"Error loading vacancy {vacancy_id}: {result_item}"
-                                )
-                                basic_info = next(
-                                    (
-                                        v
-                                        for v in result["items"]
-                                        if v["id"] == vacancy_id
-                                    ),
-                                    None,
-                                )
-                                if basic_info:
-                                    fresh_vacancies[vacancy_id] = basic_info
-                            else:
-                                fresh_vacancies[vacancy_id] = result_item
-
-                final_items = []
-                for vacancy in result["items"]:
-                    vacancy_data = fresh_vacancies.get(vacancy["id"], vacancy)
-                    vacancy_data["applied"] = vacancy["id"] in applied_set
-                    final_items.append(vacancy_data)
-
-                result["items"] = final_items
-
-            finally:
-                db.close()
-
+        result = await self._enrich_search_result(
+            token, result, user_id, filter_applied, collapse_duplicates
+        )
+        if rank:
+            result = await self._rank_search_result(hh_user_id, result, rank_resume_id)
         return result
@@ -0,0 +1,14 @@
+from .queue import JobQueue, JobQueueFull, STATUS_QUEUED, STATUS_RUNNING, STATUS_DONE, STATUS_FAILED
+from .handlers import JOB_COVER_LETTER, JOB_LETTER_DRAFT, JOB_BULK_LETTERS
+
+__all__ = [
+    "JobQueue",
+    "JobQueueFull",
+    "JOB_COVER_LETTER",
+    "JOB_LETTER_DRAFT",
+    "JOB_BULK_LETTERS",
+    "STATUS_QUEUED",
+    "STATUS_RUNNING",
+    "STATUS_DONE",
+    "STATUS_FAILED",
+]
@@ -0,0 +1,165 @@
+# app/services/jobs/handlers.py
+import logging
+from typing import Any, Awaitable, Callable, Dict
+from uuid import UUID
+
+from fastapi import HTTPException
+
+from ...core.database import SessionLocal
+from ...crud.letter_draft import LetterDraftCRUD
+from ...crud.user import UserCRUD
+from ..admission import PRIORITY_SPECULATIVE, PRIORITY_TRIAL
+from .queue import JobQueue
+
+logger = logging.getLogger(__name__)
+
+JOB_COVER_LETTER = "cover_letter"
+JOB_LETTER_DRAFT = "letter_draft"
+JOB_BULK_LETTERS = "bulk_letters"
+
+
+class PermanentJobError(Exception):
+    """Job failed in a way a retry will not fix"""
+
+
+async def refund_cover_letter(job_id: str, payload: Dict[str, Any]) -> None:
+    """Give back the credit reserved at enqueue, at most once per job"""
+    if not payload.get("credit_reserved"):
+        return
+    if not await _get_job_queue().mark_once(job_id, "credit_refunded"):
+        return
+    with SessionLocal() as db:
+        UserCRUD.add_credits(db, UUID(payload["user_id"]), 1)
+    logger.info(f"Returned the credit of cover letter job {job_id} to user {payload['user_id']}")
+
+
+async def handle_cover_letter(job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Generate a cover letter. The credit was reserved at enqueue and is given
+    back for a fallback letter or a failure.
+    """
+    try:
+        result = await _get_hh_service().generate_cover_letter(
+            payload["hh_user_id"],
+            payload["vacancy_id"],
+            payload.get("resume_id"),
+            payload["user_id"],
+            payload.get("priority", PRIORITY_TRIAL),
+        )
+    except HTTPException as e:
+        # Expired token, missing resume and the like
+        await refund_cover_letter(job_id, payload)
+        raise PermanentJobError(e.detail)
+
+    if result.get("is_fallback", False):
+        await refund_cover_letter(job_id, payload)
+        logger.warning(f"Fallback letter generated for user {payload['user_id']} - credit not charged")
+    elif not payload.get("credit_reserved"):
+        # Queued before credits were reserved at enqueue. Marked first: an
+        # attempt repeated after a crash must not charge a second time
+        if await _get_job_queue().mark_once(job_id, "charged"):
+            with SessionLocal() as db:
+                if not UserCRUD.decrement_credits(db, payload["user_id"]):
+                    raise PermanentJobError("Failed to deduct credits")
+            logger.info(f"Generated letter and deducted 1 credit from user {payload['user_id']}")
+
+    return {
+        "content": result["content"],
+        "prompt_filename": result["prompt_filename"],
+        "ai_model": result["ai_model"],
+    }
+
+
+async def handle_letter_draft(job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Generate a speculative letter into its draft, nothing is charged here.
+
+    Failed generations are not retried: shed by admission control, expired
+    token or a fallback letter just mark the draft failed.
+    """
+    draft_id = payload["draft_id"]
+    try:
+        result = await _get_hh_service().generate_cover_letter(
+            payload["hh_user_id"],
+            payload["vacancy_id"],
+            payload.get("resume_id"),
+            payload["user_id"],
+            payload.get("priority", PRIORITY_SPECULATIVE),
+        )
+        if result.get("is_fallback", False):
+            raise PermanentJobError("Fallback letter is not kept as a draft")
+    except Exception as e:
+        error = e.detail if isinstance(e, HTTPException) else str(e)
+        with SessionLocal() as db:
+            LetterDraftCRUD.fail(db, draft_id, error)
+        raise PermanentJobError(error)
+
+    with SessionLocal() as db:
+        LetterDraftCRUD.complete(
+            db, draft_id, result["content"], result["prompt_filename"], result["ai_model"]
+        )
+    logger.info(f"Letter draft {draft_id} ready for user {payload['user_id']}")
+    return {"draft_id": draft_id}
+
+
+async def handle_bulk_letters(job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Submit the drafts of a bulk request as one provider batch.
+
+    The results are collected later by the worker's bulk poller. Errors mark
+    the drafts failed instead of retrying, a second attempt could submit the
+    same letters twice.
+    """
+    draft_ids = [draft["draft_id"] for draft in payload["drafts"]]
+    bulk_service = get_bulk_service()
+    try:
+        batch_id = await bulk_service.submit(payload)
+    except Exception as e:
+        error = e.detail if isinstance(e, HTTPException) else str(e)
+        await bulk_service.fail_drafts(payload["user_id"], draft_ids, error, payload.get("budget_day"))
+        raise PermanentJobError(error)
+
+    logger.info(f"Bulk job for user {payload['user_id']} submitted as batch {batch_id}")
+    return {"batch_id": batch_id, "letters": len(draft_ids)}
+
+
+_hh_service = None
+_bulk_service = None
+_job_queue = None
+
+
+def _get_hh_service():
+    """One HHService per worker process, created on first job"""
+    global _hh_service
+    if _hh_service is None:
+        from ..hh.service import HHService
+        _hh_service = HHService()
+    return _hh_service
+
+
+def _get_job_queue() -> JobQueue:
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue()
+    return _job_queue
+
+
+def get_bulk_service():
+    """Bulk letters of this worker process, shares its HHService"""
+    global _bulk_service
+    if _bulk_service is None:
+        from ..bulk import BulkLetterService
+        _bulk_service = BulkLetterService(_get_hh_service())
+    return _bulk_service
+
+
+# Handlers get the job id and payload
+HANDLERS: Dict[str, Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]] = {
+    JOB_COVER_LETTER: handle_cover_letter,
+    JOB_LETTER_DRAFT: handle_letter_draft,
+    JOB_BULK_LETTERS: handle_bulk_letters,
+}
+# Called when a job fails for good, whatever the reason (also after the last attempt)
+FAILURE_HANDLERS: Dict[str, Callable[[str, Dict[str, Any]], Awaitable[None]]] = {
+    JOB_COVER_LETTER: refund_cover_letter,
+}
@@ -0,0 +1,218 @@
+# app/services/jobs/queue.py
+import json
+import logging
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+
+from ...core.config import settings
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = "jobs:stream"
+GROUP_NAME = "jobs:workers"
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+FINAL_STATUSES = (STATUS_DONE, STATUS_FAILED)
+
+
+# Store the job hash and add its message unless the stream already holds
+# ARGV[1] unacked messages (acked ones are deleted). ARGV[4..] are the hash fields
+_ENQUEUE = """
+if redis.call('xlen', KEYS[2]) >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('hset', KEYS[1], unpack(ARGV, 4))
+redis.call('expire', KEYS[1], ARGV[2])
+redis.call('xadd', KEYS[2], '*', 'job_id', ARGV[3])
+return 1
+"""
+
+
+class JobQueueFull(Exception):
+    """The backlog reached JOB_MAX_BACKLOG, the job was not queued"""
+
+
+def _job_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+def _events_channel(job_id: str) -> str:
+    return f"job:{job_id}:events"
+
+
+class JobQueue:
+    """
+    Durable job queue on Redis Streams.
+
+    The stream carries job ids only; state, payload and result live in a
+    `job:{id}` hash. Workers read through a consumer group, so a message
+    stays pending until it is acked and can be reclaimed with XAUTOCLAIM
+    if its worker dies. Status changes are also published to
+    `job:{id}:events` for subscribers.
+
+    The stream is not trimmed by length, that would drop jobs nobody has
+    run yet: acked messages are deleted, and enqueue refuses new jobs once
+    JOB_MAX_BACKLOG are waiting or running.
+    """
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        self.redis = redis_client or redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+    async def enqueue(self, job_type: str, payload: Dict[str, Any], user_id: str) -> str:
+        """Store a job and put it on the stream, returns the job id or raises JobQueueFull"""
+        job_id = uuid.uuid4().hex
+        now = str(time.time())
+        fields = {
+            "id": job_id,
+            "type": job_type,
+            "user_id": user_id,
+            "payload": json.dumps(payload, ensure_ascii=False),
+            "status": STATUS_QUEUED,
+            "attempts": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        # Jobs nobody picks up must not live forever either (JOB_PENDING_TTL)
+        queued = await self.redis.eval(
+            _ENQUEUE, 2, _job_key(job_id), STREAM_KEY,
+            settings.JOB_MAX_BACKLOG, settings.JOB_PENDING_TTL, job_id,
+            *(item for field in fields.items() for item in field),
+        )
+        if not queued:
+            logger.warning(f"Job backlog full, {job_type} job for user {user_id} rejected")
+            raise JobQueueFull(f"More than {settings.JOB_MAX_BACKLOG} jobs are waiting")
+
+        logger.info(f"Enqueued {job_type} job {job_id} for user {user_id}")
+        return job_id
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job state with decoded payload and result, None if unknown or expired"""
+        data = await self.redis.hgetall(_job_key(job_id))
+        if not data:
+            return None
+        for field in ("payload", "result"):
+            if field in data:
+                data[field] = json.loads(data[field])
+        data["attempts"] = int(data.get("attempts", 0))
+        return data
+
+    async def _update(self, job_id: str, ttl: Optional[int] = None, **fields) -> None:
+        fields["updated_at"] = str(time.time())
+        key = _job_key(job_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=fields)
+            if ttl:
+                pipe.expire(key, ttl)
+            pipe.publish(_events_channel(job_id), json.dumps({"status": fields.get("status")}))
+            await pipe.execute()
+
+    # Worker side
+
+    async def ensure_group(self) -> None:
+        """Create the consumer group (and the stream) if missing"""
+        try:
+            await self.redis.xgroup_create(STREAM_KEY, GROUP_NAME, id="0", mkstream=True)
+            logger.info(f"Created consumer group {GROUP_NAME}")
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def read(self, consumer: str, count: int, block_ms: int) -> List[Tuple[str, str]]:
+        """New messages for this consumer as (message_id, job_id)"""
+        response = await self.redis.xreadgroup(
+            GROUP_NAME, consumer, {STREAM_KEY: ">"}, count=count, block=block_ms
+        )
+        return [
+            (message_id, fields.get("job_id"))
+            for _, messages in response or []
+            for message_id, fields in messages
+        ]
+
+    async def claim_stale(self, consumer: str, min_idle_ms: int, count: int) -> List[Tuple[str, str]]:
+        """Take over messages whose worker has not acked them for min_idle_ms"""
+        response = await self.redis.xautoclaim(
+            STREAM_KEY, GROUP_NAME, consumer, min_idle_time=min_idle_ms, start_id="0-0", count=count
+        )
+        # [next_start_id, messages, deleted_ids] (Redis 7), messages may be None for trimmed ids
+        messages = response[1] if response else []
+        return [
+            (message_id, fields.get("job_id"))
+            for message_id, fields in messages
+            if fields
+        ]
+
+    async def ack(self, message_id: str) -> None:
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.xack(STREAM_KEY, GROUP_NAME, message_id)
+            pipe.xdel(STREAM_KEY, message_id)
+            await pipe.execute()
+
+    async def start_attempt(self, job_id: str) -> int:
+        """Mark job as running, returns the attempt number"""
+        attempts = await self.redis.hincrby(_job_key(job_id), "attempts", 1)
+        await self._update(job_id, status=STATUS_RUNNING)
+        return attempts
+
+    async def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        await self._update(
+            job_id,
+            ttl=settings.JOB_RESULT_TTL,
+            status=STATUS_DONE,
+            result=json.dumps(result, ensure_ascii=False),
+            error="",
+        )
+
+    async def fail(self, job_id: str, error: str) -> None:
+        await self._update(job_id, ttl=settings.JOB_RESULT_TTL, status=STATUS_FAILED, error=error)
+
+    async def mark_once(self, job_id: str, field: str) -> bool:
+        """Set a marker field on the job hash, True only for the first call"""
+        return bool(await self.redis.hsetnx(_job_key(job_id), field, str(time.time())))
+
+    async def requeue(self, job_id: str, error: str) -> None:
+        """Record a failed attempt, the message stays pending until reclaimed"""
+        await self._update(job_id, status=STATUS_QUEUED, error=error)
+
+    # Client side
+
+    async def subscribe(self, job_id: str, timeout: float) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield job state on every status change until it is final.
+
+        Subscribes before reading the current state so no transition is
+        missed in between.
+        """
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(_events_channel(job_id))
+        try:
+            job = await self.get(job_id)
+            if job is None:
+                return
+            yield job
+
+            deadline = time.monotonic() + timeout
+            while job["status"] not in FINAL_STATUSES:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=min(remaining, 15.0)
+                )
+                if message is None:
+                    # Heartbeat: lets the caller keep the connection alive
+                    yield {"status": job["status"], "heartbeat": True}
+                    continue
+                job = await self.get(job_id)
+                if job is None:
+                    return
+                yield job
+        finally:
+            await pubsub.unsubscribe()
+            await pubsub.aclose()
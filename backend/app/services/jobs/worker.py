@@ -0,0 +1,170 @@
+# app/services/jobs/worker.py
+"""
+Job worker process.
+
+    python -m app.services.jobs.worker
+
+Runs independently of the web tier and can be scaled by starting more
+processes; each one is a separate consumer in the same group. Every worker
+also polls the provider batches of bulk letter requests and takes part in
+scheduling database maintenance.
+"""
+import asyncio
+import logging
+import os
+import signal
+import socket
+from typing import Set
+
+from ...core.config import settings
+from ...core.cpu_pool import CPUPool
+from ...core.deadline import deadline_scope
+from ...core.http_client import HTTPClient
+from ..maintenance import MaintenanceScheduler
+from .handlers import FAILURE_HANDLERS, HANDLERS, PermanentJobError, get_bulk_service
+from .queue import FINAL_STATUSES, JobQueue
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    """Reads jobs from the stream and runs up to `concurrency` of them at once"""
+
+    def __init__(self, queue: JobQueue, consumer: str, concurrency: int):
+        self.queue = queue
+        self.consumer = consumer
+        self.concurrency = concurrency
+        self.tasks: Set[asyncio.Task] = set()
+        self.running: Set[str] = set()
+        self.stopping = asyncio.Event()
+
+    async def _fail(self, job_id: str, job: dict, error: str):
+        """Mark the job failed for good and let its type undo what it reserved"""
+        on_failure = FAILURE_HANDLERS.get(job["type"])
+        if on_failure is not None:
+            try:
+                await on_failure(job_id, job["payload"])
+            except Exception as e:
+                logger.error(f"Failure handler of job {job_id} failed: {e}", exc_info=True)
+        await self.queue.fail(job_id, error)
+
+    async def _process(self, message_id: str, job_id: str):
+        job = await self.queue.get(job_id)
+        if job is None:
+            # Expired before anybody picked it up
+            logger.warning(f"Job {job_id} not found, dropping message {message_id}")
+            await self.queue.ack(message_id)
+            return
+        if job["status"] in FINAL_STATUSES:
+            # Finished and stored, the worker stopped before the ack; delivery
+            # is at-least-once, so the job must not run (and charge) again
+            logger.warning(f"Job {job_id} already {job['status']}, acking redelivered message {message_id}")
+            await self.queue.ack(message_id)
+            return
+
+        handler = HANDLERS.get(job["type"])
+        if handler is None:
+            await self.queue.fail(job_id, f"Unknown job type {job['type']}")
+            await self.queue.ack(message_id)
+            return
+
+        attempt = await self.queue.start_attempt(job_id)
+        if attempt > settings.JOB_MAX_ATTEMPTS:
+            logger.error(f"Job {job_id} exceeded {settings.JOB_MAX_ATTEMPTS} attempts")
+            await self._fail(job_id, job, job.get("error") or "Too many attempts")
+            await self.queue.ack(message_id)
+            return
+
+        logger.info(f"Running {job['type']} job {job_id} (attempt {attempt})")
+        try:
+            with deadline_scope(settings.JOB_TIMEOUT):
+                result = await asyncio.wait_for(handler(job_id, job["payload"]), timeout=settings.JOB_TIMEOUT)
+        except PermanentJobError as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            await self._fail(job_id, job, str(e))
+            await self.queue.ack(message_id)
+        except Exception as e:
+            # Not acked: another attempt happens when the message is reclaimed
+            logger.error(f"Job {job_id} attempt {attempt} failed: {e}", exc_info=True)
+            await self.queue.requeue(job_id, str(e))
+        else:
+            await self.queue.complete(job_id, result)
+            await self.queue.ack(message_id)
+            logger.info(f"Job {job_id} done")
+
+    def _spawn(self, message_id: str, job_id: str):
+        if message_id in self.running:
+            # Reclaimed while still running here (job slower than JOB_CLAIM_IDLE_MS)
+            return
+        self.running.add(message_id)
+        task = asyncio.create_task(self._process(message_id, job_id))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        task.add_done_callback(lambda _: self.running.discard(message_id))
+
+    async def _wait_for_capacity(self):
+        while len(self.tasks) >= self.concurrency:
+            await asyncio.wait(set(self.tasks), return_when=asyncio.FIRST_COMPLETED)
+
+    async def run(self):
+        await self.queue.ensure_group()
+        logger.info(f"Worker {self.consumer} started (concurrency {self.concurrency})")
+
+        while not self.stopping.is_set():
+            try:
+                await self._wait_for_capacity()
+                free = self.concurrency - len(self.tasks)
+
+                # Messages of crashed workers (or failed attempts) first
+                messages = await self.queue.claim_stale(
+                    self.consumer, settings.JOB_CLAIM_IDLE_MS, free
+                )
+                if not messages:
+                    messages = await self.queue.read(self.consumer, free, block_ms=5000)
+
+                for message_id, job_id in messages:
+                    self._spawn(message_id, job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Worker loop error: {e}", exc_info=True)
+                await asyncio.sleep(1)
+
+        if self.tasks:
+            logger.info(f"Waiting for {len(self.tasks)} running jobs")
+            await asyncio.wait(set(self.tasks))
+        logger.info(f"Worker {self.consumer} stopped")
+
+
+async def main():
+    worker = JobWorker(
+        JobQueue(),
+        consumer=f"{socket.gethostname()}-{os.getpid()}",
+        concurrency=settings.JOB_WORKER_CONCURRENCY,
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stopping.set)
+
+    # Bulk batches are collected by whichever worker gets to them first,
+    # maintenance runs on one worker per interval
+    background = [asyncio.create_task(get_bulk_service().run_poller(worker.stopping))]
+    if settings.MAINTENANCE_INTERVAL > 0:
+        background.append(asyncio.create_task(MaintenanceScheduler().run(worker.stopping)))
+    try:
+        await worker.run()
+        await asyncio.gather(*background)
+    finally:
+        for task in background:
+            task.cancel()
+        await HTTPClient.close()
+        CPUPool.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
+    asyncio.run(main())
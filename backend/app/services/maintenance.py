@@ -0,0 +1,154 @@
+# app/services/maintenance.py
+import asyncio
+import json
+import logging
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import redis.asyncio as redis
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..crud.application import ApplicationCRUD
+from ..crud.employer import EmployerCRUD
+from ..crud.letter_draft import LetterDraftCRUD
+from ..crud.vacancy import VacancyCRUD
+
+logger = logging.getLogger(__name__)
+
+SLOT_KEY = "maintenance:slot"
+LOCK_KEY = "maintenance:lock"
+REPORT_KEY = "maintenance:last_report"
+REPORT_TTL = 7 * 86400
+
+# Extend or release the lock only while it is still ours
+_EXTEND_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def _tasks() -> List[Tuple[str, Callable[[Session, int], int]]]:
+    """
+    Maintenance tasks: name and a function processing one batch of at most
+    `limit` rows (deleting them, or creating and compressing partitions)
+    """
+    return [
+        (
+            "application_partitions",
+            lambda db, limit: ApplicationCRUD.ensure_partitions(db, settings.APPLICATIONS_PARTITIONS_AHEAD),
+        ),
+        (
+            "application_compression",
+            lambda db, limit: ApplicationCRUD.compress_old_partition(
+                db, settings.APPLICATIONS_COMPRESS_AFTER_MONTHS
+            ),
+        ),
+        (
+            "vacancies",
+            lambda db, limit: VacancyCRUD.clean_old_vacancies(
+                db, settings.MAINTENANCE_VACANCY_RETENTION_DAYS, limit
+            ),
+        ),
+        # After vacancies, so employers they were the last ones of go in the same run
+        ("employers", lambda db, limit: EmployerCRUD.delete_orphans(db, limit)),
+        ("mapping_sessions", lambda db, limit: ApplicationCRUD.cleanup_expired_mappings(db, limit)),
+        (
+            "letter_drafts",
+            lambda db, limit: LetterDraftCRUD.delete_expired(db, settings.DRAFTS_MAX_AGE_HOURS, limit),
+        ),
+    ]
+
+
+class MaintenanceScheduler:
+    """
+    Periodic cleanup of old vacancies, employers left without vacancies,
+    expired pseudonymization sessions and letter drafts, plus monthly
+    partitions of applications: created ahead and compressed when old.
+
+    Every worker runs the scheduler, but once per MAINTENANCE_INTERVAL only
+    the one that claims the slot key does the work, under a lock that is
+    extended after every batch. Deletes go in batches of
+    MAINTENANCE_BATCH_SIZE rows with MAINTENANCE_BATCH_PAUSE between them,
+    so they never hold many row locks or produce a WAL burst at once.
+    """
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        self.redis = redis_client or redis.from_url(settings.REDIS_URL, decode_responses=True)
+        self.token = uuid.uuid4().hex
+        self.stopping = asyncio.Event()
+
+    async def _extend_lock(self) -> bool:
+        extended = await self.redis.eval(_EXTEND_LOCK, 1, LOCK_KEY, self.token, settings.MAINTENANCE_LOCK_TTL)
+        return bool(extended)
+
+    async def _run_task(self, name: str, delete_batch: Callable[[Session, int], int]) -> Dict[str, Any]:
+        def run_batch() -> int:
+            with SessionLocal() as db:
+                return delete_batch(db, settings.MAINTENANCE_BATCH_SIZE)
+
+        loop = asyncio.get_running_loop()
+        report = {"deleted": 0, "batches": 0, "duration_ms": 0, "error": None}
+        start = time.monotonic()
+        while report["batches"] < settings.MAINTENANCE_MAX_BATCHES:
+            try:
+                deleted = await loop.run_in_executor(None, run_batch)
+            except Exception as e:
+                logger.error(f"Maintenance task {name} failed: {e}", exc_info=True)
+                report["error"] = str(e)[:500]
+                break
+            report["batches"] += 1
+            report["deleted"] += deleted
+            if deleted < settings.MAINTENANCE_BATCH_SIZE or self.stopping.is_set():
+                break
+            if not await self._extend_lock():
+                report["error"] = "lock lost"
+                break
+            await asyncio.sleep(settings.MAINTENANCE_BATCH_PAUSE)
+
+        report["duration_ms"] = int((time.monotonic() - start) * 1000)
+        logger.info(
+            f"Maintenance {name}: deleted {report['deleted']} rows in {report['batches']} batches, "
+            f"{report['duration_ms']} ms"
+        )
+        return report
+
+    async def run_once(self) -> Optional[Dict[str, Any]]:
+        """Run all tasks if this instance holds the lock, returns the report"""
+        if not await self.redis.set(LOCK_KEY, self.token, nx=True, ex=settings.MAINTENANCE_LOCK_TTL):
+            return None
+        try:
+            report = {"started_at": datetime.utcnow().isoformat(), "tasks": {}}
+            for name, delete_batch in _tasks():
+                report["tasks"][name] = await self._run_task(name, delete_batch)
+            await self.redis.set(REPORT_KEY, json.dumps(report), ex=REPORT_TTL)
+            return report
+        finally:
+            await self.redis.eval(_RELEASE_LOCK, 1, LOCK_KEY, self.token)
+
+    async def run(self, stopping: asyncio.Event):
+        """Claim and run maintenance slots until `stopping` is set"""
+        self.stopping = stopping
+        while not stopping.is_set():
+            try:
+                # The slot expires after MAINTENANCE_INTERVAL, whoever sets it next runs
+                if await self.redis.set(SLOT_KEY, self.token, nx=True, ex=settings.MAINTENANCE_INTERVAL):
+                    await self.run_once()
+            except Exception as e:
+                logger.error(f"Maintenance scheduler error: {e}", exc_info=True)
+            try:
+                await asyncio.wait_for(stopping.wait(), settings.MAINTENANCE_CHECK_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
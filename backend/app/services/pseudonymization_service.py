@@ -1,42 +1,79 @@
 import logging
-from typing import Dict, Tuple, Any, List
+import re
+from functools import lru_cache
+from typing import Dict, Tuple, Any, List, Optional
 from uuid import UUID, uuid4
+
+import redis.asyncio as redis
 from sqlalchemy.orm import Session
 
+from ..core.config import settings
+
 logger = logging.getLogger(__name__)
 
+
+def _mappings_key(session_id: UUID) -> str:
+    return f"pseudo:{session_id}"
+
+
+@lru_cache(maxsize=256)
+def _pseudonym_pattern(pseudonyms: Tuple[str, ...]) -> re.Pattern:
+    """
+    Одна регулярка-альтернация по всем псевдонимам сессии.
+
+    Псевдонимы почти всегда одни и те же ([КОМПАНИЯ_1], [КОМПАНИЯ_2], ...),
+    поэтому скомпилированные шаблоны переиспользуются между сессиями.
+    Длинные идут первыми, чтобы не сработал более короткий префикс.
+    """
+    ordered = sorted(pseudonyms, key=len, reverse=True)
+    return re.compile("|".join(map(re.escape, ordered)))
+
+
+def restore_pseudonyms(text: str, mappings: Dict[str, str]) -> str:
+    """Замена всех псевдонимов (pseudonym -> original) за один проход по тексту"""
+    if not text or not mappings:
+        return text
+    pattern = _pseudonym_pattern(tuple(sorted(mappings)))
+    return pattern.sub(lambda match: mappings[match.group(0)], text)
+
+
 class PseudonymizationService:
-    """Сервис для псевдонимизации компаний и учебных заведений"""
-    
-    def __init__(self):
-        # Кэш для хранения маппингов в памяти
-        self._mappings_cache = {}
-    
-    def pseudonymize_resume(self, db: Session, user_id: str, 
-                           resume_data: Dict[str, Any]) -> Tuple[Dict[str, Any], UUID]:
+    """
+    Сервис для псевдонимизации компаний и учебных заведений.
+
+    Маппинги сессии хранятся в Redis-хэше `pseudo:{session_id}` с TTL
+    (общий для всех воркеров), Postgres - долговременное хранилище,
+    из которого читаем, если в Redis ключа нет.
+    """
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        self.redis = redis_client or redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+    async def pseudonymize_resume(self, db: Session, user_id: str,
+                                  resume_data: Dict[str, Any]) -> Tuple[Dict[str, Any], UUID]:
         """Псевдонимизация резюме - только компании и учебные заведения"""
         session_id = uuid4()
         pseudo_resume = resume_data.copy()
-        
+
         company_counter = 0
         education_counter = 0
         mappings = []
-        
+
         # Обработка опыта работы
         if 'experience' in pseudo_resume and pseudo_resume['experience']:
             for exp in pseudo_resume['experience']:
                 if exp.get('company'):
                     company_counter += 1
                     pseudonym = f"[КОМПАНИЯ_{company_counter}]"
-                    
+
                     mappings.append({
                         'original': exp['company'],
                         'pseudonym': pseudonym,
                         'type': 'company'
                     })
-                    
+
                     exp['company'] = pseudonym
-        
+
         # Обработка образования
         if 'education' in pseudo_resume and pseudo_resume['education']:
             primary_education = pseudo_resume['education'].get('primary', [])
@@ -44,109 +81,96 @@ class PseudonymizationService:
                 if edu.get('name'):
                     education_counter += 1
                     pseudonym = f"[УЧЕБНОЕ_ЗАВЕДЕНИЕ_{education_counter}]"
-                    
+
                     mappings.append({
                         'original': edu['name'],
                         'pseudonym': pseudonym,
                         'type': 'education'
                     })
-                    
+
                     edu['name'] = pseudonym
-        
-        # Сохраняем маппинги в кэш
-        self._mappings_cache[str(session_id)] = mappings
-        
-        # Сохраняем в БД только если есть маппинги
+
         if mappings:
+            await self._cache_mappings(session_id, mappings)
+
             try:
                 # Import here to avoid circular imports
                 from ..crud.application import ApplicationCRUD
-                
+
                 ApplicationCRUD.save_pseudonymization_mappings(
                     db=db,
                     session_id=session_id,
                     user_id=UUID(user_id),
                     mappings=mappings
                 )
-                logger.info(f"Saved {len(mappings)} mappings to DB via ORM")
-                
+                logger.info(f"Saved {len(mappings)} mappings to DB")
+
             except Exception as e:
                 logger.error(f"Failed to save mappings to DB: {e}")
-                # Продолжаем работу, используя кэш
-        
+                # Продолжаем работу, маппинги остаются в Redis до истечения TTL
+
         logger.info(f"Pseudonymized {company_counter} companies and {education_counter} education institutions")
-        
+
         return pseudo_resume, session_id
-    
-    def restore_text(self, db: Session, session_id: UUID, pseudonymized_text: str) -> str:
+
+    async def _cache_mappings(self, session_id: UUID, mappings: List[dict]) -> None:
+        key = _mappings_key(session_id)
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                pipe.hset(key, mapping={m['pseudonym']: m['original'] for m in mappings})
+                pipe.expire(key, settings.PSEUDONYM_MAPPING_TTL)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to cache mappings for session {session_id}: {e}")
+
+    async def _load_mappings(self, db: Session, session_id: UUID) -> Dict[str, str]:
+        """Маппинги pseudonym -> original: сначала Redis, потом БД"""
+        try:
+            mappings = await self.redis.hgetall(_mappings_key(session_id))
+            if mappings:
+                return mappings
+        except Exception as e:
+            logger.error(f"Failed to read mappings from Redis for session {session_id}: {e}")
+
+        # Import here to avoid circular imports
+        from ..crud.application import ApplicationCRUD
+
+        rows = ApplicationCRUD.get_pseudonymization_mappings(db=db, session_id=session_id)
+        logger.info(f"Loaded {len(rows)} mappings from DB for session {session_id}")
+        return {row['pseudonym']: row['original'] or "" for row in rows}
+
+    async def restore_text(self, db: Session, session_id: UUID, pseudonymized_text: str) -> str:
         """Восстановление оригинального текста из псевдонимов"""
-        session_id_str = str(session_id)
-        
-        # Сначала пробуем кэш
-        if session_id_str in self._mappings_cache:
-            mappings = self._mappings_cache[session_id_str]
-            restored = pseudonymized_text
-            
-            for mapping in mappings:
-                if mapping['pseudonym'] in restored:
-                    restored = restored.replace(
-                        mapping['pseudonym'], 
-                        mapping['original']
-                    )
-            
-            logger.info(f"Restored text from cache for session {session_id_str}")
-            return restored
-        
-        # Если нет в кэше, загружаем из БД
         try:
-            # Import here to avoid circular imports
-            from ..crud.application import ApplicationCRUD
-            
-            mappings = ApplicationCRUD.get_pseudonymization_mappings(
-                db=db,
-                session_id=session_id
-            )
-            
-            restored = pseudonymized_text
-            mappings_count = 0
-            
-            for mapping in mappings:
-                if mapping['pseudonym'] in restored:
-                    restored = restored.replace(
-                        mapping['pseudonym'], 
-                        mapping['original']
-                    )
-                    mappings_count += 1
-            
-            logger.info(f"Restored {mappings_count} mappings from DB for session {session_id_str}")
-            return restored
-            
+            mappings = await self._load_mappings(db, session_id)
         except Exception as e:
-            logger.error(f"Failed to restore text from DB: {e}", exc_info=True)
+            logger.error(f"Failed to load mappings for session {session_id}: {e}", exc_info=True)
             # Возвращаем оригинальный текст если не можем восстановить
             return pseudonymized_text
-    
-    def clear_cache(self, session_id: UUID = None):
-        """Очистка кэша маппингов"""
+
+        return restore_pseudonyms(pseudonymized_text, mappings)
+
+    async def clear_cache(self, session_id: UUID = None):
+        """Удаление маппингов из Redis (в БД они живут до expires_at)"""
         if session_id:
-            session_id_str = str(session_id)
-            if session_id_str in self._mappings_cache:
-                del self._mappings_cache[session_id_str]
-                logger.info(f"Cleared cache for session {session_id_str}")
+            await self.redis.delete(_mappings_key(session_id))
+            logger.info(f"Cleared cache for session {session_id}")
         else:
-            self._mappings_cache.clear()
-            logger.info("Cleared all mappings cache")
-    
+            keys = [key async for key in self.redis.scan_iter(match="pseudo:*", count=500)]
+            if keys:
+                await self.redis.delete(*keys)
+            logger.info(f"Cleared {len(keys)} cached mapping sessions")
+
     def cleanup_expired_mappings(self, db: Session) -> int:
         """Очистка устаревших маппингов"""
         try:
             # Import here to avoid circular imports
             from ..crud.application import ApplicationCRUD
-            
+
             deleted_count = ApplicationCRUD.cleanup_expired_mappings(db)
             logger.info(f"Cleaned up {deleted_count} expired mapping sessions")
             return deleted_count
-            
+
         except Exception as e:
             logger.error(f"Failed to cleanup expired mappings: {e}", exc_info=True)
-            return 0
\ No newline at end of file
+            return 0
@@ -0,0 +1,202 @@
+# app/services/relevance.py
+import logging
+import re
+import threading
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from scipy import sparse
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Key skills are counted this many times, they are the best signal HH gives
+KEY_SKILL_WEIGHT = 3
+# Crude stemming: Russian inflections mostly change the ending, so words are
+# cut to a fixed prefix ("разработчик", "разработка" -> "разраб")
+STEM_LENGTH = 6
+
+_WORD_RE = re.compile(r"[^\W_]+(?:[+#]+|(?:[.\-][^\W_]+)*)")
+_STOP_WORDS = frozenset(
+    "и в во не что он на я с со как а то все она так его но да ты к у же вы за бы по "
+    "только ее мне было вот от меня еще нет о из ему когда даже ну ли если уже или ни быть "
+    "был него до вас нибудь опыт работы работа также для при наш наши нас мы вас вам ваш "
+    "and or the a an of to in for on with at by from as is are be we you our your will".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased stemmed words without stop words, keeps "c++", "c#", "node.js" whole"""
+    if not text:
+        return []
+    return [
+        word[:STEM_LENGTH] if word.isalpha() else word
+        for word in _WORD_RE.findall(text.lower())
+        if len(word) > 1 and word not in _STOP_WORDS
+    ]
+
+
+def vacancy_terms(vacancy: Dict[str, Any]) -> List[str]:
+    """Terms of a vacancy: title, description and (weighted) key skills"""
+    skills = [
+        skill.get("name", "") if isinstance(skill, dict) else str(skill)
+        for skill in vacancy.get("key_skills") or []
+    ]
+    skill_terms = tokenize(" ".join(skills))
+    return (
+        tokenize(vacancy.get("name") or "")
+        + tokenize(vacancy.get("description") or "")
+        + skill_terms * KEY_SKILL_WEIGHT
+    )
+
+
+def resume_terms(resume: Dict[str, Any]) -> List[str]:
+    """Terms of a resume: title, skill set, about and positions with their descriptions"""
+    parts = [resume.get("title") or "", resume.get("skills") or ""]
+    parts.extend(resume.get("skill_set") or [])
+    for exp in resume.get("experience") or []:
+        parts.append(exp.get("position") or "")
+        parts.append(exp.get("description") or "")
+    return tokenize(" ".join(parts))
+
+
+class Vocabulary:
+    """
+    Term index and document frequencies shared across requests.
+
+    A single search page is too small for meaningful IDF, so every vacancy
+    seen (once per id) adds to the statistics. Terms beyond `max_terms` are
+    not indexed and simply do not contribute to scores.
+    """
+
+    def __init__(self, max_terms: int, max_documents: int):
+        self.max_terms = max_terms
+        self.index: Dict[str, int] = {}
+        self.df = np.zeros(max_terms, dtype=np.float64)
+        self.documents = 0
+        self.total_length = 0
+        # Ids already counted, bounded so the set does not grow forever
+        self._seen_order = deque(maxlen=max_documents)
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def observe(self, doc_id: str, terms: Iterable[str]):
+        """Add a document to the statistics unless it was counted before"""
+        terms = list(terms)
+        with self._lock:
+            if doc_id in self._seen:
+                return
+            if len(self._seen_order) == self._seen_order.maxlen:
+                self._seen.discard(self._seen_order[0])
+            self._seen_order.append(doc_id)
+            self._seen.add(doc_id)
+
+            for term in set(terms):
+                column = self.index.get(term)
+                if column is None:
+                    if len(self.index) >= self.max_terms:
+                        continue
+                    column = self.index[term] = len(self.index)
+                self.df[column] += 1
+            self.documents += 1
+            self.total_length += len(terms)
+
+    @property
+    def avg_length(self) -> float:
+        return self.total_length / self.documents if self.documents else 1.0
+
+    def idf(self) -> np.ndarray:
+        size = len(self.index)
+        df = self.df[:size]
+        return np.log1p((self.documents - df + 0.5) / (df + 0.5))
+
+    def counts_matrix(self, documents: List[List[str]]) -> sparse.csr_matrix:
+        """Term counts, one row per document, unknown terms dropped"""
+        rows, columns = [], []
+        for row, terms in enumerate(documents):
+            for term in terms:
+                column = self.index.get(term)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+        data = np.ones(len(rows), dtype=np.float64)
+        # Duplicate (row, column) pairs are summed on conversion to CSR
+        return sparse.csr_matrix(
+            (data, (rows, columns)), shape=(len(documents), len(self.index))
+        )
+
+
+def bm25_scores(
+    vocabulary: Vocabulary,
+    vacancy_docs: List[List[str]],
+    resume_docs: List[List[str]],
+) -> np.ndarray:
+    """
+    BM25 score matrix of shape (vacancies, resumes).
+
+    Vacancies are the documents and each resume is a query: the weighted
+    vacancy matrix is multiplied by the binary resume term matrix, so all
+    pairs are scored in one sparse product.
+    """
+    if not vacancy_docs or not resume_docs:
+        return np.zeros((len(vacancy_docs), len(resume_docs)))
+
+    tf = vocabulary.counts_matrix(vacancy_docs)
+    lengths = np.array([len(terms) for terms in vacancy_docs], dtype=np.float64)
+    norm = K1 * (1 - B + B * lengths / vocabulary.avg_length)
+
+    # tf * (k1 + 1) / (tf + norm) on the non-zero entries only
+    weighted = tf.tocoo()
+    weighted.data = weighted.data * (K1 + 1) / (weighted.data + norm[weighted.row])
+    weighted = weighted.tocsr().multiply(vocabulary.idf()).tocsr()
+
+    queries = vocabulary.counts_matrix(resume_docs)
+    queries.data[:] = 1.0
+    return np.asarray((weighted @ queries.T).todense())
+
+
+# One vocabulary per process, warmed up by every search
+vocabulary = Vocabulary(
+    max_terms=settings.RELEVANCE_MAX_TERMS,
+    max_documents=settings.RELEVANCE_MAX_DOCUMENTS,
+)
+
+
+def rank_vacancies(
+    vacancies: List[Dict[str, Any]], resumes: List[Dict[str, Any]]
+) -> List[Optional[Dict[str, Any]]]:
+    """
+    Score vacancies against resumes.
+
+    Returns per vacancy {"score", "resume_id", "scores"} where `resume_id`
+    is the best matching resume and `scores` maps every resume id to its
+    score, or None for vacancies without any text.
+    """
+    vacancy_docs = [vacancy_terms(v) for v in vacancies]
+    for vacancy, terms in zip(vacancies, vacancy_docs):
+        if terms and vacancy.get("id"):
+            vocabulary.observe(str(vacancy["id"]), terms)
+
+    resume_ids = [r.get("id") for r in resumes]
+    scores = bm25_scores(vocabulary, vacancy_docs, [resume_terms(r) for r in resumes])
+
+    ranked = []
+    for row, terms in enumerate(vacancy_docs):
+        if not terms or not resume_ids:
+            ranked.append(None)
+            continue
+        best = int(np.argmax(scores[row]))
+        ranked.append({
+            "score": round(float(scores[row, best]), 3),
+            "resume_id": resume_ids[best],
+            "scores": {
+                resume_id: round(float(score), 3)
+                for resume_id, score in zip(resume_ids, scores[row])
+            },
+        })
+    return ranked
@@ -0,0 +1,86 @@
+# app/services/resume_cache.py
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from ..core.config import settings
+from .redis_service import RedisService
+
+logger = logging.getLogger(__name__)
+
+
+def resume_content_hash(resume: Dict[str, Any]) -> str:
+    """
+    Hash of the resume fields the prompt is built from.
+
+    Includes the resume token budget, so changing it re-prepares every
+    resume instead of serving texts fitted into the old budget.
+    """
+    education = (resume.get("education") or {}).get("primary") or []
+    payload = json.dumps(
+        [
+            settings.PROMPT_RESUME_TOKEN_BUDGET,
+            resume.get("skills"),
+            [
+                [e.get("company"), e.get("position"), e.get("start"), e.get("end"), e.get("description")]
+                for e in resume.get("experience") or []
+            ],
+            [[e.get("name"), e.get("organization"), e.get("year")] for e in education],
+            [[l.get("name"), (l.get("level") or {}).get("name")] for l in resume.get("language") or []],
+        ],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _prepared_key(content_hash: str) -> str:
+    return f"resumes:prepared:{content_hash}"
+
+
+def _hash_key(hh_user_id: str, resume_id: str) -> str:
+    return f"resumes:hash:{hh_user_id}:{resume_id}"
+
+
+class ResumeTextCache:
+    """
+    Prepared resume text and its token count in Redis by content hash.
+
+    Letters for the same resume reuse one entry. When the resume list is
+    refreshed from HH, track() drops the entries of resumes whose content
+    changed instead of waiting for the TTL.
+    """
+
+    def __init__(self, redis_service: Optional[RedisService] = None):
+        self.redis_service = redis_service or RedisService()
+
+    async def get(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """{"text", "tokens"} or None"""
+        return await self.redis_service.get_json(_prepared_key(content_hash))
+
+    async def set(self, content_hash: str, text: str, tokens: int):
+        await self.redis_service.set_json(
+            _prepared_key(content_hash),
+            {"text": text, "tokens": tokens},
+            settings.RESUME_PREPARED_CACHE_TTL,
+        )
+
+    async def track(self, hh_user_id: str, resumes: List[Dict[str, Any]]):
+        """Remember content hashes of fresh resumes, dropping entries of changed ones"""
+        resumes = [r for r in resumes if r.get("id")]
+        if not resumes:
+            return
+        try:
+            redis_client = self.redis_service.redis
+            keys = [_hash_key(hh_user_id, r["id"]) for r in resumes]
+            previous = await redis_client.mget(keys)
+            async with redis_client.pipeline(transaction=False) as pipe:
+                for key, resume, old_hash in zip(keys, resumes, previous):
+                    new_hash = resume_content_hash(resume)
+                    if old_hash and old_hash != new_hash:
+                        logger.info(f"Resume {resume['id']} changed, dropping its prepared text")
+                        pipe.delete(_prepared_key(old_hash))
+                    pipe.set(key, new_hash, ex=settings.RESUME_PREPARED_CACHE_TTL)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Failed to track resume hashes for {hh_user_id}: {e}")
@@ -0,0 +1,139 @@
+# app/services/text_extraction.py
+import re
+from typing import List
+from html.entities import html5
+
+# Tags that start a new line
+_BLOCK_TAGS = (
+    "p", "div", "br", "ul", "ol", "li", "tr", "table", "section", "article",
+    "header", "footer", "blockquote", "pre", "hr",
+    "h1", "h2", "h3", "h4", "h5", "h6", "dl", "dt", "dd",
+)
+# Tags that separate words but not lines
+_SPACE_TAGS = ("td", "th", "img")
+# Tags whose content is dropped entirely
+_SKIP_TAGS = "script|style|noscript|template|head|title"
+
+# Line breaks and dropped blocks are marked with control characters while
+# tags are replaced. Both marks are consumed before the text is returned.
+_LINE_MARK = "\x00"
+_SKIP_MARK = "\x01"
+
+# A "gap" is a run of tags, comments and dropped blocks (with whitespace in
+# between) and is replaced as a whole by "", " ", a line break or a line
+# break and "- " depending on what it contains. Every alternative starts with
+# "<" so the regex engine skips plain text in C. Tag bodies stop at the next
+# "<", so a stray "<" in text costs a bounded scan instead of one to the end
+# of the document.
+_TAG = (
+    rf"<(?:!--.*?-->"
+    rf"|(?:{_SKIP_TAGS})\b[^<>]*>[^<]*(?:<(?!/(?:{_SKIP_TAGS})\b)[^<]*)*(?:</[a-zA-Z]+\s*>)?"
+    r"|/?[a-zA-Z][^<>]*>)"
+)
+_GAP_RE = re.compile(rf"({_TAG}(?:\s*{_TAG})*)", re.IGNORECASE | re.DOTALL)
+# Same runs for documents without comments and dropped blocks (nearly all of
+# HH markup): one alternative, so the search for "<" stays a plain scan
+_PLAIN_TAG = r"</?[a-zA-Z][^<>]*>"
+_PLAIN_GAP_RE = re.compile(rf"({_PLAIN_TAG}(?:\s*{_PLAIN_TAG})*)")
+_ENTITY_RE = re.compile(r"(&(?:#[0-9]{1,7}|#[xX][0-9a-fA-F]{1,6}|[a-zA-Z][a-zA-Z0-9]{1,31});?)")
+_BLOCK_RE = re.compile(rf"</?(?:{'|'.join(_BLOCK_TAGS)})\b", re.IGNORECASE)
+_LIST_ITEM_RE = re.compile(r"<li\b", re.IGNORECASE)
+_SPACE_RE = re.compile(rf"\s|<(?:{'|'.join(_SPACE_TAGS)})\b", re.IGNORECASE)
+_SKIP_START_RE = re.compile(rf"<(?:{_SKIP_TAGS})\b", re.IGNORECASE)
+# Comments and dropped blocks inside a gap, removed before classifying it
+_SKIPPED_RE = re.compile(
+    rf"<!--.*?-->|<({_SKIP_TAGS})\b.*?(?:</\1\s*>|$)", re.IGNORECASE | re.DOTALL
+)
+
+
+def _decode_entity(entity: str) -> str:
+    """Decode a named or numeric entity, unknown ones are kept as is"""
+    name = entity[1:].rstrip(";")
+    if name[0] == "#":
+        code = int(name[2:], 16) if name[1] in "xX" else int(name[1:])
+        # Like html.unescape: NUL, surrogates and out of range code points are invalid
+        valid = 0 < code < 0x110000 and not 0xD800 <= code <= 0xDFFF
+        decoded = chr(code) if valid else "\ufffd"
+    else:
+        decoded = html5.get(name + ";") or html5.get(name) or entity
+    # &nbsp; and the like end up as one space anyway, a plain one keeps the text on the fast path
+    return " " if decoded.isspace() else decoded
+
+
+def _classify_gap(gap: str) -> str:
+    cleaned = gap
+    if "<!--" in gap or _SKIP_START_RE.search(gap):
+        # Markup inside comments and dropped blocks must not produce breaks
+        cleaned = _SKIPPED_RE.sub("", gap)
+    if _BLOCK_RE.search(cleaned):
+        return _LINE_MARK + "- " if _LIST_ITEM_RE.search(cleaned) else _LINE_MARK
+    return " " if _SPACE_RE.search(cleaned) else ""
+
+
+def _classify_plain_gap(gap: str) -> str:
+    # A dropped block needs _GAP_RE, which takes its content into the gap
+    return _SKIP_MARK if _SKIP_START_RE.search(gap) else _GAPS[gap]
+
+
+class _Replacements(dict):
+    """
+    Memoized replacements of gaps or entities. HH markup repeats a small set
+    of them ("</li><li>", "</p> <p>", "&nbsp;"...), so most lookups are dict
+    hits made from C by map() and never reach Python code.
+    """
+    max_size = 4096
+
+    def __init__(self, replace):
+        super().__init__()
+        self.replace = replace
+
+    def __missing__(self, token: str) -> str:
+        replacement = self.replace(token)
+        if len(token) <= 256 and len(self) < self.max_size:
+            self[token] = replacement
+        return replacement
+
+
+_GAPS = _Replacements(_classify_gap)
+_PLAIN_GAPS = _Replacements(_classify_plain_gap)
+_ENTITIES = _Replacements(_decode_entity)
+
+
+def _replace(regex: re.Pattern, replacements: _Replacements, text: str) -> str:
+    """Replace every match of the (single group) regex, without a Python call per match"""
+    parts = regex.split(text)
+    parts[1::2] = map(replacements.__getitem__, parts[1::2])
+    return "".join(parts)
+
+
+def extract_text(html_text: str) -> str:
+    """
+    Convert HH vacancy HTML to plain text.
+
+    Tags are stripped, script/style content dropped, every HTML5 entity
+    decoded, runs of whitespace collapsed to one space, and block elements
+    (paragraphs, list items, line breaks, headings) kept as line breaks.
+    List items are prefixed with "- ".
+    """
+    if not html_text:
+        return ""
+    text = html_text
+    if "<" in text:
+        if "<!--" not in html_text:
+            text = _replace(_PLAIN_GAP_RE, _PLAIN_GAPS, html_text)
+        if "<!--" in html_text or _SKIP_MARK in text:
+            text = _replace(_GAP_RE, _GAPS, html_text)
+    if "&" in text:
+        # After tag stripping, so "&lt;p&gt;" stays text
+        text = _replace(_ENTITY_RE, _ENTITIES, text)
+    lines = text.split(_LINE_MARK)
+    if "  " in text or not all(map(str.isprintable, lines)):
+        # Runs of spaces or other whitespace (isprintable() is False for all
+        # whitespace but " "), collapse them. Otherwise stripping is enough
+        lines = " ".join(text.split()).split(_LINE_MARK)
+    return "\n".join(filter(None, map(str.strip, lines)))
+
+
+def extract_texts(html_texts: List[str]) -> List[str]:
+    """Batch version of extract_text, used as a process pool task"""
+    return [extract_text(html_text) for html_text in html_texts]
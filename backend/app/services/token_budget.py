@@ -0,0 +1,197 @@
+# app/services/token_budget.py
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+TOKENIZER_ENCODING = "o200k_base"
+TRUNCATION_MARK = "…"
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Load local tokenizer once, None if it is not available"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception as e:
+        logger.warning(f"Tokenizer {TOKENIZER_ENCODING} unavailable, using estimate: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count prompt tokens with the local tokenizer (estimate as fallback)"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        # Cyrillic text averages about three characters per token
+        return max(1, len(text) // 3)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to at most max_tokens, preferring a word boundary"""
+    if max_tokens <= 0 or not text:
+        return ""
+    encoding = _get_encoding()
+    if encoding is None:
+        if len(text) <= max_tokens * 3:
+            return text
+        cut = text[: max_tokens * 3]
+    else:
+        tokens = encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        cut = encoding.decode(tokens[:max_tokens])
+
+    boundary = cut.rfind(" ")
+    if boundary > len(cut) // 2:
+        cut = cut[:boundary]
+    return cut.rstrip(" ,;:-") + TRUNCATION_MARK
+
+
+@dataclass
+class Section:
+    """
+    Prompt section for budgeting.
+
+    `head` is kept as long as the section is kept, `body` may be shortened
+    down to `min_tokens`. Sections with lower `priority` are trimmed first.
+    """
+    head: str
+    body: str = ""
+    priority: int = 50
+    min_tokens: int = 0
+    head_tokens: int = 0
+    body_tokens: int = 0
+    dropped: bool = False
+
+    @property
+    def tokens(self) -> int:
+        return 0 if self.dropped else self.head_tokens + self.body_tokens
+
+    def render(self) -> str:
+        return f"{self.head}{self.body}"
+
+
+def fit_sections(sections: List[Section], budget: int) -> List[Section]:
+    """
+    Deterministically fit sections into a token budget.
+
+    1. Shorten bodies down to their minimum, lowest priority first.
+    2. Drop whole sections, lowest priority first (the highest one is kept).
+    3. Cut the remaining highest priority body to whatever is left.
+
+    Returns kept sections in their original order.
+    """
+    for section in sections:
+        section.head_tokens = count_tokens(section.head)
+        section.body_tokens = count_tokens(section.body)
+
+    total = sum(s.tokens for s in sections)
+    if total <= budget:
+        return sections
+
+    # Ties keep document order: earlier sections are considered more valuable
+    by_value = sorted(
+        range(len(sections)), key=lambda i: (sections[i].priority, -i)
+    )
+
+    for i in by_value:
+        if total <= budget:
+            break
+        section = sections[i]
+        if section.body_tokens <= section.min_tokens:
+            continue
+        excess = total - budget
+        target = max(section.min_tokens, section.body_tokens - excess)
+        section.body = truncate_tokens(section.body, target)
+        new_tokens = count_tokens(section.body)
+        total -= section.body_tokens - new_tokens
+        section.body_tokens = new_tokens
+
+    for i in by_value[:-1]:
+        if total <= budget:
+            break
+        total -= sections[i].tokens
+        sections[i].dropped = True
+
+    if total > budget:
+        top = sections[by_value[-1]]
+        target = max(0, top.body_tokens - (total - budget))
+        top.body = truncate_tokens(top.body, target)
+        top.body_tokens = count_tokens(top.body)
+
+    return [s for s in sections if not s.dropped]
+
+
+# Vacancy headings with their value for the letter
+_VACANCY_HEADINGS = [
+    (90, ["Требования", "Что мы ждем", "Мы ожидаем", "Ожидания", "Requirements"]),
+    (85, ["Стек", "Технологии", "Tech stack", "Stack"]),
+    (80, ["Обязанности", "Задачи", "Чем предстоит заниматься", "Responsibilities"]),
+    (60, ["Будет плюсом", "Плюсом будет", "Nice to have"]),
+    (30, ["Условия", "Что мы предлагаем", "Мы предлагаем", "We offer"]),
+    (20, ["О компании", "О нас", "About us"]),
+]
+# A heading word at the start of a line (after list bullets or markup
+# leftovers), optionally followed by a short qualifier up to a colon. The same
+# words mid-sentence ("а Условия работы гибкие") are text, not headings.
+_VACANCY_HEADING_RE = re.compile(
+    r"^[^\w\n]*(?:"
+    + "|".join(
+        f"(?P<h{i}>(?:{'|'.join(map(re.escape, words))})(?!\\w)(?:[^:\n.]{{0,40}}:)?)"
+        for i, (_, words) in enumerate(_VACANCY_HEADINGS)
+    )
+    + ")",
+    re.MULTILINE,
+)
+_INTRO_PRIORITY = 50
+
+
+def split_vacancy_sections(text: str) -> List[Section]:
+    """Split vacancy text into sections by well-known headings"""
+    sections = []
+    matches = list(_VACANCY_HEADING_RE.finditer(text))
+    intro_end = matches[0].start() if matches else len(text)
+    intro = text[:intro_end].strip()
+    if intro:
+        sections.append(Section(head="", body=intro, priority=_INTRO_PRIORITY, min_tokens=40))
+
+    for n, match in enumerate(matches):
+        end = matches[n + 1].start() if n + 1 < len(matches) else len(text)
+        priority = _VACANCY_HEADINGS[int(match.lastgroup[1:])][0]
+        body = text[match.end():end].strip()
+        sections.append(
+            Section(
+                head=f"\n{match.group(match.lastgroup).strip()} ",
+                body=body,
+                priority=priority,
+                min_tokens=60 if priority >= 80 else 0,
+            )
+        )
+    return sections
+
+
+def fit_vacancy_text(
+    text: str,
+    key_skills: Optional[List[str]],
+    budget: int,
+    known_tokens: Optional[int] = None,
+) -> str:
+    """Fit vacancy text and key skills into budget keeping requirements first"""
+    skills_line = f"Ключевые навыки: {', '.join(key_skills)}" if key_skills else ""
+
+    if known_tokens is not None and known_tokens + count_tokens(skills_line) <= budget:
+        return f"{text}\n{skills_line}" if skills_line else text
+
+    sections = split_vacancy_sections(text)
+    if skills_line:
+        sections.append(Section(head="\n", body=skills_line, priority=95, min_tokens=30))
+
+    kept = fit_sections(sections, budget)
+    return "".join(s.render() for s in kept).strip()
@@ -0,0 +1,44 @@
+# app/services/vacancy_ingest.py
+from typing import Any, Dict, List
+
+from ..core.config import settings
+from .dedup import bands, vacancy_minhash
+from .digest import vacancy_content_hash, vacancy_digest
+from .text_extraction import extract_texts
+from .token_budget import count_tokens
+
+# What the pool needs of an HH vacancy, the rest of the body is not shipped
+INGEST_FIELDS = ("name", "description", "key_skills")
+# Per character, the digest, MinHash and token count cost several times the extraction
+INGEST_COST_FACTOR = 10
+
+
+def text_fields(vacancy: Dict[str, Any]) -> Dict[str, Any]:
+    """Columns derived from the text of a vacancy with extracted description"""
+    description = vacancy.get("description") or ""
+    minhash = vacancy_minhash(vacancy)
+    return {
+        "description_tokens": count_tokens(description),
+        "minhash": minhash,
+        "minhash_bands": bands(minhash) if minhash else None,
+        "content_hash": vacancy_content_hash(vacancy),
+        "digest": vacancy_digest(vacancy, settings.VACANCY_DIGEST_TOKEN_BUDGET),
+    }
+
+
+def prepare_vacancies(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Process pool task: extract the description HTML of each item and compute
+    its text_fields(). Returns {"description", "fields"} per item.
+    """
+    texts = extract_texts([item.get("description") or "" for item in items])
+    prepared = []
+    for item, text in zip(items, texts):
+        vacancy = {**item, "description": text}
+        prepared.append({"description": text, "fields": text_fields(vacancy)})
+    return prepared
+
+
+def ingest_cost(items: List[Dict[str, Any]]) -> int:
+    """CPUPool cost of prepare_vacancies() in extraction characters"""
+    return INGEST_COST_FACTOR * sum(len(item.get("description") or "") for item in items)
@@ -0,0 +1,110 @@
+# app/services/vacancy_payload.py
+import json
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Optional
+
+# Per-user or per-request fields added to a stored vacancy, never part of its stored JSON
+OVERLAY_FIELDS = frozenset({"applied", "relevance", "duplicates", "description_from"})
+
+
+def dump_json(value: Any) -> str:
+    """Compact JSON, same as FastAPI's JSONResponse renders it"""
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+class StoredVacancy(MutableMapping):
+    """
+    Vacancy read from the DB, kept as the JSON serialized at ingest
+    (vacancies.payload_json) plus the description from its own column and
+    the employer, already serialized, from EmployerCache.
+
+    Reading any field but id and description decodes the JSON once.
+    OVERLAY_FIELDS are kept aside and spliced into the stored JSON by
+    to_json(), so a page of cached vacancies is rendered without decoding
+    and re-encoding each of them. Writing another field falls back to
+    encoding the decoded dict.
+    """
+    __slots__ = ("id", "_raw", "_description", "_employer", "_overlay", "_data")
+
+    def __init__(
+        self, vacancy_id: str, raw: str, description: Optional[str], employer_json: Optional[str] = None
+    ):
+        self.id = vacancy_id
+        self._raw: Optional[str] = raw
+        self._description = description or ""
+        self._employer = employer_json
+        self._overlay: Dict[str, Any] = {}
+        self._data: Optional[Dict[str, Any]] = None
+
+    def _decoded(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = json.loads(self._raw)
+            self._data["description"] = self._description
+            if self._employer is not None:
+                self._data["employer"] = json.loads(self._employer)
+        return self._data
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._overlay:
+            return self._overlay[key]
+        if key == "id":
+            return self.id
+        if key == "description":
+            return self._description
+        return self._decoded()[key]
+
+    def __setitem__(self, key: str, value: Any):
+        if key in OVERLAY_FIELDS:
+            self._overlay[key] = value
+        elif key == "description" and self._raw is not None:
+            self._description = value or ""
+            if self._data is not None:
+                self._data["description"] = self._description
+        else:
+            self._decoded()[key] = value
+            self._raw = None
+
+    def __delitem__(self, key: str):
+        if key in self._overlay:
+            del self._overlay[key]
+        else:
+            del self._decoded()[key]
+            self._raw = None
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._decoded()
+        yield from self._overlay
+
+    def __len__(self) -> int:
+        return len(self._decoded()) + len(self._overlay)
+
+    def to_json(self) -> str:
+        """The stored JSON with the description, employer and overlay fields spliced in"""
+        if self._raw is None:
+            return dump_json({**self._decoded(), **self._overlay})
+        parts = [self._raw[:-1]]
+        if len(self._raw) > 2:
+            parts.append(",")
+        parts.append('"description":')
+        parts.append(dump_json(self._description))
+        if self._employer is not None:
+            parts.append(',"employer":')
+            parts.append(self._employer)
+        for key, value in self._overlay.items():
+            parts.append(f',"{key}":')
+            parts.append(dump_json(value))
+        parts.append("}")
+        return "".join(parts)
+
+
+def dump_search_result(result: Dict[str, Any]) -> str:
+    """Search response as JSON, stored vacancies are spliced instead of re-encoded"""
+    items = result.get("items")
+    if not items:
+        return dump_json(result)
+    envelope = dump_json({key: value for key, value in result.items() if key != "items"})
+    rendered = ",".join(
+        item.to_json() if isinstance(item, StoredVacancy) else dump_json(item) for item in items
+    )
+    separator = "," if len(envelope) > 2 else ""
+    return f'{envelope[:-1]}{separator}"items":[{rendered}]}}'
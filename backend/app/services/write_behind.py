@@ -0,0 +1,137 @@
+# app/services/write_behind.py
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Set
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..crud.vacancy import VacancyCRUD
+
+logger = logging.getLogger(__name__)
+
+
+class LastSearchedBuffer:
+    """
+    Write-behind buffer for vacancies.last_searched_at.
+
+    Searches only add the ids they touched; a background task writes them
+    in one deduplicated UPDATE every LAST_SEARCHED_FLUSH_INTERVAL seconds,
+    or sooner once LAST_SEARCHED_FLUSH_SIZE ids are waiting. The timestamp
+    is only used to expire unused vacancies, so being a few seconds late is
+    fine. Ids of a failed flush are kept for the next one; beyond
+    LAST_SEARCHED_MAX_BUFFER new ids are dropped.
+    """
+    _task: Optional[asyncio.Task] = None
+    _pending: Set[str] = set()
+    _full: Optional[asyncio.Event] = None
+    _flush_lock: Optional[asyncio.Lock] = None
+    _latencies: deque = deque(maxlen=200)
+    _flushes: int = 0
+    _flushed_ids: int = 0
+    _failures: int = 0
+    _dropped: int = 0
+
+    @classmethod
+    def running(cls) -> bool:
+        return cls._task is not None
+
+    @classmethod
+    def start(cls):
+        """Start the flush task on the running loop"""
+        if cls._task is None and settings.LAST_SEARCHED_FLUSH_INTERVAL > 0:
+            cls._full = asyncio.Event()
+            cls._flush_lock = asyncio.Lock()
+            cls._task = asyncio.create_task(cls._run(settings.LAST_SEARCHED_FLUSH_INTERVAL))
+            logger.info(
+                f"last_searched_at write-behind started (every {settings.LAST_SEARCHED_FLUSH_INTERVAL}s "
+                f"or {settings.LAST_SEARCHED_FLUSH_SIZE} ids)"
+            )
+
+    @classmethod
+    def add(cls, vacancy_ids: Iterable[str]):
+        """Mark vacancies as searched now, written on the next flush"""
+        room = settings.LAST_SEARCHED_MAX_BUFFER - len(cls._pending)
+        for vacancy_id in vacancy_ids:
+            if vacancy_id in cls._pending:
+                continue
+            if room <= 0:
+                cls._dropped += 1
+                continue
+            cls._pending.add(vacancy_id)
+            room -= 1
+        if len(cls._pending) >= settings.LAST_SEARCHED_FLUSH_SIZE and cls._full is not None:
+            cls._full.set()
+
+    @classmethod
+    async def _run(cls, interval: float):
+        while True:
+            try:
+                await asyncio.wait_for(cls._full.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            cls._full.clear()
+            await cls.flush()
+
+    @classmethod
+    async def flush(cls) -> int:
+        """Write the buffered ids, returns how many were written"""
+        async with cls._flush_lock:
+            if not cls._pending:
+                return 0
+            batch, cls._pending = cls._pending, set()
+            searched_at = datetime.utcnow()
+
+            def write():
+                with SessionLocal() as db:
+                    VacancyCRUD.update_last_searched(db, list(batch), searched_at)
+
+            start = time.monotonic()
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, write)
+            except Exception as e:
+                cls._failures += 1
+                cls._pending |= batch
+                logger.error(f"Failed to flush last_searched_at for {len(batch)} vacancies: {e}")
+                return 0
+
+            cls._latencies.append(time.monotonic() - start)
+            cls._flushes += 1
+            cls._flushed_ids += len(batch)
+            return len(batch)
+
+    @classmethod
+    def snapshot(cls) -> Dict[str, Any]:
+        """Buffer size and flush latency, in milliseconds"""
+        ordered = sorted(cls._latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2)
+
+        return {
+            "running": cls._task is not None,
+            "buffered": len(cls._pending),
+            "flushes": cls._flushes,
+            "flushed_ids": cls._flushed_ids,
+            "failures": cls._failures,
+            "dropped": cls._dropped,
+            "flush_p50_ms": percentile(0.5),
+            "flush_p99_ms": percentile(0.99),
+        }
+
+    @classmethod
+    async def stop(cls):
+        """Stop the flush task and write what is left"""
+        if cls._task is not None:
+            cls._task.cancel()
+            try:
+                await cls._task
+            except asyncio.CancelledError:
+                pass
+            cls._task = None
+            flushed = await cls.flush()
+            logger.info(f"last_searched_at write-behind stopped, flushed {flushed} remaining ids")
@@ -0,0 +1,118 @@
+"""
+Bulk letters: one synchronous call per letter vs one provider batch job.
+
+Usage (from backend/):
+    python -m benchmarks.bench_bulk_letters [--letters N] [--latency S] [--batch-delay S]
+        [--concurrency N] [--time-scale X] [--input-price P] [--output-price P] [--batch-discount D]
+
+The synchronous path runs each letter through a slot of the admission limit
+(AI_MAX_CONCURRENCY) and holds it for --latency seconds. The batch path
+submits all letters to FakeBatchProvider, which completes after
+--batch-delay seconds, and polls it like the worker does. Sleeps are
+multiplied by --time-scale so hours of provider time run in seconds; the
+reported times are unscaled.
+
+Cost per letter uses token counts of prompts built from the description
+corpus and the prices per 1M tokens; batch requests get --batch-discount.
+Slot-seconds are the synchronous capacity a path takes away from
+interactive users.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from app.core.config import settings
+from app.services.ai_providers.batch import BatchRequest, FakeBatchProvider
+from app.services.ai_providers.routing import Route, ROUTE_FULL
+from app.services.token_budget import count_tokens
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "hh_descriptions.json")
+PROMPT_FILE = os.path.join(os.path.dirname(__file__), "..", "app", "services", "prompts", "new_gpt.md")
+RESUME_TEXT = "Python разработчик, 5 лет опыта: Django, FastAPI, PostgreSQL, Redis, Docker. " * 8
+LETTER_TOKENS = 350
+
+
+def build_requests(descriptions, letters: int):
+    with open(PROMPT_FILE, encoding="utf-8") as f:
+        system_prompt = f.read()
+    route = Route(ROUTE_FULL, settings.OPENAI_FULL_MODEL, settings.OPENAI_FULL_EFFORT)
+    return [
+        BatchRequest(
+            custom_id=str(i),
+            system_prompt=system_prompt,
+            user_prompt=f"Резюме:\n{RESUME_TEXT}\n\nВакансия:\n{descriptions[i % len(descriptions)]}",
+            route=route,
+        )
+        for i in range(letters)
+    ]
+
+
+async def run_sync(requests, latency: float, concurrency: int, scale: float):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def generate(_request):
+        async with semaphore:
+            await asyncio.sleep(latency * scale)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(generate(r) for r in requests))
+    return (time.perf_counter() - start) / scale, latency * len(requests)
+
+
+async def run_batch(requests, batch_delay: float, poll_interval: float, scale: float):
+    provider = FakeBatchProvider(completion_delay=batch_delay * scale)
+    start = time.perf_counter()
+    batch_id = await provider.submit(requests)
+    while True:
+        outcome = await provider.poll(batch_id)
+        if outcome.done:
+            break
+        await asyncio.sleep(poll_interval * scale)
+    assert len(outcome.results) == len(requests)
+    return (time.perf_counter() - start) / scale, 0.0
+
+
+def report(name: str, letters: int, wall: float, slot_seconds: float, cost: float):
+    print(
+        f"{name:>5}: wall {wall:8.1f} s, {letters / wall * 60:7.1f} letters/min, "
+        f"slot-seconds {slot_seconds:8.0f}, ${cost / letters:.5f} per letter"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--letters", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=25.0, help="synchronous seconds per letter")
+    parser.add_argument("--batch-delay", type=float, default=1800.0, help="seconds until the batch completes")
+    parser.add_argument("--poll-interval", type=float, default=settings.AI_BATCH_POLL_INTERVAL)
+    parser.add_argument("--concurrency", type=int, default=settings.AI_MAX_CONCURRENCY)
+    parser.add_argument("--time-scale", type=float, default=0.001)
+    parser.add_argument("--input-price", type=float, default=1.25, help="$ per 1M input tokens")
+    parser.add_argument("--output-price", type=float, default=10.0, help="$ per 1M output tokens")
+    parser.add_argument("--batch-discount", type=float, default=0.5)
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        descriptions = json.load(f)["descriptions"]
+    requests = build_requests(descriptions, args.letters)
+
+    input_tokens = sum(count_tokens(r.system_prompt) + count_tokens(r.user_prompt) for r in requests)
+    output_tokens = LETTER_TOKENS * len(requests)
+    sync_cost = (input_tokens * args.input_price + output_tokens * args.output_price) / 1e6
+    batch_cost = sync_cost * (1 - args.batch_discount)
+    print(
+        f"{args.letters} letters, {input_tokens / args.letters:.0f} input tokens per letter, "
+        f"concurrency {args.concurrency}"
+    )
+
+    wall, slots = asyncio.run(run_sync(requests, args.latency, args.concurrency, args.time_scale))
+    report("sync", args.letters, wall, slots, sync_cost)
+    wall, slots = asyncio.run(run_batch(requests, args.batch_delay, args.poll_interval, args.time_scale))
+    report("batch", args.letters, wall, slots, batch_cost)
+
+
+if __name__ == "__main__":
+    main()
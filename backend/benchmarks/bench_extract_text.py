@@ -0,0 +1,97 @@
+"""
+Microbenchmark: HTML-to-text extractor vs the previous
+multi-regex implementation of AIService._extract_text.
+
+Usage (from backend/):
+    python -m benchmarks.bench_extract_text [--corpus PATH] [--repeat N]
+
+The corpus is a JSON file with a "descriptions" list of HH description HTML.
+Pass a dump of real descriptions (e.g. SELECT full_data->>'description' before
+extraction) to measure on production data.
+
+A synthetic worst case is timed as well: a long description whose text has
+many bare "<" (comparisons like "latency < 100 ms") after the last tag. The
+old `<.*?>` pattern rescans to the end of the document from each of them.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import time
+
+from app.services.text_extraction import extract_text
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "hh_descriptions.json")
+
+
+def legacy_extract_text(html_text: str) -> str:
+    """Previous AIService._extract_text, kept here for comparison"""
+    if not html_text:
+        return ""
+    text = re.sub(r'<(script|style).*?>.*?</\1>', '', html_text, flags=re.DOTALL | re.IGNORECASE)
+    text = re.sub(r'<.*?>', ' ', text)
+    text = re.sub(r'&nbsp;', ' ', text)
+    text = re.sub(r'&quot;', '"', text)
+    text = re.sub(r'&amp;', '&', text)
+    text = re.sub(r'&lt;', '<', text)
+    text = re.sub(r'&gt;', '>', text)
+    text = ' '.join(text.split())
+    return text.strip()
+
+
+def bench(func, corpus, repeat: int) -> list:
+    """Return per-pass timings in seconds over the whole corpus"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html_text in corpus:
+            func(html_text)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def worst_case_document(items: int = 1000) -> str:
+    """Long plain-text tail with bare "<" and no closing ">" after it"""
+    return "<p>Требования:</p>" + "Время ответа < 100 мс, ошибок < 0.1%. " * items
+
+
+def report(corpus, repeat: int) -> float:
+    """Print legacy vs new timings, return the speedup"""
+    results = {}
+    for name, func in (("legacy", legacy_extract_text), ("new", extract_text)):
+        timings = bench(func, corpus, repeat)
+        median = statistics.median(timings)
+        per_doc_us = median / len(corpus) * 1e6
+        results[name] = median
+        print(f"{name:>12}: median {median * 1e3:.3f} ms/pass, {per_doc_us:.1f} us/description")
+    speedup = results["legacy"] / results["new"]
+    print(f"     speedup: {speedup:.2f}x")
+    return speedup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = json.load(f)["descriptions"]
+
+    size_kb = sum(len(d.encode("utf-8")) for d in corpus) / 1024
+    print(f"Corpus: {len(corpus)} descriptions, {size_kb:.1f} KB, {args.repeat} passes")
+
+    # Warm up regex caches
+    bench(legacy_extract_text, corpus, 3)
+    bench(extract_text, corpus, 3)
+
+    report(corpus, args.repeat)
+
+    worst = [worst_case_document()]
+    print(f"\nWorst case: 1 description, {len(worst[0].encode('utf-8')) / 1024:.1f} KB, 5 passes")
+    report(worst, 5)
+
+
+if __name__ == "__main__":
+    main()
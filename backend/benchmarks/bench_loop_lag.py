@@ -0,0 +1,86 @@
+"""
+Event loop blocking during vacancy enrichment: inline extraction, digest,
+MinHash and token count (what _load_and_save_vacancy used to do) vs the
+shared CPU process pool.
+
+Usage (from backend/):
+    python -m benchmarks.bench_loop_lag [--corpus PATH] [--vacancies N] [--workers N] [--scale N]
+
+A probe task sleeps for 1 ms in a loop while a search page of N vacancies is
+enriched; its overshoot is the time the loop could not serve other requests.
+--scale repeats each description N times to model long descriptions.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from app.core.config import settings
+from app.core.cpu_pool import CPUPool
+from app.services.vacancy_ingest import ingest_cost, prepare_vacancies
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "hh_descriptions.json")
+PROBE_INTERVAL = 0.001
+
+
+async def probe(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        expected = time.perf_counter() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def enrich_inline(items):
+    prepare_vacancies(items)
+
+
+async def enrich_pool(items):
+    await CPUPool.map_batches(prepare_vacancies, items, cost=ingest_cost(items))
+
+
+async def measure(name: str, enrich, items):
+    lags, stop = [], asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await enrich(items)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+    print(
+        f"{name:>7}: enrich {elapsed * 1e3:7.1f} ms, "
+        f"max loop block {max(lags) * 1e3:6.2f} ms, "
+        f"total blocked {sum(lags) * 1e3:7.1f} ms"
+    )
+
+
+async def run(items):
+    CPUPool.warm_up()
+    await CPUPool.map_batches(prepare_vacancies, items[:1])  # start workers before measuring
+    await measure("inline", enrich_inline, items)
+    await measure("pool", enrich_pool, items)
+    CPUPool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--vacancies", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=settings.CPU_POOL_WORKERS or 2)
+    parser.add_argument("--scale", type=int, default=1)
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = json.load(f)["descriptions"]
+    descriptions = [corpus[i % len(corpus)] * args.scale for i in range(args.vacancies)]
+    settings.CPU_POOL_WORKERS = args.workers
+
+    size_kb = sum(len(d) for d in descriptions) / 1024
+    print(f"{len(descriptions)} vacancies, {size_kb:.0f} K chars, {args.workers} pool workers")
+    items = [{"name": "Python-разработчик", "description": d, "key_skills": []} for d in descriptions]
+    asyncio.run(run(items))
+
+
+if __name__ == "__main__":
+    main()
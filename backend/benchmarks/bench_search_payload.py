@@ -0,0 +1,97 @@
+"""
+Search response rendering: decoded vacancy dicts through jsonable_encoder
+and JSONResponse vs splicing the JSON serialized at ingest.
+
+Usage (from backend/):
+    python -m benchmarks.bench_search_payload [--corpus PATH] [--per-page N] [--scale N] [--pages N]
+
+Both paths start from what the DB returns for a page of cached vacancies:
+the projected fields (JSON text), the description and the employer from
+EmployerCache. The first decodes each row, adds the applied flag and lets
+FastAPI encode the result, the second wraps rows in StoredVacancy and
+renders with dump_search_result().
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.crud.vacancy import project_vacancy
+from app.services.text_extraction import extract_text
+from app.services.vacancy_payload import StoredVacancy, dump_json, dump_search_result
+from benchmarks.bench_vacancy_storage import DEFAULT_CORPUS, hh_body
+
+
+def stored_rows(bodies):
+    """(id, payload_json, description, employer) as they are read from the DB and the cache"""
+    rows = []
+    for body in bodies:
+        projected = project_vacancy(body)
+        description = projected.pop("description", "")
+        employer = projected.pop("employer")
+        rows.append((body["id"], dump_json(projected), description, (employer, dump_json(employer))))
+    return rows
+
+
+def render_decoded(rows, applied):
+    items = []
+    for vacancy_id, payload_json, description, (employer, _) in rows:
+        item = {**json.loads(payload_json), "description": description, "employer": employer}
+        item["applied"] = vacancy_id in applied
+        items.append(item)
+    result = {"found": len(items), "page": 0, "pages": 1, "items": items}
+    return JSONResponse(jsonable_encoder(result)).body
+
+
+def render_spliced(rows, applied):
+    items = []
+    for vacancy_id, payload_json, description, (_, employer_json) in rows:
+        item = StoredVacancy(vacancy_id, payload_json, description, employer_json)
+        item["applied"] = vacancy_id in applied
+        items.append(item)
+    result = {"found": len(items), "page": 0, "pages": 1, "items": items}
+    return dump_search_result(result).encode("utf-8")
+
+
+def measure(render, pages, applied):
+    timings = []
+    for rows in pages:
+        start = time.perf_counter()
+        render(rows, applied)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = [extract_text(html) for html in json.load(f)["descriptions"]]
+    random.seed(1)
+    rows = stored_rows([hh_body(i, corpus[i % len(corpus)] * args.scale) for i in range(args.per_page * 10)])
+    pages = [random.sample(rows, args.per_page) for _ in range(args.pages)]
+    applied = {row[0] for row in random.sample(rows, len(rows) // 10)}
+
+    # Same document either way
+    for rows_page in pages[:5]:
+        assert json.loads(render_decoded(rows_page, applied)) == json.loads(render_spliced(rows_page, applied))
+
+    size = statistics.mean(len(render_spliced(p, applied)) for p in pages[:20])
+    print(f"{args.per_page} vacancies per page, response {size / 1024:.0f} KB")
+    for name, render in (("decoded", render_decoded), ("spliced", render_spliced)):
+        p50, p95 = measure(render, pages, applied)
+        print(f"{name:>8}: p50 {p50:6.2f} ms, p95 {p95:6.2f} ms per page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Vacancy storage: full HH body in JSON vs projected JSONB without the
+duplicated description, with LZ4 TOAST compression.
+
+Usage (from backend/):
+    python -m benchmarks.bench_vacancy_storage [--corpus PATH] [--vacancies N] [--scale N]
+        [--database-url URL] [--pages N]
+
+Without --database-url only the payload is compared: bytes stored per row
+and the time to decode a search page (50 rows) in Python. With a PostgreSQL
+URL (14+, built with LZ4) two scratch tables with the old and the new layout
+are filled with the same vacancies, and their total size (heap, TOAST and
+indexes) and the latency of a search page read are reported; the tables are
+dropped afterwards.
+
+Vacancy bodies are synthetic but shaped like HH API responses, with the
+descriptions from the corpus; --scale repeats each description N times to
+model long descriptions.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+
+from app.crud.vacancy import project_vacancy
+from app.services.text_extraction import extract_text
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "hh_descriptions.json")
+PAGE_SIZE = 50
+
+LAYOUTS = {
+    "legacy": "full_data json",
+    "compact": "full_data jsonb COMPRESSION lz4",
+}
+
+
+def hh_body(index: int, description: str) -> dict:
+    """Vacancy body with the fields the HH API returns"""
+    employer_id = str(1000 + index % 300)
+    return {
+        "id": str(90_000_000 + index),
+        "premium": False,
+        "billing_type": {"id": "standard", "name": "Стандарт"},
+        "relations": [],
+        "name": f"Python-разработчик {index}",
+        "insider_interview": None,
+        "response_letter_required": False,
+        "area": {"id": "1", "name": "Москва", "url": "https://api.hh.ru/areas/1"},
+        "salary": {"from": 150000 + index, "to": 250000, "currency": "RUR", "gross": False},
+        "type": {"id": "open", "name": "Открытая"},
+        "address": {
+            "city": "Москва", "street": "Тверская улица", "building": "7",
+            "lat": 55.75, "lng": 37.61, "metro": {"station_name": "Охотный ряд", "line_name": "Сокольническая"},
+        },
+        "allow_messages": True,
+        "experience": {"id": "between3And6", "name": "От 3 до 6 лет"},
+        "schedule": {"id": "remote", "name": "Удаленная работа"},
+        "employment": {"id": "full", "name": "Полная занятость"},
+        "department": None,
+        "contacts": None,
+        "description": description,
+        "branded_description": None,
+        "key_skills": [{"name": name} for name in ("Python", "PostgreSQL", "Docker", "FastAPI", "Redis")],
+        "accept_handicapped": False,
+        "accept_kids": False,
+        "archived": False,
+        "response_url": None,
+        "specializations": [],
+        "professional_roles": [{"id": "96", "name": "Программист, разработчик"}],
+        "code": None,
+        "hidden": False,
+        "quick_responses_allowed": False,
+        "driver_license_types": [],
+        "accept_incomplete_resumes": False,
+        "employer": {
+            "id": employer_id,
+            "name": f"Компания {employer_id}",
+            "url": f"https://api.hh.ru/employers/{employer_id}",
+            "alternate_url": f"https://hh.ru/employer/{employer_id}",
+            "logo_urls": {
+                "90": f"https://img.hhcdn.ru/employer-logo/{employer_id}_90.png",
+                "240": f"https://img.hhcdn.ru/employer-logo/{employer_id}_240.png",
+                "original": f"https://img.hhcdn.ru/employer-logo-original/{employer_id}.png",
+            },
+            "vacancies_url": f"https://api.hh.ru/vacancies?employer_id={employer_id}",
+            "accredited_it_employer": True,
+            "trusted": True,
+        },
+        "published_at": "2026-10-18T12:00:00+0300",
+        "created_at": "2026-10-18T12:00:00+0300",
+        "initial_created_at": "2026-10-01T12:00:00+0300",
+        "negotiations_url": None,
+        "suitable_resumes_url": None,
+        "apply_alternate_url": f"https://hh.ru/applicant/vacancy_response?vacancyId={90_000_000 + index}",
+        "has_test": False,
+        "test": None,
+        "alternate_url": f"https://hh.ru/vacancy/{90_000_000 + index}",
+        "working_days": [],
+        "working_time_intervals": [],
+        "working_time_modes": [],
+        "accept_temporary": False,
+        "languages": [],
+    }
+
+
+def rows_for(layout: str, bodies):
+    """(id, description, full_data JSON text) as each layout stores them"""
+    for body in bodies:
+        if layout == "legacy":
+            stored = body
+        else:
+            stored = {k: v for k, v in project_vacancy(body).items() if k != "description"}
+        yield body["id"], body["description"], json.dumps(stored, ensure_ascii=False)
+
+
+def compare_payloads(bodies):
+    pages = [random.sample(bodies, min(PAGE_SIZE, len(bodies))) for _ in range(50)]
+    for layout in LAYOUTS:
+        rows = list(rows_for(layout, bodies))
+        stored = statistics.mean(
+            len(description.encode("utf-8")) + len(full_data.encode("utf-8"))
+            for _, description, full_data in rows
+        )
+        encoded = {vacancy_id: full_data for vacancy_id, _, full_data in rows}
+        start = time.perf_counter()
+        for page in pages:
+            for body in page:
+                json.loads(encoded[body["id"]])
+        decode_ms = (time.perf_counter() - start) * 1000 / len(pages)
+        print(f"{layout:>8}: {stored / 1024:6.1f} KB per row, decode a page {decode_ms:6.2f} ms")
+
+
+def compare_database(bodies, database_url: str, pages: int):
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(database_url)
+    ids = [body["id"] for body in bodies]
+    try:
+        for layout, column in LAYOUTS.items():
+            table = f"bench_vacancies_{layout}"
+            description = "description text" + (" COMPRESSION lz4" if layout == "compact" else "")
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+                conn.execute(text(f"CREATE TABLE {table} (id varchar PRIMARY KEY, {description}, {column})"))
+                cast = "jsonb" if layout == "compact" else "json"
+                conn.execute(
+                    text(f"INSERT INTO {table} VALUES (:id, :description, CAST(:full_data AS {cast}))"),
+                    [
+                        {"id": vacancy_id, "description": desc, "full_data": full_data}
+                        for vacancy_id, desc, full_data in rows_for(layout, bodies)
+                    ],
+                )
+                conn.execute(text(f"ANALYZE {table}"))
+                size = conn.execute(text(f"SELECT pg_total_relation_size('{table}')")).scalar()
+
+            latencies = []
+            with engine.connect() as conn:
+                query = text(f"SELECT id, description, full_data FROM {table} WHERE id = ANY(:ids)")
+                for _ in range(pages):
+                    page = random.sample(ids, min(PAGE_SIZE, len(ids)))
+                    start = time.perf_counter()
+                    conn.execute(query, {"ids": page}).all()
+                    latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            print(
+                f"{layout:>8}: table {size / 1024 / 1024:7.2f} MB, page read p50 "
+                f"{latencies[len(latencies) // 2] * 1000:6.2f} ms, p95 "
+                f"{latencies[int(len(latencies) * 0.95)] * 1000:6.2f} ms"
+            )
+    finally:
+        with engine.begin() as conn:
+            for layout in LAYOUTS:
+                conn.execute(text(f"DROP TABLE IF EXISTS bench_vacancies_{layout}"))
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--vacancies", type=int, default=5000)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = [extract_text(html) for html in json.load(f)["descriptions"]]
+    random.seed(1)
+    bodies = [hh_body(i, corpus[i % len(corpus)] * args.scale) for i in range(args.vacancies)]
+
+    print(f"{len(bodies)} vacancies, payload per row and page decode:")
+    compare_payloads(bodies)
+    if args.database_url:
+        print("PostgreSQL:")
+        compare_database(bodies, args.database_url, args.pages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""
+Index usage of the hot queries: seeds a realistic dataset into a scratch
+PostgreSQL database and checks with EXPLAIN that no hot query scans a
+whole table.
+
+Usage (from backend/):
+    python -m benchmarks.explain_hot_queries --database-url URL [--users N] [--vacancies N]
+        [--applications N] [--sessions N] [--keep]
+
+The database must be empty: the tables are created from the models (with
+the indexes they declare, as create_all() does in the app), applications
+get monthly partitions for the seeded half year, everything is filled with
+generate_series() and analyzed. Each check runs the real CRUD method (or
+the query of the endpoint), captures the SQL it sends and EXPLAINs it with
+the same parameters. A sequential scan of a seeded table or a non-empty
+applications partition fails the check and the exit code is 1. Tables are dropped afterwards unless --keep.
+
+tests/test_hot_query_plans.py runs the same checks under pytest when
+TEST_DATABASE_URL is set.
+
+The data is shaped like a steady state: cleanups run hourly, so only ~1%
+of vacancies and pseudonymization sessions are past their expiry.
+"""
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, event, func, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.application import ApplicationCRUD, _month_start, _partition_name
+from app.crud.vacancy import VacancyCRUD
+from app.models.db import Application, Base
+
+# Default dataset size: HH employers have a few open vacancies each
+SIZES = {"users": 2000, "vacancies": 100_000, "applications": 300_000, "sessions": 40_000}
+
+SEEDED_TABLES = {"users", "employers", "vacancies", "applications", "mapping_sessions", "mappings"}
+
+SEED = [
+    """
+    INSERT INTO users (id, hh_user_id, credits)
+    SELECT md5('user' || i)::uuid, 'hh' || i, 10 FROM generate_series(1, :users) i
+    """,
+    """
+    INSERT INTO employers (id, name, alternate_url)
+    SELECT i::text, 'Компания ' || i, 'https://hh.ru/employer/' || i
+    FROM generate_series(1, greatest(:vacancies / 3, 1)) i
+    """,
+    """
+    INSERT INTO vacancies (id, name, description, employer_id, full_data, payload_json,
+                           created_at, updated_at, last_searched_at)
+    SELECT (90000000 + i)::text, 'Python-разработчик ' || i, repeat('Описание вакансии. ', 40),
+           (1 + i % greatest(:vacancies / 3, 1))::text,
+           jsonb_build_object('id', (90000000 + i)::text), '{}',
+           now() - random() * interval '30 days', now() - random() * interval '24 hours',
+           CASE WHEN i % 100 = 0
+                THEN now() - interval '8 days' - random() * interval '30 days'
+                ELSE now() - random() * interval '7 days' END
+    FROM generate_series(1, :vacancies) i
+    """,
+    """
+    INSERT INTO applications (id, user_id, vacancy_id, vacancy_title, message, status, created_at)
+    SELECT md5('application' || i)::uuid,
+           md5('user' || (1 + (random() * (:users - 1))::int))::uuid,
+           (90000001 + (random() * (:vacancies - 1))::int)::text,
+           'Python-разработчик', repeat('Текст сопроводительного письма. ', 30),
+           CASE WHEN i % 10 = 0 THEN 'failed' ELSE 'success' END,
+           now() - random() * interval '180 days'
+    FROM generate_series(1, :applications) i
+    """,
+    """
+    INSERT INTO pseudonymization.mapping_sessions (id, user_id, created_at, expires_at)
+    SELECT md5('session' || i)::uuid, md5('user' || (1 + i % :users))::uuid, now(),
+           CASE WHEN i % 100 = 0 THEN now() - random() * interval '1 hour'
+                ELSE now() + random() * interval '7 days' END
+    FROM generate_series(1, :sessions) i
+    """,
+    """
+    INSERT INTO pseudonymization.mappings (id, session_id, original_value, pseudonym, data_type)
+    SELECT md5('mapping' || i)::uuid, md5('session' || (1 + i % :sessions))::uuid,
+           'ООО Ромашка ' || i, 'Company_' || i, 'company'
+    FROM generate_series(1, :sessions * 5) i
+    """,
+]
+
+
+def seq_scans(plan: dict, empty: set) -> list:
+    """Seeded tables and partitions read by a Seq Scan anywhere in the plan, empty ones aside"""
+    found = []
+    relation = plan.get("Relation Name") or ""
+    seeded = relation in SEEDED_TABLES or relation.startswith("applications_")
+    if plan.get("Node Type") == "Seq Scan" and seeded and relation not in empty:
+        found.append(relation)
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child, empty))
+    return found
+
+
+def scans(plan: dict) -> list:
+    """Scan nodes of the plan with their index or table, for the report"""
+    found = []
+    if plan.get("Node Type", "").endswith("Scan"):
+        target = plan.get("Index Name") or plan.get("Relation Name") or ""
+        found.append(f"{plan['Node Type']} {target}".strip())
+    for child in plan.get("Plans", []):
+        found.extend(scans(child))
+    return found
+
+
+class Capture:
+    """Statements sent by the engine while enabled"""
+
+    def __init__(self, engine):
+        self.enabled = False
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.enabled and statement.lstrip().upper().startswith(("SELECT", "DELETE", "UPDATE")):
+            self.statements.append((statement, parameters))
+
+    def run(self, call):
+        self.statements = []
+        self.enabled = True
+        try:
+            call()
+        finally:
+            self.enabled = False
+        return self.statements
+
+
+def _day_ago() -> datetime:
+    return datetime.utcnow() - timedelta(hours=24)
+
+
+# (name, function of a session and the sample_values()) for every hot query
+HOT_QUERIES = [
+    ("applications: user_applied_to_vacancy",
+     lambda db, s: ApplicationCRUD.user_applied_to_vacancy(db, s["user_id"], s["vacancy_ids"][0])),
+    ("applications: get_user_applied_vacancies",
+     lambda db, s: ApplicationCRUD.get_user_applied_vacancies(db, s["user_id"], s["vacancy_ids"])),
+    ("applications: get_latest_user_letter",
+     lambda db, s: ApplicationCRUD.get_latest_user_letter(db, s["user_id"], s["vacancy_ids"])),
+    ("applications: get_user_application_history",
+     lambda db, s: ApplicationCRUD.get_user_application_history(db, s["user_id"])),
+    ("applications: get_user_applications",
+     lambda db, s: ApplicationCRUD.get_user_applications(db, s["user_id"])),
+    ("applications: /api/user-info 24h count",
+     lambda db, s: db.query(Application).filter(
+         Application.user_id == s["user_id"], Application.created_at >= _day_ago()
+     ).count()),
+    ("applications: /api/stats/cover-letters 24h count",
+     lambda db, s: db.query(func.count(Application.id)).filter(Application.created_at >= _day_ago()).scalar()),
+    ("vacancies: get_stale_vacancies",
+     lambda db, s: VacancyCRUD.get_stale_vacancies(db, s["vacancy_ids"])),
+    ("vacancies: get_payloads",
+     lambda db, s: VacancyCRUD.get_payloads(db, s["vacancy_ids"])),
+    ("vacancies: update_last_searched",
+     lambda db, s: VacancyCRUD.update_last_searched(db, s["vacancy_ids"])),
+    ("vacancies: clean_old_vacancies",
+     lambda db, s: VacancyCRUD.clean_old_vacancies(db, 7, 1000)),
+    ("pseudonymization: get_pseudonymization_mappings",
+     lambda db, s: ApplicationCRUD.get_pseudonymization_mappings(db, s["session_id"])),
+    ("pseudonymization: cleanup_expired_mappings",
+     lambda db, s: ApplicationCRUD.cleanup_expired_mappings(db, 1000)),
+]
+
+
+def explain(engine, statements, empty: set):
+    """
+    EXPLAIN the captured statements with their parameters, returns the
+    whole-table scans (see seq_scans) and every scan for the report.
+    """
+    problems, used = [], []
+    with engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+            plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+            problems += seq_scans(plan, empty)
+            used += scans(plan)
+    return problems, used
+
+
+def seed(engine, sizes: dict):
+    with engine.begin() as conn:
+        conn.execute(text("CREATE SCHEMA IF NOT EXISTS pseudonymization"))
+    Base.metadata.create_all(engine)
+    this_month = _month_start(datetime.utcnow())
+    with engine.begin() as conn:
+        for offset in range(-7, 0):
+            start, end = _month_start(this_month, offset), _month_start(this_month, offset + 1)
+            conn.execute(text(
+                f"CREATE TABLE {_partition_name(start)} PARTITION OF applications "
+                f"FOR VALUES FROM ('{start}') TO ('{end}')"
+            ))
+    with sessionmaker(bind=engine)() as db:
+        ApplicationCRUD.ensure_partitions(db)
+    with engine.begin() as conn:
+        for statement in SEED:
+            conn.execute(text(statement), sizes)
+        conn.execute(text("ANALYZE"))
+
+
+def sample_values(engine) -> dict:
+    with engine.connect() as conn:
+        user_id = conn.execute(text(
+            "SELECT user_id FROM applications GROUP BY user_id ORDER BY count(*) DESC LIMIT 1"
+        )).scalar()
+        vacancy_ids = conn.execute(text(
+            "SELECT vacancy_id FROM applications WHERE user_id = :user_id LIMIT 5"
+        ), {"user_id": user_id}).scalars().all()
+        vacancy_ids += conn.execute(text(
+            "SELECT id FROM vacancies ORDER BY random() LIMIT :n"
+        ), {"n": 50 - len(vacancy_ids)}).scalars().all()
+        session_id = conn.execute(text(
+            "SELECT id FROM pseudonymization.mapping_sessions LIMIT 1"
+        )).scalar()
+        empty = set(conn.execute(text(
+            "SELECT relname FROM pg_class WHERE relkind = 'r' AND reltuples <= 0"
+        )).scalars().all())
+    return {"user_id": user_id, "vacancy_ids": vacancy_ids, "session_id": session_id, "empty": empty}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--database-url", required=True)
+    for name, default in SIZES.items():
+        parser.add_argument(f"--{name}", type=int, default=default)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded tables")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    if inspect(engine).get_table_names():
+        sys.exit("The database is not empty, use a scratch database")
+
+    failed = total = 0
+    try:
+        seed(engine, {name: getattr(args, name) for name in SIZES})
+        sample = sample_values(engine)
+        capture = Capture(engine)
+        Session = sessionmaker(bind=engine)
+        for name, call in HOT_QUERIES:
+            total += 1
+            with Session() as db:
+                statements = capture.run(lambda: call(db, sample))
+            problems, used = explain(engine, statements, sample["empty"])
+            status = "FAIL" if problems else "ok"
+            failed += bool(problems)
+            detail = f"Seq Scan on {', '.join(sorted(set(problems)))}" if problems else ", ".join(used)
+            print(f"{status:>4}  {name}: {detail}")
+    finally:
+        if not args.keep:
+            Base.metadata.drop_all(engine)
+            with engine.begin() as conn:
+                conn.execute(text("DROP SCHEMA IF EXISTS pseudonymization CASCADE"))
+        engine.dispose()
+
+    print(f"{failed} of {total} hot queries scan a whole table" if failed else "All hot queries use indexes")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import asyncio
+
+import fakeredis.aioredis
+import pytest
+from redis.exceptions import ConnectionError
+
+from app.services.admission import (
+    PRIORITY_SPECULATIVE, PRIORITY_TRIAL, SHARED_SLOTS_KEY, AdmissionController, AdmissionRejected, SharedSlots,
+)
+
+
+class _DownRedis:
+    async def eval(self, *args):
+        raise ConnectionError("down")
+
+
+def _controller(shared: SharedSlots) -> AdmissionController:
+    return AdmissionController(max_concurrency=8, max_queue=10, initial_service_time=1.0, shared=shared)
+
+
+def test_in_use_counts_leases_by_the_redis_clock():
+    async def scenario():
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        shared = SharedSlots(limit=4, reserved=1, fallback_speculative=1, redis_client=client)
+        token = await shared.acquire(PRIORITY_TRIAL, None)
+        # A lease stamped by a host whose clock is an hour behind is long expired
+        await client.zadd(SHARED_SLOTS_KEY, {"expired": 1.0})
+        assert await shared.in_use() == 1
+        await shared.release(token)
+        assert await shared.in_use() == 0
+
+    asyncio.run(scenario())
+
+
+def test_speculative_work_is_capped_locally_without_redis():
+    async def scenario():
+        shared = SharedSlots(limit=4, reserved=1, fallback_speculative=1, redis_client=_DownRedis())
+        controller = _controller(shared)
+        async with controller.slot(PRIORITY_SPECULATIVE):
+            with pytest.raises(AdmissionRejected):
+                async with controller.slot(PRIORITY_SPECULATIVE):
+                    pass
+            # Interactive requests only have the process limit
+            async with controller.slot(PRIORITY_TRIAL):
+                assert controller.in_flight == 2
+        assert shared.local_speculative == 0
+        async with controller.slot(PRIORITY_SPECULATIVE):
+            assert shared.local_speculative == 1
+        assert shared.unavailable_total == 4
+
+    asyncio.run(scenario())
@@ -0,0 +1,55 @@
+import asyncio
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import fakeredis.aioredis
+
+from app.services import bulk
+from app.services.bulk import ACTIVE_BATCHES_KEY, BulkLetterService
+from app.services.drafts import _budget_key
+
+
+def _service(client) -> BulkLetterService:
+    hh_service = SimpleNamespace(ai_service=SimpleNamespace(batch_provider=SimpleNamespace(name="fake")))
+    return BulkLetterService(hh_service, redis_client=client)
+
+
+def test_poll_lock_taken_over_after_expiry_is_kept():
+    async def scenario():
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        service = _service(client)
+        await client.sadd(ACTIVE_BATCHES_KEY, "batch-1")
+        lock_key = "bulk:batch-1:lock"
+
+        async def slow_collect(batch_id):
+            # The lock expired during the collection and another worker took it
+            await client.set(lock_key, "other-worker")
+            return True
+
+        service._collect = slow_collect
+        assert await service.poll_active() == 1
+        assert await client.get(lock_key) == "other-worker"
+
+    asyncio.run(scenario())
+
+
+def test_failed_drafts_give_back_the_budget_of_their_day(monkeypatch):
+    async def scenario():
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        service = _service(client)
+        # The second draft was already failed by another path
+        pending = {"d1": True, "d2": False}
+        monkeypatch.setattr(bulk, "SessionLocal", lambda: nullcontext())
+        monkeypatch.setattr(bulk.LetterDraftCRUD, "fail", lambda db, draft_id, error: pending[draft_id])
+
+        await client.set(_budget_key("u1", "2026-10-18"), 5)
+        await client.set(_budget_key("all", "2026-10-18"), 40)
+        await service.fail_drafts("u1", ["d1", "d2"], "Resume not found", "2026-10-18")
+        assert await client.get(_budget_key("u1", "2026-10-18")) == "4"
+        assert await client.get(_budget_key("all", "2026-10-18")) == "39"
+
+        # Budgets of a day whose keys expired are not recreated below zero
+        await service.fail_drafts("u1", ["d1"], "Resume not found", "2026-10-01")
+        assert await client.exists(_budget_key("u1", "2026-10-01")) == 0
+
+    asyncio.run(scenario())
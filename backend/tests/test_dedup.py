@@ -0,0 +1,61 @@
+import itertools
+import json
+from pathlib import Path
+
+import pytest
+
+from app.services.dedup import bands, group_near_duplicates, is_near_duplicate, vacancy_minhash
+from app.services.text_extraction import extract_text
+
+CORPUS = Path(__file__).resolve().parents[1] / "benchmarks" / "data" / "hh_descriptions.json"
+DESCRIPTIONS = [extract_text(html) for html in json.loads(CORPUS.read_text("utf-8"))["descriptions"]]
+
+OFFICE = " Офис находится в Санкт-Петербурге, м. Чернышевская, гибридный формат работы."
+
+
+def _fingerprint(description: str):
+    return vacancy_minhash({"name": "", "description": description})
+
+
+def _insert_word(text: str, word: str, position: int) -> str:
+    words = text.split(" ")
+    return " ".join(words[:position] + [word] + words[position:])
+
+
+@pytest.mark.parametrize("description", DESCRIPTIONS)
+@pytest.mark.parametrize("where", ["start", "middle", "end"])
+def test_one_word_edit_is_detected(description, where):
+    position = {"start": 1, "middle": len(description.split(" ")) // 2, "end": len(description.split(" ")) - 1}
+    original = _fingerprint(description)
+    edited = _fingerprint(_insert_word(description, "Казань", position[where]))
+
+    assert is_near_duplicate(original, edited)
+    assert set(bands(original)) & set(bands(edited))
+
+
+@pytest.mark.parametrize("description", DESCRIPTIONS)
+def test_appended_office_sentence_is_detected(description):
+    original = _fingerprint(description)
+    edited = _fingerprint(description + OFFICE)
+
+    assert is_near_duplicate(original, edited)
+    assert set(bands(original)) & set(bands(edited))
+
+
+def test_different_vacancies_are_not_duplicates():
+    fingerprints = [_fingerprint(description) for description in DESCRIPTIONS]
+    for a, b in itertools.combinations(fingerprints, 2):
+        assert not is_near_duplicate(a, b)
+
+
+def test_group_near_duplicates_keeps_the_first_of_each_group():
+    first, second = DESCRIPTIONS[0], DESCRIPTIONS[1]
+    fingerprints = [
+        _fingerprint(first),
+        _fingerprint(second),
+        _fingerprint(_insert_word(first, "Москва", 3)),
+        None,
+        _fingerprint(second + OFFICE),
+    ]
+
+    assert group_near_duplicates(fingerprints) == [0, 1, 0, 3, 1]
@@ -0,0 +1,126 @@
+import asyncio
+from contextlib import nullcontext
+from types import SimpleNamespace
+
+import fakeredis.aioredis
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services.jobs import handlers
+from app.services.jobs.queue import STATUS_DONE, STATUS_FAILED, JobQueue
+from app.services.jobs.worker import JobWorker
+
+USER_ID = "5f0c6a52-9d3e-4c55-9d0b-1f1de2a0c001"
+PAYLOAD = {"hh_user_id": "hh1", "user_id": USER_ID, "vacancy_id": "1", "resume_id": "r1", "credit_reserved": True}
+
+
+def _setup(monkeypatch, generate):
+    client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    queue = JobQueue(client)
+    refunds = []
+    monkeypatch.setattr(handlers, "_job_queue", queue)
+    monkeypatch.setattr(handlers, "_hh_service", SimpleNamespace(generate_cover_letter=generate))
+    monkeypatch.setattr(handlers, "SessionLocal", lambda: nullcontext())
+    monkeypatch.setattr(handlers.UserCRUD, "add_credits", lambda db, user_id, credits: refunds.append(credits))
+    # The credit was taken at enqueue, the worker never charges again
+    monkeypatch.delattr(handlers.UserCRUD, "decrement_credits")
+    return queue, refunds
+
+
+async def _run_twice(queue: JobQueue):
+    """The job runs, then its message is delivered again (worker died before the ack)"""
+    await queue.ensure_group()
+    job_id = await queue.enqueue(handlers.JOB_COVER_LETTER, PAYLOAD, USER_ID)
+    worker = JobWorker(queue, "w1", 1)
+    [(message_id, _)] = await queue.read("w1", 1, block_ms=10)
+    await worker._process(message_id, job_id)
+    await worker._process(message_id, job_id)
+    return job_id
+
+
+def test_fallback_letter_returns_the_reserved_credit_once(monkeypatch):
+    async def generate(*args):
+        return {"content": "Шаблон", "prompt_filename": "p", "ai_model": "fallback", "is_fallback": True}
+
+    queue, refunds = _setup(monkeypatch, generate)
+
+    async def scenario():
+        job_id = await _run_twice(queue)
+        assert (await queue.get(job_id))["status"] == STATUS_DONE
+
+    asyncio.run(scenario())
+    assert refunds == [1]
+
+
+def test_failed_job_returns_the_reserved_credit_once(monkeypatch):
+    async def generate(*args):
+        raise HTTPException(status_code=404, detail="Resume not found")
+
+    queue, refunds = _setup(monkeypatch, generate)
+
+    async def scenario():
+        job_id = await _run_twice(queue)
+        assert (await queue.get(job_id))["status"] == STATUS_FAILED
+
+    asyncio.run(scenario())
+    assert refunds == [1]
+
+
+def test_credit_returned_after_the_last_attempt(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 2)
+
+    async def generate(*args):
+        raise RuntimeError("provider timeout")
+
+    queue, refunds = _setup(monkeypatch, generate)
+
+    async def scenario():
+        await queue.ensure_group()
+        job_id = await queue.enqueue(handlers.JOB_COVER_LETTER, PAYLOAD, USER_ID)
+        worker = JobWorker(queue, "w1", 1)
+        [(message_id, _)] = await queue.read("w1", 1, block_ms=10)
+        for _ in range(3):
+            await worker._process(message_id, job_id)
+        assert (await queue.get(job_id))["status"] == STATUS_FAILED
+
+    asyncio.run(scenario())
+    assert refunds == [1]
+
+
+def test_redelivered_finished_job_is_not_run_again(monkeypatch):
+    calls = []
+
+    async def generate(*args):
+        calls.append(args)
+        return {"content": "Письмо", "prompt_filename": "p", "ai_model": "m"}
+
+    queue, refunds = _setup(monkeypatch, generate)
+
+    async def scenario():
+        job_id = await _run_twice(queue)
+        job = await queue.get(job_id)
+        assert job["status"] == STATUS_DONE and job["result"]["content"] == "Письмо"
+
+    asyncio.run(scenario())
+    assert len(calls) == 1 and refunds == []
+
+
+def test_job_queued_without_reservation_is_charged_once(monkeypatch):
+    async def generate(*args):
+        return {"content": "Письмо", "prompt_filename": "p", "ai_model": "m"}
+
+    queue, _ = _setup(monkeypatch, generate)
+    charges = []
+    monkeypatch.setattr(
+        handlers.UserCRUD, "decrement_credits", lambda db, user_id: charges.append(user_id) or True, raising=False
+    )
+    payload = {key: value for key, value in PAYLOAD.items() if key != "credit_reserved"}
+
+    async def scenario():
+        job_id = await queue.enqueue(handlers.JOB_COVER_LETTER, payload, USER_ID)
+        # The first attempt charged, then the worker died before storing the result
+        await handlers.handle_cover_letter(job_id, payload)
+        await handlers.handle_cover_letter(job_id, payload)
+
+    asyncio.run(scenario())
+    assert charges == [USER_ID]
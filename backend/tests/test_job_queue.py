@@ -0,0 +1,35 @@
+import asyncio
+
+import fakeredis.aioredis
+import pytest
+
+from app.core.config import settings
+from app.services.jobs.queue import STATUS_QUEUED, STREAM_KEY, JobQueue, JobQueueFull
+
+
+def test_full_backlog_rejects_instead_of_dropping_jobs(monkeypatch):
+    monkeypatch.setattr(settings, "JOB_MAX_BACKLOG", 3)
+
+    async def scenario():
+        client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        queue = JobQueue(client)
+        await queue.ensure_group()
+        job_ids = [await queue.enqueue("cover_letter", {"n": n}, "u1") for n in range(3)]
+        with pytest.raises(JobQueueFull):
+            await queue.enqueue("cover_letter", {"n": 3}, "u1")
+        assert len(await client.keys("job:*")) == 3
+
+        # Every accepted job is still on the stream, in order
+        messages = await queue.read("worker-1", 10, block_ms=10)
+        assert [job_id for _, job_id in messages] == job_ids
+        job = await queue.get(job_ids[0])
+        assert job["status"] == STATUS_QUEUED and job["payload"] == {"n": 0}
+
+        # A running (pending) job still counts, an acked one frees its place
+        with pytest.raises(JobQueueFull):
+            await queue.enqueue("cover_letter", {"n": 3}, "u1")
+        await queue.ack(messages[0][0])
+        assert await client.xlen(STREAM_KEY) == 2
+        await queue.enqueue("cover_letter", {"n": 3}, "u1")
+
+    asyncio.run(scenario())
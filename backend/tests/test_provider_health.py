@@ -0,0 +1,25 @@
+from app.services.ai_providers import router
+from app.services.ai_providers.router import ProviderHealth
+
+
+def test_failure_threshold_applies_again_after_cooldown(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(router.time, "monotonic", lambda: now[0])
+    health = ProviderHealth(failure_threshold=3, cooldown=60.0)
+
+    assert [health.record_failure() for _ in range(3)] == [False, False, True]
+    assert not health.is_healthy
+    # Calls in flight when it was demoted fail during the cooldown
+    assert health.record_failure() is False
+
+    now[0] += 61
+    assert health.is_healthy
+    assert [health.record_failure() for _ in range(3)] == [False, False, True]
+
+
+def test_success_resets_the_count():
+    health = ProviderHealth(failure_threshold=2)
+    health.record_failure()
+    health.record_success(0.5)
+    assert health.record_failure() is False
+    assert health.is_healthy
@@ -0,0 +1,40 @@
+import html
+import json
+from pathlib import Path
+
+import pytest
+
+from app.services.text_extraction import extract_text
+
+CORPUS = Path(__file__).resolve().parents[1] / "benchmarks" / "data" / "hh_descriptions.json"
+DESCRIPTIONS = json.loads(CORPUS.read_text("utf-8"))["descriptions"]
+
+
+def test_structure_and_entities():
+    markup = (
+        "<p><strong>Обязанности:</strong></p> <ul> <li>разработка&nbsp;API;</li>"
+        "<li>код-ревью &laquo;по-взрослому&raquo;</li> </ul><p>Офис &mdash; м.&nbsp;Белорусская</p>"
+    )
+    assert extract_text(markup) == (
+        "Обязанности:\n- разработка API;\n- код-ревью «по-взрослому»\nОфис — м. Белорусская"
+    )
+
+
+def test_dropped_blocks_and_comments():
+    markup = "<P>Текст<SCRIPT>var p = '<p>';</SCRIPT> дальше<!-- <li>скрыто --></P><style>p {}</style>"
+    assert extract_text(markup) == "Текст дальше"
+
+
+def test_escaped_markup_and_bare_brackets_stay_text():
+    assert extract_text("&lt;p&gt; latency < 100 ms, R&D") == "<p> latency < 100 ms, R&D"
+
+
+@pytest.mark.parametrize("entity", ["&#xD800;", "&#xDFFF;", "&#55296;", "&#0;", "&#x110000;"])
+def test_invalid_code_points_decode_like_html_unescape(entity):
+    assert extract_text(f"a{entity}b") == html.unescape(f"a{entity}b") == "a\ufffdb"
+
+
+@pytest.mark.parametrize("description", DESCRIPTIONS)
+def test_plain_path_matches_full_path(description):
+    # A comment sends the document through the full gap regex
+    assert extract_text(description) == extract_text("<!---->" + description)
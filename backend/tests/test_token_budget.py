@@ -0,0 +1,30 @@
+from app.services.token_budget import split_vacancy_sections
+
+
+def _heads(text: str):
+    return [(section.head.strip(), section.priority) for section in split_vacancy_sections(text)]
+
+
+def test_headings_start_a_line():
+    text = (
+        "Мы делаем платформу для логистики.\n"
+        "Обязанности:\n- разработка API\n"
+        "- Требования: опыт с Python от 3 лет\n"
+        "Условия работы:\n- удалёнка"
+    )
+    assert _heads(text) == [("", 50), ("Обязанности:", 80), ("Требования:", 90), ("Условия работы:", 30)]
+    assert split_vacancy_sections(text)[2].body == "опыт с Python от 3 лет"
+
+
+def test_heading_words_mid_sentence_are_text():
+    text = (
+        "Обязанности:\n- писать сервисы. Стек у нас современный, а Условия работы гибкие.\n"
+        "Требования к кандидату: знание Задачи коммивояжёра"
+    )
+    sections = split_vacancy_sections(text)
+    assert _heads(text) == [("Обязанности:", 80), ("Требования к кандидату:", 90)]
+    assert sections[0].body == "- писать сервисы. Стек у нас современный, а Условия работы гибкие."
+
+
+def test_heading_word_must_end():
+    assert _heads("Стекло и бетон\nЗадачи:\n- монтаж") == [("", 50), ("Задачи:", 80)]
@@ -0,0 +1,49 @@
+import asyncio
+import json
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.cpu_pool import CPUPool
+from app.services.hh.service import HHService
+from app.services.text_extraction import extract_text
+from app.services.vacancy_ingest import prepare_vacancies, text_fields
+
+CORPUS = Path(__file__).resolve().parents[1] / "benchmarks" / "data" / "hh_descriptions.json"
+HTML = json.loads(CORPUS.read_text("utf-8"))["descriptions"][:3]
+
+
+def _vacancies():
+    return [
+        {"id": str(i), "name": f"Разработчик {i}", "description": html,
+         "key_skills": [{"name": "Python"}], "salary": {"from": 1000}}
+        for i, html in enumerate(HTML)
+    ] + [{"id": "empty", "name": "Без описания", "description": None}]
+
+
+def test_prepare_matches_inline_fields():
+    vacancies = _vacancies()
+    prepared = prepare_vacancies(vacancies)
+    for vacancy, result in zip(vacancies, prepared):
+        extracted = {**vacancy, "description": extract_text(vacancy["description"] or "")}
+        assert result["description"] == extracted["description"]
+        assert result["fields"] == text_fields(extracted)
+    assert prepared[-1]["fields"]["description_tokens"] == 0
+
+
+def test_service_prepares_in_the_pool(monkeypatch):
+    monkeypatch.setattr(settings, "CPU_POOL_WORKERS", 1)
+    monkeypatch.setattr(settings, "CPU_POOL_MIN_COST", 0)
+    vacancies = _vacancies()
+    expected = prepare_vacancies(vacancies)
+
+    async def run():
+        try:
+            return await HHService.__new__(HHService)._prepare_vacancies(vacancies)
+        finally:
+            CPUPool.close()
+
+    fields = asyncio.run(run())
+    assert fields == [result["fields"] for result in expected]
+    assert [v["description"] for v in vacancies[:-1]] == [result["description"] for result in expected[:-1]]
+    assert vacancies[-1]["description"] is None
+    assert vacancies[0]["salary"] == {"from": 1000}